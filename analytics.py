@@ -0,0 +1,940 @@
+import json
+import os
+import re
+import unicodedata
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Política de meses para a análise de impostos (status considerados por período)
+TAX_POLICY_FILE = os.environ.get(
+    "DASHBOARD_TAX_POLICY", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tax_policy.json")
+)
+
+# Grão do cubo diário (além do dia) e métricas somadas por célula
+CUBE_DIMENSIONS = ['Canal de Venda', 'Conta', 'Status Pedido', 'SKU', 'Origem de Aquisição']
+CUBE_MEASURES = ['Faturamento', 'Custo (-)', 'Imposto (-)', 'Tarifa de Venda (-)',
+                 'Frete Comprador (-)', 'Frete Vendedor (-)', 'Margem Contrib. (=)', 'Qtd.']
+
+
+def build_daily_cube(df):
+    """Cubo diário: soma das métricas e quantidade de pedidos por dia × dimensões.
+
+    Seções que não precisam do detalhe de cada pedido leem do cubo, cujo tamanho
+    depende de dias × combinações de dimensões e não do número de pedidos. A coluna
+    'Data' vem normalizada para o dia e o cubo sai ordenado por ela.
+    """
+    dimensions = [col for col in CUBE_DIMENSIONS if col in df.columns]
+    measures = [col for col in CUBE_MEASURES if col in df.columns]
+
+    # dropna=False: pedidos sem canal/SKU/origem continuam nos totais
+    grouped = df.groupby([df['Data'].dt.normalize()] + dimensions, observed=True, dropna=False, sort=True)
+    cube = grouped[measures].sum()
+    cube['Pedidos'] = grouped.size()
+    return cube.reset_index()
+
+
+# Períodos do filtro da barra lateral, na ordem do seletor
+PERIOD_OPTIONS = ["Todos os dados", "Últimos 7 dias", "Últimos 15 dias",
+                  "Últimos 30 dias", "Mês atual", "Diário", "Personalizado"]
+
+
+def slice_by_date(df, start=None, end=None):
+    """Linhas com start <= Data < end de um df ordenado por 'Data'.
+
+    Usa busca binária e fatiamento posicional: custo O(log n) e o resultado é uma
+    view do df original, sem cópia.
+    """
+    dates = df['Data'].to_numpy()
+    lo = 0 if start is None else dates.searchsorted(pd.Timestamp(start).to_datetime64(), side='left')
+    hi = len(dates) if end is None else dates.searchsorted(pd.Timestamp(end).to_datetime64(), side='left')
+    return df.iloc[lo:hi]
+
+
+def period_bounds(period_type, start_date=None, end_date=None, today=None):
+    """Intervalo [início, fim) do período selecionado, em datas; None quando não há limite.
+
+    Os períodos relativos contam a partir de today (padrão: a data de hoje). Períodos
+    sem recorte ("Todos os dados", "Personalizado" sem datas) retornam (None, None).
+    """
+    today = today or datetime.now().date()
+    tomorrow = today + timedelta(days=1)
+    
+    if period_type == "Personalizado":
+        if start_date and end_date:
+            return start_date, end_date + timedelta(days=1)
+    elif period_type == "Últimos 7 dias":
+        return today - timedelta(days=7), None
+    elif period_type == "Últimos 15 dias":
+        return today - timedelta(days=15), None
+    elif period_type == "Últimos 30 dias":
+        return today - timedelta(days=30), None
+    elif period_type == "Mês atual":
+        month_start = today.replace(day=1)
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
+        return month_start, next_month
+    elif period_type == "Diário":
+        return today, tomorrow
+    
+    return None, None
+
+
+def filter_by_period(df, period_type, start_date=None, end_date=None, today=None):
+    """Recorte do período selecionado (df ordenado por 'Data').
+
+    Os períodos relativos contam a partir de today (padrão: a data de hoje).
+    """
+    if df.empty:
+        return df
+    
+    start, end = period_bounds(period_type, start_date, end_date, today)
+    if start is None and end is None:
+        return df
+    return slice_by_date(df, start, end)
+
+
+def apply_filters(data, period_type, start_date, end_date, canal_selected, conta_selected, today=None):
+    """Filtros da barra lateral (período, canal e conta), aos pedidos ou ao cubo diário."""
+    if period_type != "Todos os dados":
+        data = filter_by_period(data, period_type, start_date, end_date, today)
+    
+    if canal_selected != "Todos":
+        data = data[data['Canal de Venda'] == canal_selected]
+    
+    if conta_selected != "Todas":
+        data = data[data['Conta'] == conta_selected]
+    
+    return data
+
+
+def previous_period_bounds(current_start, current_end):
+    """Intervalo fechado [início, fim] do período anterior de mesma duração.
+
+    current_start e current_end: primeira e última 'Data' do recorte atual.
+    """
+    period_length = (current_end - current_start).days
+    
+    if period_length == 0:
+        period_length = 1  # Para períodos de um dia
+    
+    previous_start = current_start - timedelta(days=period_length + 1)
+    previous_end = current_start - timedelta(days=1)
+    return previous_start, previous_end
+
+
+def get_previous_period_data(df, current_df, period_type):
+    """Pedidos do período anterior de mesma duração, para as comparações."""
+    if df.empty or current_df.empty:
+        return pd.DataFrame()
+    
+    previous_start, previous_end = previous_period_bounds(current_df['Data'].min(), current_df['Data'].max())
+    
+    # Intervalo fechado [previous_start, previous_end]
+    return slice_by_date(df, previous_start, previous_end + pd.Timedelta(1, 'ns'))
+
+
+# Tamanho máximo da descrição no rótulo do SKU (seletor da aba de SKUs)
+SKU_LABEL_DESC_LENGTH = 50
+
+
+def add_sku_columns(df):
+    """Frame com as colunas de SKU usadas pela aba de SKUs, preparadas na carga.
+
+    'SKU' e 'Descrição do Produto' viram texto categórico sem vazios, e 'SKU_Opcao'
+    traz o rótulo "SKU - descrição" do seletor (descrição da primeira ocorrência do
+    SKU). Assim os filtros da aba trabalham sobre views, sem converter nem copiar.
+    df não é alterado: o resultado é uma cópia rasa, que compartilha as demais colunas.
+    """
+    df = df.copy(deep=False)
+    sku = df['SKU'].astype(object).fillna('Sem SKU').astype(str)
+    desc = df['Descrição do Produto'].astype(object).fillna('Sem descrição').astype(str)
+    df['SKU'] = sku.astype('category')
+    df['Descrição do Produto'] = desc.astype('category')
+
+    first_desc = desc.groupby(sku, sort=False).first()
+    labels = sku_label(first_desc.index.to_series(), first_desc)
+    df['SKU_Opcao'] = df['SKU'].map(labels)
+    return df
+
+
+def sku_label(codes, descriptions, length=SKU_LABEL_DESC_LENGTH):
+    """Rótulo "código - descrição" (descrição truncada em length caracteres), vetorizado."""
+    codes = codes.astype(str)
+    descriptions = descriptions.astype(str)
+    truncated = descriptions.str[:length] + np.where(descriptions.str.len() > length, '...', '')
+    return codes + ' - ' + truncated
+
+
+def monthly_pivot(data, index, month, metrics, months):
+    """Tabela larga index × (mês, métrica) a partir de uma linha por item e mês.
+
+    metrics mapeia coluna -> nome da métrica na tabela, na ordem desejada; months
+    traz os meses na ordem das colunas. Como no pivot_table com aggfunc='sum' e
+    fill_value=0: linhas repetidas de um mesmo item/mês são somadas, combinações
+    ausentes ficam 0 e as linhas saem em ordem crescente de index.
+    """
+    wide = data.groupby([index, month], observed=True)[list(metrics)].sum()
+    wide = wide.astype(float).unstack(month, fill_value=0)
+    wide.columns = wide.columns.set_names(['Metrica', 'Mes']).swaplevel()
+    wide = wide.rename(columns=metrics, level='Metrica')
+    columns = pd.MultiIndex.from_product([months, list(metrics.values())], names=['Mes', 'Metrica'])
+    return wide.reindex(columns=columns, fill_value=0)
+
+
+def fold_text(text):
+    """Texto em maiúsculas e sem acentos, para comparação na busca."""
+    decomposed = unicodedata.normalize('NFKD', str(text))
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).upper()
+
+
+def _text_blob(keys):
+    """Chaves unidas em um único texto (separadas por quebra de linha) e o início de cada uma."""
+    lengths = np.fromiter((len(key) for key in keys), dtype=np.int64, count=len(keys))
+    starts = np.concatenate(([0], np.cumsum(lengths + 1)[:-1]))
+    return {'text': '\n'.join(keys), 'starts': starts, 'lengths': lengths}
+
+
+def _blob_rank(blob, term):
+    """Relevância do termo em cada chave: 0 exata, 1 prefixo, 2 trecho, -1 ausente."""
+    rank = np.full(len(blob['starts']), -1, dtype=np.int64)
+    positions = np.fromiter((m.start() for m in re.finditer(re.escape(term), blob['text'])), dtype=np.int64)
+    if len(positions) == 0:
+        return rank
+
+    rows = np.searchsorted(blob['starts'], positions, side='right') - 1
+    # Só a primeira ocorrência de cada chave importa para a relevância
+    rows, first = np.unique(rows, return_index=True)
+    offsets = positions[first] - blob['starts'][rows]
+    exact = (offsets == 0) & (blob['lengths'][rows] == len(term))
+    rank[rows] = np.where(exact, 0, np.where(offsets == 0, 1, 2))
+    return rank
+
+
+def build_sku_search_index(df):
+    """Índice de busca de SKUs, construído uma vez por versão dos dados.
+
+    Guarda uma linha por SKU ('catalog', com 'SKU' e o rótulo 'label' do seletor) e,
+    para SKU e descrição, as chaves em maiúsculas e sem acentos unidas em um único
+    texto. Cada busca é então uma varredura de regex sobre esse texto, em C.
+    """
+    catalog = df.groupby('SKU', observed=True).agg({
+        'Descrição do Produto': 'first',
+        'SKU_Opcao': 'first'
+    })
+    return sku_search_index(catalog)
+
+
+def sku_search_index(catalog):
+    """Índice de build_sku_search_index a partir do catálogo de SKUs.
+
+    catalog: uma linha por SKU (índice), em ordem de SKU, com 'Descrição do Produto'
+    e 'SKU_Opcao' da primeira ocorrência (também o resultado do duckdb_engine).
+    """
+    skus = catalog.index.astype(str)
+    return {
+        'catalog': pd.DataFrame({'SKU': skus, 'label': catalog['SKU_Opcao'].astype(str).to_numpy()}),
+        'sku_key': _text_blob([fold_text(sku) for sku in skus]),
+        'desc_key': _text_blob([fold_text(desc) for desc in catalog['Descrição do Produto'].astype(str)]),
+    }
+
+
+def search_skus(index, sku_term='', desc_term=''):
+    """SKUs do índice cujo código/descrição contêm os termos, em ordem de relevância.
+
+    A busca ignora maiúsculas e acentos. Para cada termo, correspondência exata vem
+    antes de prefixo, que vem antes de trecho no meio; empates seguem a ordem do
+    SKU. Retorna o recorte de index['catalog'] ('SKU' e 'label').
+    """
+    catalog = index['catalog']
+    mask = np.ones(len(catalog), dtype=bool)
+    rank = np.zeros(len(catalog), dtype=np.int64)
+    for key, term in (('sku_key', sku_term), ('desc_key', desc_term)):
+        term = fold_text(term).strip() if term else ''
+        if not term:
+            continue
+        term_rank = _blob_rank(index[key], term)
+        mask &= term_rank >= 0
+        rank += term_rank
+
+    matches = np.flatnonzero(mask)
+    return catalog.iloc[matches[np.argsort(rank[matches], kind='stable')]]
+
+
+# Somas por canal/conta; as demais métricas dos cards derivam delas
+CHANNEL_SUMS = ['bruto', 'cancelado', 'qtd_total', 'qtd_cancelada', 'margem']
+
+
+def _status_split(data):
+    """Colunas de soma já separadas por status (cancelados × demais)."""
+    cancelado = (data['Status Pedido'] == 'Cancelado').to_numpy()
+    faturamento = data['Faturamento'].to_numpy(dtype=float)
+    # Linhas do cubo somam vários pedidos; linhas de pedidos contam um
+    if 'Pedidos' in data.columns:
+        pedidos = data['Pedidos'].to_numpy()
+    else:
+        pedidos = np.ones(len(data), dtype=np.int64)
+
+    return pd.DataFrame({
+        'Canal de Venda': data['Canal de Venda'].to_numpy(),
+        'Conta': data['Conta'].to_numpy(),
+        'bruto': faturamento,
+        'cancelado': np.where(cancelado, faturamento, 0.0),
+        'qtd_total': pedidos,
+        'qtd_cancelada': np.where(cancelado, pedidos, 0),
+        'margem': np.where(cancelado, 0.0, data['Margem Contrib. (=)'].to_numpy(dtype=float)),
+    })
+
+
+def _percent(numerator, denominator):
+    return (numerator / denominator * 100).where(denominator > 0, 0)
+
+
+def _derive_channel_metrics(sums):
+    current = sums.xs('atual', axis=1, level='Periodo')
+    previous = sums.xs('anterior', axis=1, level='Periodo')
+
+    metrics = current.copy()
+    metrics['aprovado'] = current['bruto'] - current['cancelado']
+    metrics['qtd_aprovada'] = current['qtd_total'] - current['qtd_cancelada']
+    metrics['perc_cancelado_fat'] = _percent(current['cancelado'], current['bruto'])
+    metrics['perc_cancelado_qtd'] = _percent(current['qtd_cancelada'], current['qtd_total'])
+    metrics['mc_perc'] = _percent(metrics['margem'], metrics['aprovado'])
+
+    prev_aprovado = previous['bruto'] - previous['cancelado']
+    prev_qtd_aprovada = previous['qtd_total'] - previous['qtd_cancelada']
+    metrics['growth_fat'] = _percent(metrics['aprovado'] - prev_aprovado, prev_aprovado)
+    metrics['growth_qtd'] = _percent(metrics['qtd_aprovada'] - prev_qtd_aprovada, prev_qtd_aprovada)
+    return metrics
+
+
+def channel_metrics(current, previous=None):
+    """Métricas dos cards por canal e por canal/conta, com crescimento sobre o período anterior.
+
+    Aceita pedidos ou o cubo diário. Uma única agregação cobre os dois períodos e
+    todos os canais/contas presentes nos dados. Retorna {canal: métricas,
+    'canal_conta': métricas}, e cada entrada traz também 'canal' e 'conta'
+    (None nos totais do canal).
+    """
+    parts = {'atual': _status_split(current)}
+    if previous is not None and not previous.empty:
+        parts['anterior'] = _status_split(previous)
+    split = pd.concat(parts, names=['Periodo']).reset_index(level='Periodo')
+
+    # Contas vazias ficam no total do canal, mas não ganham card próprio
+    by_conta = split.groupby(['Canal de Venda', 'Conta', 'Periodo'], observed=True, dropna=False)[CHANNEL_SUMS].sum()
+    by_conta = by_conta[by_conta.index.get_level_values('Canal de Venda').notna()]
+    by_conta = by_conta.unstack('Periodo', fill_value=0).reindex(
+        columns=pd.MultiIndex.from_product([CHANNEL_SUMS, ['atual', 'anterior']], names=[None, 'Periodo']),
+        fill_value=0,
+    )
+    by_canal = by_conta.groupby(level='Canal de Venda', observed=True).sum()
+    by_conta = by_conta[by_conta.index.get_level_values('Conta').notna()]
+
+    canal_metrics = _derive_channel_metrics(by_canal).to_dict('index')
+    conta_metrics = _derive_channel_metrics(by_conta).to_dict('index')
+
+    result = {}
+    for canal, values in canal_metrics.items():
+        result[canal] = dict(values, canal=canal, conta=None)
+        for (conta_canal, conta), conta_values in conta_metrics.items():
+            if conta_canal == canal:
+                result[f'{canal}_{conta}'] = dict(conta_values, canal=canal, conta=conta)
+    return result
+
+
+def _period_totals(data):
+    if data is None or data.empty:
+        return dict.fromkeys(CHANNEL_SUMS, 0)
+    split = _status_split(data)
+    return {col: split[col].sum() for col in CHANNEL_SUMS}
+
+
+def _growth(current, previous):
+    return ((current - previous) / previous * 100) if previous > 0 else 0
+
+
+def overview_kpis(current, previous=None):
+    """KPIs da visão geral (faturamento, cancelamentos, margem, ticket) e variação sobre o período anterior."""
+    cur = _period_totals(current)
+    prev = _period_totals(previous)
+
+    aprovado = cur['bruto'] - cur['cancelado']
+    prev_aprovado = prev['bruto'] - prev['cancelado']
+    qtd_aprovada = int(cur['qtd_total'] - cur['qtd_cancelada'])
+    prev_qtd_aprovada = int(prev['qtd_total'] - prev['qtd_cancelada'])
+
+    perc_cancelado_fat = (cur['cancelado'] / cur['bruto'] * 100) if cur['bruto'] > 0 else 0
+    perc_cancelado_qtd = (cur['qtd_cancelada'] / cur['qtd_total'] * 100) if cur['qtd_total'] > 0 else 0
+    prev_perc_cancelado_fat = (prev['cancelado'] / prev['bruto'] * 100) if prev['bruto'] > 0 else 0
+    prev_perc_cancelado_qtd = (prev['qtd_cancelada'] / prev['qtd_total'] * 100) if prev['qtd_total'] > 0 else 0
+
+    ticket_medio = aprovado / qtd_aprovada if qtd_aprovada > 0 else 0
+    prev_ticket_medio = prev_aprovado / prev_qtd_aprovada if prev_qtd_aprovada > 0 else 0
+
+    return {
+        'bruto': cur['bruto'],
+        'cancelado': cur['cancelado'],
+        'aprovado': aprovado,
+        'margem': cur['margem'],
+        'mc_perc': (cur['margem'] / aprovado * 100) if aprovado > 0 else 0,
+        'perc_cancelado_fat': perc_cancelado_fat,
+        'perc_cancelado_qtd': perc_cancelado_qtd,
+        'qtd_total': int(cur['qtd_total']),
+        'qtd_cancelada': int(cur['qtd_cancelada']),
+        'qtd_aprovada': qtd_aprovada,
+        'ticket_medio': ticket_medio,
+        'growth_bruto': _growth(cur['bruto'], prev['bruto']),
+        'growth_cancelado': _growth(cur['cancelado'], prev['cancelado']),
+        'growth_aprovado': _growth(aprovado, prev_aprovado),
+        'growth_margem': _growth(cur['margem'], prev['margem']),
+        'growth_qtd_total': _growth(cur['qtd_total'], prev['qtd_total']),
+        'growth_qtd_aprovada': _growth(qtd_aprovada, prev_qtd_aprovada),
+        'growth_qtd_cancelada': _growth(cur['qtd_cancelada'], prev['qtd_cancelada']),
+        'growth_ticket': _growth(ticket_medio, prev_ticket_medio),
+        # Pontos percentuais, não variação relativa
+        'growth_perc_cancelado_fat': perc_cancelado_fat - prev_perc_cancelado_fat,
+        'growth_perc_cancelado_qtd': perc_cancelado_qtd - prev_perc_cancelado_qtd,
+    }
+
+
+# Agregações das seções de relatórios. Todas recebem o recorte já filtrado (pedidos ou
+# cubo diário), não alteram a entrada e devolvem DataFrames/dicionários prontos para
+# exibição: a interface só monta gráficos e tabelas
+
+def month_order(data, label_column, period_column='Data'):
+    """Rótulos de mês de data em ordem cronológica (para category_orders dos gráficos)."""
+    return data.sort_values(period_column, kind='stable')[label_column].unique().tolist()
+
+
+def monthly_sales(cube, value_column='Faturamento'):
+    """Vendas por mês e status (quantidade de pedidos em 'ID da venda').
+
+    Retorna {'vendas': mês × status, 'aprovados' e 'cancelados': totais por mês
+    ('Data_str'), 'tabela': mês × (métrica, status)}.
+    """
+    sales = cube.groupby([cube['Data'].dt.to_period('M'), 'Status Pedido'], observed=True).agg({
+        value_column: 'sum',
+        'Pedidos': 'sum'
+    }).reset_index().rename(columns={'Pedidos': 'ID da venda'})
+    return monthly_sales_tables(sales, value_column)
+
+
+def monthly_sales_tables(sales, value_column):
+    """Tabelas de monthly_sales a partir das vendas já agrupadas.
+
+    sales: mês ('Data', Period) × 'Status Pedido' com value_column e 'ID da venda',
+    em ordem de mês e status (também o resultado das consultas do duckdb_engine).
+    """
+    sales['Data_str'] = sales['Data'].astype(str)
+
+    cancelado = sales['Status Pedido'] == 'Cancelado'
+    aprovados = sales[~cancelado].groupby('Data_str').agg({value_column: 'sum', 'ID da venda': 'sum'}).reset_index()
+    cancelados = sales[cancelado].groupby('Data_str').agg({value_column: 'sum', 'ID da venda': 'sum'}).reset_index()
+
+    table = pd.DataFrame()
+    if not sales.empty:
+        table = sales.rename(columns={'Data_str': 'Mês'}).pivot_table(
+            index='Mês',
+            columns='Status Pedido',
+            values=[value_column, 'ID da venda'],
+            fill_value=0,
+            aggfunc='sum',
+            observed=True
+        )
+    return {'vendas': sales, 'aprovados': aprovados, 'cancelados': cancelados, 'tabela': table}
+
+
+def origin_monthly(cube, value_column='Faturamento', status=None):
+    """Valor por mês e origem de aquisição, com participação no mês ('Percentual') e rótulo ('Texto').
+
+    status: None (todos os pedidos), 'aprovados' (não cancelados) ou 'cancelados'.
+    """
+    if status is not None:
+        cancelado = cube['Status Pedido'] == 'Cancelado'
+        cube = cube[cancelado] if status == 'cancelados' else cube[~cancelado]
+
+    monthly = cube.groupby([cube['Data'].dt.to_period('M'), 'Origem de Aquisição'], observed=True).agg({
+        value_column: 'sum'
+    }).reset_index()
+    monthly['Data_str'] = monthly['Data'].astype(str)
+    total = monthly.groupby('Data_str')[value_column].transform('sum')
+    monthly['Percentual'] = _percent(monthly[value_column], total)
+    monthly['Texto'] = [f"R$ {value:,.2f}<br>({percent:.1f}%)"
+                        for value, percent in zip(monthly[value_column].tolist(), monthly['Percentual'].tolist())]
+    return monthly
+
+
+def orders_by_channel_status(cube):
+    """Pedidos por canal e status, com rótulo ('Label') e cor do gráfico ('Cor')."""
+    counts = cube.groupby(['Canal de Venda', 'Status Pedido'], observed=True)['Pedidos'].sum().reset_index(name='Quantidade')
+    canal = counts['Canal de Venda'].astype(str)
+    counts['Label'] = canal + ' - ' + counts['Status Pedido'].astype(str)
+    # Cancelados em vermelho; demais na cor do canal
+    counts['Cor'] = np.where(counts['Status Pedido'] == 'Cancelado', '#ff0000',
+                             np.where(canal.str.contains('Mercado Livre', regex=False), '#1f77b4', '#ffa500'))
+    return counts
+
+
+def orders_by_channel(cube):
+    """Pedidos por canal, do maior para o menor."""
+    return cube.groupby('Canal de Venda', observed=True)['Pedidos'].sum().sort_values(ascending=False)
+
+
+def daily_orders(cube):
+    """Pedidos ('ID da venda') e faturamento por dia."""
+    return cube.groupby(cube['Data'].dt.date).agg({
+        'Pedidos': 'sum',
+        'Faturamento': 'sum'
+    }).reset_index().rename(columns={'Pedidos': 'ID da venda'})
+
+
+def _add_channel_totals(pivot):
+    original_cols = pivot.columns.tolist()
+    for canal in pivot.columns.get_level_values(0).unique():
+        canal_cols = [col for col in pivot.columns if col[0] == canal]
+        pivot[(canal, 'Total')] = pivot[canal_cols].sum(axis=1)
+    # Total geral só sobre as colunas originais (sem os totais por canal)
+    pivot[('Total Geral', '')] = pivot[original_cols].sum(axis=1)
+    return pivot
+
+
+def daily_channel_pivots(cube):
+    """Pedidos e faturamento por dia × (canal, conta), com total de cada canal e total geral.
+
+    Retorna (quantidade, faturamento); DataFrames vazios se não houver dados.
+    """
+    daily = cube.groupby([cube['Data'].dt.date, 'Canal de Venda', 'Conta'], observed=True).agg({
+        'Pedidos': 'sum',
+        'Faturamento': 'sum'
+    }).reset_index()
+    daily.columns = ['Data', 'Canal de Venda', 'Conta', 'Qtd. Vendas', 'Faturamento']
+    return daily_pivots(daily)
+
+
+def daily_pivots(daily):
+    """Pivots de daily_channel_pivots a partir do agrupamento diário.
+
+    daily: dia ('Data', date) × 'Canal de Venda' × 'Conta' com 'Qtd. Vendas' e 'Faturamento'.
+    """
+    if daily.empty:
+        return pd.DataFrame(), pd.DataFrame()
+
+    pivots = []
+    for values in ['Qtd. Vendas', 'Faturamento']:
+        pivot = daily.pivot_table(
+            index='Data',
+            columns=['Canal de Venda', 'Conta'],
+            values=values,
+            fill_value=0,
+            aggfunc='sum',
+            observed=True
+        )
+        pivots.append(_add_channel_totals(pivot) if not pivot.empty else pivot)
+    return tuple(pivots)
+
+
+def order_counts(data, column):
+    """Pedidos por valor de column, do maior para o menor (só os presentes no recorte).
+
+    Aceita pedidos ou um cubo com column e 'Pedidos'.
+    """
+    if 'Pedidos' in data.columns:
+        counts = data.groupby(column, observed=True)['Pedidos'].sum().sort_values(ascending=False).rename('count')
+    else:
+        counts = data[column].value_counts()
+    return counts[counts > 0]
+
+
+def shipping_distribution(data):
+    """Pedidos por tipo de frete (só os presentes no recorte)."""
+    return order_counts(data, 'Frete')
+
+
+def sku_options(data):
+    """Uma linha por SKU do recorte (índice, em ordem de SKU): rótulo do seletor ('SKU_Opcao') e quantidade vendida."""
+    return data.groupby('SKU', observed=True).agg({
+        'SKU_Opcao': 'first',
+        'Qtd.': 'sum'
+    })
+
+
+def sku_totals(data):
+    """Totais do recorte de SKUs (painel "Resumo Geral"). Aceita pedidos ou um cubo com 'Pedidos'."""
+    faturamento = data['Faturamento'].sum()
+    margem = data['Margem Contrib. (=)'].sum()
+    quantidade = data['Qtd.'].sum()
+    return {
+        'faturamento': faturamento,
+        'vendas': int(data['Pedidos'].sum()) if 'Pedidos' in data.columns else data.shape[0],
+        'quantidade': quantidade,
+        'margem': margem,
+        'mc_perc': (margem / faturamento * 100) if faturamento > 0 else 0,
+        'ticket_medio': faturamento / quantidade if quantidade > 0 else 0,
+        'margem_unitaria': margem / quantidade if quantidade > 0 else 0,
+    }
+
+
+def sku_summary(data):
+    """Uma linha por SKU: totais, médias unitárias e MC em % sobre os totais."""
+    summary = data.groupby('SKU', observed=True).agg({
+        'Descrição do Produto': 'first',
+        'Origem de Aquisição': 'first',
+        'Faturamento': 'sum',
+        'Qtd.': 'sum',
+        'Valor Unit.': 'mean',
+        'Custo (-)': ['sum', 'mean'],
+        'Imposto (-)': ['sum', 'mean'],
+        'Frete Vendedor (-)': 'mean',
+        'Tarifa de Venda (-)': ['sum', 'mean'],
+        'Margem Contrib. (=)': ['sum', 'mean']
+    }).reset_index()
+
+    summary.columns = [
+        'SKU', 'Descrição do Produto', 'Origem de Aquisição',
+        'Faturamento', 'Qtd.', 'Valor Unit.',
+        'Custo (-) Total', 'Custo (-) Unitário',
+        'Imposto (-) Total', 'Imposto (-) Unitário',
+        'Frete Vendedor (-)',
+        'Tarifa de Venda (-) Total', 'Tarifa de Venda (-) Unitária',
+        'Margem Contrib. (=) Total', 'Margem Contrib. (=) Unitária'
+    ]
+    return add_sku_mc_percent(summary)
+
+
+def add_sku_mc_percent(summary):
+    """Completa o resumo por SKU (colunas de sku_summary) com 'MC em %'."""
+    # MC% = margem total / faturamento total (não a média das MCs por pedido)
+    summary['MC em %'] = np.where(
+        summary['Faturamento'] > 0,
+        (summary['Margem Contrib. (=) Total'] / summary['Faturamento']) * 100,
+        0
+    )
+    return summary
+
+
+def sku_monthly_totals(data):
+    """Quantidade e faturamento por mês × "SKU - descrição" ('SKU_Desc'; 'Mês' com o nome do mês)."""
+    # Agrega por mês × SKU e só então troca o SKU pela descrição (sem copiar os pedidos)
+    desc = data.groupby('SKU', observed=True)['Descrição do Produto'].first().astype(str)
+    monthly = data.groupby([data['Data'].dt.to_period('M'), 'SKU'], observed=True)[['Qtd.', 'Faturamento']].sum().reset_index()
+    monthly['SKU_Desc'] = monthly['SKU'].astype(str).map(desc)
+
+    totals = monthly.groupby(['Data', 'SKU_Desc']).agg({'Qtd.': 'sum', 'Faturamento': 'sum'}).reset_index()
+    totals['Mês'] = totals['Data'].dt.strftime('%B')
+    return totals
+
+
+def sku_monthly_comparison(data, by_channel=False, label_length=100):
+    """Quantidade e faturamento por mês × SKU (e canal, com by_channel), com 'Mês' e 'SKU_Label'."""
+    keys = [data['Data'].dt.to_period('M'), 'SKU'] + (['Canal de Venda'] if by_channel else []) + ['Descrição do Produto']
+    comparison = data.groupby(keys, observed=True).agg({
+        'Qtd.': 'sum',
+        'Faturamento': 'sum'
+    }).reset_index()
+    comparison['Mês'] = comparison['Data'].dt.strftime('%b %Y')
+    comparison['SKU_Label'] = sku_label(comparison['SKU'], comparison['Descrição do Produto'], label_length)
+    return comparison
+
+
+def sku_monthly_performance(data, group_column='SKU'):
+    """Vendas e faturamento por mês × SKU (ou 'Código'), com a variação sobre o mês anterior do item.
+
+    Linhas em ordem de 'Identificador' e mês; 'Qtd_Anterior'/'Fat_Anterior' ficam
+    vazios no primeiro mês de cada item (variação 0). Aceita pedidos ou um cubo com
+    'Pedidos' (quantidade de vendas de cada linha).
+    """
+    mes_ano = data['Data'].dt.to_period('M').rename('Mes_Ano')
+    # Quantidade de vendas: pedidos com ID, ou a soma de 'Pedidos' do cubo
+    sales = ('Pedidos', 'sum') if 'Pedidos' in data.columns else ('ID da venda', 'count')
+    performance = data.groupby([mes_ano, group_column, 'Descrição do Produto'], observed=True).agg(
+        Qtd=sales,
+        Faturamento=('Faturamento', 'sum')
+    ).reset_index()
+    performance.columns = ['Mes_Ano', group_column, 'Descrição do Produto', 'Qtd', 'Faturamento']
+
+    performance = performance.sort_values(['Mes_Ano', group_column])
+    performance['Identificador'] = sku_label(performance[group_column], performance['Descrição do Produto'])
+    performance['Mes_Ano_Str'] = performance['Mes_Ano'].dt.strftime('%b/%Y')
+
+    # Variação em relação ao mês anterior dentro de cada item
+    performance = performance.sort_values(['Identificador', 'Mes_Ano'])
+    performance['Qtd_Anterior'] = performance.groupby('Identificador')['Qtd'].shift(1)
+    performance['Fat_Anterior'] = performance.groupby('Identificador')['Faturamento'].shift(1)
+    performance['Var_Qtd'] = np.where(
+        performance['Qtd_Anterior'] > 0,
+        ((performance['Qtd'] - performance['Qtd_Anterior']) / performance['Qtd_Anterior'] * 100),
+        0
+    )
+    performance['Var_Fat'] = np.where(
+        performance['Fat_Anterior'] > 0,
+        ((performance['Faturamento'] - performance['Fat_Anterior']) / performance['Fat_Anterior'] * 100),
+        0
+    )
+    return performance
+
+
+def sku_evolution_pivot(performance):
+    """Tabela Identificador × (mês, métrica) de sku_monthly_performance."""
+    months = performance.sort_values('Mes_Ano')['Mes_Ano_Str'].unique().tolist()
+    return monthly_pivot(
+        performance, 'Identificador', 'Mes_Ano_Str',
+        {'Qtd': 'Qtd', 'Faturamento': 'R$', 'Var_Qtd': 'Var%Qtd', 'Var_Fat': 'Var%Fat'},
+        months
+    )
+
+
+def pricing_monthly(data):
+    """Preço médio, margem unitária (R$ e %) por mês × SKU, em ordem cronológica ('Mes_Str')."""
+    pricing = data.groupby([data['Data'].dt.to_period('M'), 'SKU', 'Descrição do Produto'], observed=True).agg({
+        'Valor Unit.': 'mean',  # Preço médio unitário
+        'Margem Contrib. (=)': 'sum',  # Margem total
+        'Qtd.': 'sum',  # Quantidade total
+        'Faturamento': 'sum'  # Faturamento total
+    }).reset_index()
+    return pricing_columns(pricing)
+
+
+def pricing_columns(pricing):
+    """Completa pricing_monthly a partir do agrupamento mês ('Data', Period) × SKU × descrição.
+
+    pricing: em ordem de mês, SKU e descrição, com 'Valor Unit.' (média) e as somas de
+    margem, quantidade e faturamento (também o resultado do duckdb_engine).
+    """
+    pricing['MC Unitária (R$)'] = pricing['Margem Contrib. (=)'] / pricing['Qtd.']
+    pricing['MC Unitária (%)'] = (pricing['Margem Contrib. (=)'] / pricing['Faturamento'] * 100)
+    pricing['Identificador'] = sku_label(pricing['SKU'], pricing['Descrição do Produto'])
+    pricing['Mes_Str'] = pricing['Data'].dt.strftime('%b/%Y')
+    return pricing.sort_values('Data')
+
+
+def pricing_pivot(pricing):
+    """Tabela Identificador × (mês, métrica) de pricing_monthly."""
+    return monthly_pivot(
+        pricing, 'Identificador', 'Mes_Str',
+        {'Valor Unit.': 'Preço (R$)', 'MC Unitária (R$)': 'MC (R$)', 'MC Unitária (%)': 'MC (%)'},
+        pricing['Mes_Str'].unique().tolist()
+    )
+
+
+def _policy_month(text):
+    period = pd.Period(text, freq='M')
+    return period.year * 12 + period.month - 1
+
+
+def load_tax_policy(path=TAX_POLICY_FILE):
+    """Lê a política de impostos: status considerados por intervalo de meses.
+
+    O JSON traz 'padrao' (status e descrição dos meses fora de qualquer período) e
+    'periodos', cada um com 'inicio'/'fim' ("AAAA-MM", inclusive), 'status' (lista,
+    ou null para todos os pedidos), 'descricao' e 'rotulo' (texto da legenda).
+    Períodos sobrepostos: vale o primeiro da lista. Levanta ValueError se inválido.
+    """
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+
+    try:
+        rules = [dict(config['padrao'], inicio=None, fim=None)]
+        for period in config.get('periodos', []):
+            rules.append(dict(period, inicio=_policy_month(period['inicio']), fim=_policy_month(period['fim'])))
+        for rule in rules:
+            missing = {'descricao', 'rotulo'} - set(rule)
+            if missing:
+                raise ValueError(f"Política de impostos sem {sorted(missing)} em {path}")
+            if rule.get('status') is not None and not isinstance(rule['status'], list):
+                raise ValueError(f"'status' deve ser uma lista ou null: {rule['status']!r}")
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Política de impostos inválida em {path}: {e!r}") from e
+    return rules
+
+
+def apply_tax_policy(data, policy):
+    """Linhas de data consideradas na análise de impostos, em uma única passada.
+
+    Cada linha recebe a regra do seu mês (primeiro período da política que o contém,
+    senão a padrão) por uma máscara vetorizada; 'Filtro_Aplicado' traz a descrição da
+    regra. Linhas sem data ficam de fora. Não altera data (retorna um novo DataFrame).
+    """
+    dates = data['Data']
+    months = (dates.dt.year * 12 + dates.dt.month - 1).to_numpy()
+
+    # Índice da regra de cada linha: 0 = padrão, i = i-ésimo período
+    in_period = [(months >= rule['inicio']) & (months <= rule['fim']) for rule in policy[1:]]
+    rule_index = np.select(in_period, range(1, len(policy)), 0) if in_period else np.zeros(len(data), dtype=int)
+
+    status = data['Status Pedido']
+    allowed = np.zeros(len(data), dtype=bool)
+    for i, rule in enumerate(policy):
+        in_rule = rule_index == i
+        if rule.get('status') is not None:
+            in_rule &= status.isin(rule['status']).to_numpy()
+        allowed |= in_rule
+    allowed &= dates.notna().to_numpy()
+
+    descriptions = np.array([rule['descricao'] for rule in policy], dtype=object)
+    return data[allowed].assign(Filtro_Aplicado=descriptions[rule_index[allowed]]).reset_index(drop=True)
+
+
+def tax_policy_legend(policy, bold=True):
+    """Legenda da política ("**Abril, Maio e Junho/2025:** Todos os pedidos | ...")."""
+    rules = policy[1:] + policy[:1]
+    if bold:
+        parts = [f"**{rule['rotulo']}:** {rule['descricao'].capitalize()}" for rule in rules]
+    else:
+        parts = [f"{rule['rotulo']}: {rule['descricao']}" for rule in rules]
+    return ' | '.join(parts)
+
+
+def tax_report(cube, policy):
+    """Análise de impostos do recorte, com os status de cada mês definidos pela política.
+
+    Retorna {'pedidos': linhas consideradas (apply_tax_policy), 'resumo_filtros':
+    pedidos por mês e regra aplicada, 'mensal': impostos e % sobre o faturamento por
+    mês, 'canal_conta': o mesmo por canal e conta, 'totais': somas do recorte}.
+    """
+    taxed = apply_tax_policy(cube, policy)
+    return dict(tax_tables(taxed), pedidos=taxed)
+
+
+def tax_tables(taxed):
+    """Tabelas de tax_report (sem 'pedidos') a partir das linhas consideradas.
+
+    taxed: linhas com 'Data', 'Filtro_Aplicado', canal, conta, impostos, faturamento e
+    'Pedidos' (apply_tax_policy sobre o cubo, ou o cubo mensal do duckdb_engine).
+    """
+    months = taxed['Data'].dt.to_period('M')
+
+    summary = taxed.groupby([months.astype(str), 'Filtro_Aplicado'])['Pedidos'].sum().reset_index(name='Quantidade')
+
+    monthly = taxed.groupby(months).agg({
+        'Imposto (-)': 'sum',
+        'Faturamento': 'sum'
+    }).reset_index()
+    monthly['Data_str'] = monthly['Data'].astype(str)
+    monthly['% Imposto'] = np.where(
+        monthly['Faturamento'] > 0,
+        (monthly['Imposto (-)'] / monthly['Faturamento'] * 100),
+        0
+    )
+
+    breakdown = taxed.groupby(['Canal de Venda', 'Conta'], observed=True).agg({
+        'Imposto (-)': 'sum',
+        'Faturamento': 'sum',
+        'Pedidos': 'sum'
+    }).reset_index().rename(columns={'Pedidos': 'Qtd. Pedidos'})
+    breakdown['% Imposto'] = np.where(
+        breakdown['Faturamento'] > 0,
+        (breakdown['Imposto (-)'] / breakdown['Faturamento'] * 100),
+        0
+    )
+
+    impostos = taxed['Imposto (-)'].sum()
+    faturamento = taxed['Faturamento'].sum()
+    return {
+        'resumo_filtros': summary,
+        'mensal': monthly,
+        'canal_conta': breakdown,
+        'totais': {
+            'impostos': impostos,
+            'faturamento': faturamento,
+            'percentual': (impostos / faturamento * 100) if faturamento > 0 else 0,
+            'pedidos': int(taxed['Pedidos'].sum()),
+        },
+    }
+
+
+class FrameSlice:
+    """Recorte filtrado em memória: pedidos e cubo diário com os filtros da barra lateral.
+
+    Mesma interface de duckdb_engine.DuckDBSlice, com as funções deste módulo: o
+    dashboard pede cada agregação ao recorte, sem depender do motor. source são os
+    pedidos completos, de onde sai o período anterior (padrão: os próprios pedidos).
+    """
+
+    def __init__(self, orders, cube=None, source=None):
+        self.orders = orders
+        self.cube = cube
+        self.source = orders if source is None else source
+        self.columns = list(orders.columns)
+
+    def narrow(self, origem=None, skus=None):
+        """Recorte restrito a uma origem de aquisição e/ou a uma lista de SKUs (vazia: todos)."""
+        orders, cube = self.orders, self.cube
+        if origem is not None:
+            orders = orders[orders['Origem de Aquisição'] == origem]
+            cube = cube[cube['Origem de Aquisição'] == origem] if cube is not None else None
+        if skus:
+            orders = orders[orders['SKU'].isin(skus)]
+            cube = cube[cube['SKU'].isin(skus)] if cube is not None else None
+        return FrameSlice(orders, cube, self.source)
+
+    def count(self):
+        return len(self.orders)
+
+    def date_range(self):
+        """Primeira e última 'Data' do recorte (NaT se vazio)."""
+        return self.orders['Data'].min(), self.orders['Data'].max()
+
+    def distinct(self, column):
+        """Valores presentes de column, em ordem alfabética."""
+        return sorted(self.orders[column].dropna().unique().tolist())
+
+    def previous_period(self):
+        """Pedidos do período anterior de mesma duração (get_previous_period_data); None se o recorte é vazio."""
+        if self.orders.empty:
+            return None
+        return FrameSlice(get_previous_period_data(self.source, self.orders, None))
+
+    def overview_kpis(self, previous=None):
+        return overview_kpis(self.cube, previous.orders if previous is not None else None)
+
+    def channel_metrics(self, previous=None):
+        return channel_metrics(self.cube, previous.orders if previous is not None else None)
+
+    def monthly_sales(self, value_column='Faturamento'):
+        return monthly_sales(self.cube, value_column)
+
+    def origin_monthly(self, value_column='Faturamento', status=None):
+        return origin_monthly(self.cube, value_column, status)
+
+    def orders_by_channel_status(self):
+        return orders_by_channel_status(self.cube)
+
+    def orders_by_channel(self):
+        return orders_by_channel(self.cube)
+
+    def daily_orders(self):
+        return daily_orders(self.cube)
+
+    def daily_channel_pivots(self):
+        return daily_channel_pivots(self.cube)
+
+    def order_counts(self, column):
+        return order_counts(self.orders, column)
+
+    def shipping_distribution(self):
+        return shipping_distribution(self.orders)
+
+    def sku_options(self):
+        return sku_options(self.orders)
+
+    def sku_totals(self):
+        return sku_totals(self.orders)
+
+    def sku_summary(self):
+        return sku_summary(self.orders)
+
+    def sku_monthly_totals(self):
+        return sku_monthly_totals(self.orders)
+
+    def sku_monthly_comparison(self, by_channel=False, label_length=100):
+        return sku_monthly_comparison(self.orders, by_channel, label_length)
+
+    def sku_monthly_performance(self, group_column='SKU'):
+        return sku_monthly_performance(self.orders, group_column)
+
+    def pricing_monthly(self):
+        return pricing_monthly(self.orders)
+
+    def tax_report(self, policy):
+        return tax_report(self.cube, policy)
@@ -0,0 +1,324 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import duckdb_engine
+from analytics import (PERIOD_OPTIONS, add_sku_columns, apply_filters, build_daily_cube, build_sku_search_index,
+                       channel_metrics, daily_channel_pivots, daily_orders, get_previous_period_data, load_tax_policy,
+                       monthly_sales, orders_by_channel, orders_by_channel_status, origin_monthly, overview_kpis,
+                       pricing_monthly, pricing_pivot, search_skus, shipping_distribution, sku_evolution_pivot,
+                       sku_monthly_comparison, sku_monthly_performance, sku_monthly_totals, sku_summary, sku_totals,
+                       tax_report)
+from generate_data import build_catalog, daily_counts, generate_exports, generate_orders
+from ingestion import clean_export, discover_exports, encode_dimensions, fill_missing_ids, load_exports
+
+# Diretório dos resultados: um JSON por execução, para acompanhar a evolução
+RESULTS_DIR = os.environ.get("DASHBOARD_BENCHMARK_DIR", "benchmarks")
+
+# Até este total de pedidos os dados sintéticos passam por planilhas .xlsx (carga
+# completa); acima dele são gerados em memória e só a limpeza é medida
+EXCEL_MAX_ROWS = 200_000
+
+
+def _rows(result):
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return len(result)
+    if isinstance(result, tuple):
+        return _rows(result[0])
+    if isinstance(result, dict):
+        return len(result)
+    return None
+
+
+def _measure(stages, name, repeats, func):
+    """Executa func repeats vezes e guarda min/mediana/máx do tempo e as linhas do resultado."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    stages[name] = {
+        'min_s': min(times),
+        'mediana_s': statistics.median(times),
+        'max_s': max(times),
+        'linhas_saida': _rows(result),
+    }
+    print(f"  {name:<28} {statistics.median(times):9.4f}s  ({stages[name]['linhas_saida']} linhas)")
+    return result
+
+
+def _cold_load(paths):
+    # Cache vazio a cada execução: leitura das planilhas, limpeza e consolidação
+    cache_dir = tempfile.mkdtemp(prefix='benchmark_cache_')
+    try:
+        return load_exports(paths, cache_dir=cache_dir, parallel=True)[0]
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def _clean_in_memory(raw):
+    # Mesmas etapas da carga, a partir do frame gerado (sem a leitura da planilha)
+    df, _ = clean_export(raw.copy())
+    df = encode_dimensions(df).sort_values('Data', kind='stable', ignore_index=True)
+    return fill_missing_ids(df)
+
+
+# Agregações de cada seção de relatórios: as mesmas funções que o dashboard chama
+
+def _faturamento(filtered_cube, value_column='Faturamento'):
+    return (monthly_sales(filtered_cube, value_column), origin_monthly(filtered_cube, value_column),
+            orders_by_channel_status(filtered_cube), orders_by_channel(filtered_cube),
+            daily_orders(filtered_cube), daily_channel_pivots(filtered_cube))
+
+
+def _skus(filtered_df):
+    performance = sku_monthly_performance(filtered_df)
+    return (sku_summary(filtered_df), sku_totals(filtered_df), sku_evolution_pivot(performance),
+            sku_monthly_totals(filtered_df), sku_monthly_comparison(filtered_df),
+            sku_monthly_comparison(filtered_df, by_channel=True, label_length=15))
+
+
+def _precos(filtered_df):
+    return pricing_pivot(pricing_monthly(filtered_df))
+
+
+def _sku_search(filtered_df):
+    index = build_sku_search_index(filtered_df)
+    return search_skus(index, desc_term='suporte')
+
+
+def _same_result(expected, actual):
+    # Chaves, índices e contagens iguais; somas de ponto flutuante iguais até o arredondamento
+    # (a ordem das parcelas difere entre pandas e DuckDB)
+    if isinstance(expected, dict):
+        return (set(expected) == set(actual)
+                and all(_same_result(expected[key], actual[key]) for key in actual))
+    if isinstance(expected, tuple):
+        return len(expected) == len(actual) and all(map(_same_result, expected, actual))
+    try:
+        if isinstance(expected, pd.DataFrame):
+            pd.testing.assert_frame_equal(expected, actual, check_dtype=False, check_categorical=False,
+                                          check_index_type=False, check_column_type=False, rtol=1e-9, atol=1e-6)
+        elif isinstance(expected, pd.Series):
+            pd.testing.assert_series_equal(expected, actual, check_dtype=False, check_categorical=False,
+                                           check_index_type=False, rtol=1e-9, atol=1e-6)
+        else:
+            return bool(np.isclose(expected, actual, rtol=1e-9, atol=1e-6))
+    except AssertionError:
+        return False
+    return True
+
+
+def _duckdb_check(df, cube, engine, filters, today, policy):
+    """Nomes das consultas do DuckDB cujo resultado difere do pandas, para cada combinação de filtros."""
+    divergences = []
+    for args in filters:
+        filtered_df = apply_filters(df, *args, today)
+        filtered_cube = apply_filters(cube, *args, today)
+        query = engine.filter(*args, today=today)
+        tax = tax_report(filtered_cube, policy)
+        del tax['pedidos']  # linhas consideradas: o DuckDB não as retorna
+        pairs = {
+            'vendas_mensais': (monthly_sales(filtered_cube), query.monthly_sales()),
+            'vendas_mensais_margem': (monthly_sales(filtered_cube, 'Margem Contrib. (=)'),
+                                      query.monthly_sales('Margem Contrib. (=)')),
+            'pivots_diarios': (daily_channel_pivots(filtered_cube), query.daily_channel_pivots()),
+            'skus': (sku_summary(filtered_df), query.sku_summary()),
+            'impostos': (tax, query.tax_report(policy)),
+        }
+        period, _, _, canal, conta = args
+        divergences.extend(f"{name} [{period}, {canal}, {conta}]" for name, (expected, actual) in pairs.items()
+                           if not _same_result(expected, actual))
+    return divergences
+
+
+def benchmark_duckdb(df, cube, stages, repeats, filters, today, policy, period_type="Todos os dados"):
+    """Mede as consultas do motor DuckDB sobre os pedidos df gravados em Parquet e as confere com o pandas."""
+    store_dir = tempfile.mkdtemp(prefix='benchmark_duckdb_')
+    try:
+        store_path = os.path.join(store_dir, 'pedidos.parquet')
+        df.to_parquet(store_path, index=False)
+        engine = _measure(stages, 'duckdb_abertura', repeats, lambda: duckdb_engine.DuckDBEngine(store_path))
+        query = engine.filter(*filters[0], today=today)
+        _measure(stages, 'duckdb_vendas_mensais', repeats, query.monthly_sales)
+        _measure(stages, 'duckdb_pivots_diarios', repeats, query.daily_channel_pivots)
+        _measure(stages, 'duckdb_skus', repeats, query.sku_summary)
+        _measure(stages, 'duckdb_impostos', repeats, lambda: query.tax_report(policy))
+
+        divergences = _measure(stages, 'duckdb_conferencia', 1,
+                               lambda: _duckdb_check(df, cube, engine, filters, today, policy))
+        stages['duckdb_conferencia']['divergencias'] = divergences
+        for divergence in divergences:
+            print(f"  DIVERGÊNCIA duckdb x pandas: {divergence}")
+    finally:
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+
+def benchmark_frame(df, stages, repeats, period_type="Todos os dados", duckdb=False):
+    """Mede preparação, filtros, KPIs e as agregações de cada seção sobre os pedidos df.
+
+    Os períodos relativos contam a partir do último dia dos dados, para que o
+    resultado não dependa da data em que o benchmark roda. Com duckdb, mede também
+    o motor DuckDB e confere seus resultados com o pandas em todos os períodos.
+    """
+    _measure(stages, 'colunas_sku', repeats, lambda: add_sku_columns(df))
+    cube = _measure(stages, 'cubo_diario', repeats, lambda: build_daily_cube(df))
+
+    today = df['Data'].max().date()
+    start_date, end_date = today - timedelta(days=90), today
+    for period in PERIOD_OPTIONS:
+        _measure(stages, f'filtro[{period}]', repeats, lambda: (
+            apply_filters(df, period, start_date, end_date, "Todos", "Todas", today),
+            apply_filters(cube, period, start_date, end_date, "Todos", "Todas", today),
+        ))
+    canal, conta = df['Canal de Venda'].iloc[0], df['Conta'].iloc[0]
+    _measure(stages, 'filtro[canal e conta]', repeats, lambda: (
+        apply_filters(df, period_type, start_date, end_date, canal, conta, today),
+        apply_filters(cube, period_type, start_date, end_date, canal, conta, today),
+    ))
+
+    filtered_df = apply_filters(df, period_type, start_date, end_date, "Todos", "Todas", today)
+    filtered_cube = apply_filters(cube, period_type, start_date, end_date, "Todos", "Todas", today)
+    previous_df = _measure(stages, 'periodo_anterior', repeats,
+                           lambda: get_previous_period_data(df, filtered_df, period_type))
+    _measure(stages, 'kpis_visao_geral', repeats, lambda: overview_kpis(filtered_cube, previous_df))
+    _measure(stages, 'metricas_canal', repeats, lambda: channel_metrics(filtered_cube, previous_df))
+
+    _measure(stages, 'secao_faturamento', repeats, lambda: _faturamento(filtered_cube))
+    _measure(stages, 'secao_skus', repeats, lambda: _skus(filtered_df))
+    _measure(stages, 'secao_skus_busca', repeats, lambda: _sku_search(filtered_df))
+    _measure(stages, 'secao_skus_precos', repeats, lambda: _precos(filtered_df))
+    _measure(stages, 'secao_canal_envio', repeats, lambda: shipping_distribution(filtered_df))
+    policy = load_tax_policy()
+    _measure(stages, 'secao_impostos', repeats, lambda: tax_report(filtered_cube, policy))
+
+    if duckdb:
+        filters = [(period_type, start_date, end_date, "Todos", "Todas")]
+        filters += [(period, start_date, end_date, "Todos", "Todas") for period in PERIOD_OPTIONS if period != period_type]
+        filters.append((period_type, start_date, end_date, canal, conta))
+        benchmark_duckdb(df, cube, stages, repeats, filters, today, policy)
+    return stages
+
+
+def run_synthetic(rows, skus, start, days, seed, repeats, excel_max_rows=EXCEL_MAX_ROWS, duckdb=False):
+    """Benchmark completo sobre dados sintéticos de rows pedidos. Retorna o dicionário do resultado."""
+    stages = {}
+    if rows <= excel_max_rows:
+        origin = 'excel'
+        data_dir = tempfile.mkdtemp(prefix='benchmark_dados_')
+        try:
+            paths = generate_exports(data_dir, rows, skus, start, days, seed)
+            df = _measure(stages, 'carga_planilhas', repeats, lambda: _cold_load(paths))
+            cache_dir = os.path.join(data_dir, '.dashboard_cache')
+            load_exports(paths, cache_dir=cache_dir)
+            df = _measure(stages, 'carga_cache', repeats, lambda: load_exports(paths, cache_dir=cache_dir)[0])
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    else:
+        origin = 'memoria'
+        rng = np.random.default_rng(seed)
+        catalog = build_catalog(skus, rng)
+        dates, counts = daily_counts(rows, start, days, rng)
+        raw = generate_orders(catalog, dates, counts, rng, formatted=False)
+        df = _measure(stages, 'limpeza', repeats, lambda: _clean_in_memory(raw))
+        del raw
+
+    benchmark_frame(df, stages, repeats, duckdb=duckdb)
+    return {'linhas': len(df), 'skus': skus, 'inicio': start, 'dias': days, 'semente': seed,
+            'origem': origin, 'etapas': stages}
+
+
+def run_exports(data_dir, repeats, duckdb=False):
+    """Benchmark sobre as exportações reais de data_dir (carga sem cache e com cache)."""
+    stages = {}
+    paths = discover_exports(data_dir)
+    df = _measure(stages, 'carga_planilhas', repeats, lambda: _cold_load(paths))
+    cache_dir = tempfile.mkdtemp(prefix='benchmark_cache_')
+    try:
+        load_exports(paths, cache_dir=cache_dir)
+        df = _measure(stages, 'carga_cache', repeats, lambda: load_exports(paths, cache_dir=cache_dir)[0])
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    benchmark_frame(df, stages, repeats, duckdb=duckdb)
+    return {'linhas': len(df), 'arquivos': len(paths), 'origem': 'exportacoes', 'etapas': stages}
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'duckdb': duckdb_engine.duckdb.__version__ if duckdb_engine.duckdb is not None else None,
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(current, previous_path):
+    """Imprime a razão de tempo (mediana) de cada etapa em relação a um resultado anterior."""
+    with open(previous_path, encoding='utf-8') as f:
+        previous = json.load(f)
+    before = {(run['linhas'], name): stage['mediana_s']
+              for run in previous['execucoes'] for name, stage in run['etapas'].items()}
+    print(f"\nComparação com {previous_path} ({previous['data']}):")
+    for run in current['execucoes']:
+        for name, stage in run['etapas'].items():
+            old = before.get((run['linhas'], name))
+            if old:
+                print(f"  {run['linhas']:>10,} {name:<28} {old:9.4f}s -> {stage['mediana_s']:9.4f}s "
+                      f"({stage['mediana_s'] / old:.2f}x)")
+
+
+if __name__ == "__main__":
+    # Mede carga, filtros, KPIs e as agregações de cada seção e grava o resultado em JSON:
+    #   python benchmark.py --linhas 10000 100000 1000000 --comparar benchmarks/anterior.json
+    #   python benchmark.py --dados /caminho/das/exportacoes
+    parser = argparse.ArgumentParser(description="Benchmark do dashboard com dados sintéticos ou exportações reais.")
+    parser.add_argument("--linhas", type=int, nargs='+', default=[10_000, 100_000],
+                        help="totais de pedidos sintéticos medidos (padrão: 10000 100000)")
+    parser.add_argument("--skus", type=int, default=500, help="SKUs distintos nos dados sintéticos (padrão: 500)")
+    parser.add_argument("--inicio", default="2024-01-01", help="primeiro dia dos dados sintéticos (padrão: 2024-01-01)")
+    parser.add_argument("--dias", type=int, default=365, help="dias cobertos pelos dados sintéticos (padrão: 365)")
+    parser.add_argument("--semente", type=int, default=0, help="semente do gerador (padrão: 0)")
+    parser.add_argument("--repeticoes", type=int, default=3, help="execuções de cada etapa (padrão: 3)")
+    parser.add_argument("--max-excel", type=int, default=EXCEL_MAX_ROWS,
+                        help=f"maior total gravado em planilhas; acima, gera em memória (padrão: {EXCEL_MAX_ROWS})")
+    parser.add_argument("--dados", help="mede as exportações deste diretório em vez de dados sintéticos")
+    parser.add_argument("--saida", help=f"arquivo JSON do resultado (padrão: {RESULTS_DIR}/benchmark_<data>.json)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparação")
+    parser.add_argument("--duckdb", action="store_true",
+                        help="mede também o motor DuckDB e confere seus resultados com o pandas")
+    args = parser.parse_args()
+    if args.duckdb and duckdb_engine.duckdb is None:
+        parser.error("--duckdb requer o pacote duckdb (pip install duckdb)")
+
+    result = {'data': datetime.now().isoformat(timespec='seconds'), 'ambiente': environment(),
+              'repeticoes': args.repeticoes, 'execucoes': []}
+    if args.dados:
+        print(f"Exportações de {args.dados}:")
+        result['execucoes'].append(run_exports(args.dados, args.repeticoes, args.duckdb))
+    else:
+        for rows in args.linhas:
+            print(f"{rows:,} pedidos sintéticos:")
+            result['execucoes'].append(
+                run_synthetic(rows, args.skus, args.inicio, args.dias, args.semente, args.repeticoes, args.max_excel,
+                              args.duckdb)
+            )
+
+    output = args.saida or os.path.join(RESULTS_DIR, f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\nResultado gravado em {output}")
+
+    if args.comparar:
+        compare(result, args.comparar)
@@ -0,0 +1,158 @@
+import datetime
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Orçamento de pontos dos gráficos de linha: acima dele (somando as séries da figura)
+# as séries passam para Scattergl (WebGL), e cada série maior que ele é reduzida por LTTB
+MAX_POINTS = int(os.environ.get("DASHBOARD_CHART_MAX_POINTS", "1000"))
+
+# Entradas do cache de figuras (compartilhado entre sessões)
+FIGURE_CACHE_ENTRIES = int(os.environ.get("DASHBOARD_FIGURE_CACHE_ENTRIES", "64"))
+
+# Atributos por ponto que acompanham x/y na redução
+_POINT_ATTRIBUTES = ('x', 'y', 'customdata', 'text', 'hovertext')
+
+
+def _x_positions(x):
+    """Posição numérica de cada x (datas em ns; categorias/textos pela ordem)."""
+    values = np.asarray(x)
+    if np.issubdtype(values.dtype, np.number):
+        return values.astype(float)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[ns]').astype(np.int64).astype(float)
+    if len(values) and isinstance(values[0], (datetime.date, pd.Timestamp)):
+        return pd.to_datetime(values).asi8.astype(float)
+    return np.arange(len(values), dtype=float)
+
+
+def lttb_indices(x, y, n_out):
+    """Índices dos pontos mantidos pelo Largest-Triangle-Three-Buckets, em ordem.
+
+    Mantém o primeiro e o último ponto e, em cada balde intermediário, o ponto que
+    forma o maior triângulo com o escolhido antes e a média do balde seguinte. O
+    máximo e o mínimo da série são sempre mantidos (picos não somem), sem passar de
+    n_out pontos.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = _x_positions(x)
+    y_calc = np.where(np.isfinite(y), y, 0.0)
+    edges = (np.arange(n_out - 1) * (n - 2) / (n_out - 2)).astype(int) + 1
+    edges[-1] = n - 1
+
+    # Média de cada balde (o último "balde seguinte" é o ponto final)
+    counts = np.diff(np.append(edges, n))
+    avg_x = np.add.reduceat(x, edges) / counts
+    avg_y = np.add.reduceat(y_calc, edges) / counts
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        x_prev, y_prev = x[previous], y_calc[previous]
+        area = np.abs((x_prev - avg_x[i + 1]) * (y_calc[start:end] - y_prev)
+                      - (x_prev - x[start:end]) * (avg_y[i + 1] - y_prev))
+        previous = start + int(area.argmax())
+        selected[i + 1] = previous
+
+    if np.isfinite(y).any():
+        # Cada extremo fora da seleção toma o lugar do ponto escolhido mais próximo do seu
+        # balde (nunca o máximo já colocado): o total continua n_out (com n_out == 3 só
+        # cabe um, o máximo)
+        extremes = list(dict.fromkeys([int(np.nanargmax(y)), int(np.nanargmin(y))]))
+        for k, extreme in enumerate(extremes):
+            if extreme in selected:
+                continue
+            slot = int(np.searchsorted(edges, extreme, side='right'))
+            free = [i for i in range(1, n_out - 1) if selected[i] not in extremes[:k]]
+            if free:
+                selected[min(free, key=lambda i: abs(i - slot))] = extreme
+        selected.sort()
+    return selected
+
+
+def _webgl_trace(trace, max_points):
+    props = trace.to_plotly_json()
+    props.pop('type', None)
+    n = len(trace.y)
+    if n > max_points:
+        keep = lttb_indices(trace.x if trace.x is not None else np.arange(n), trace.y, max_points)
+        for name in _POINT_ATTRIBUTES:
+            values = props.get(name)
+            if values is not None and not isinstance(values, str) and len(values) == n:
+                props[name] = np.asarray(values)[keep]
+    # Atributos sem equivalente no Scattergl (ex.: 'orientation' do px.line) são ignorados
+    return go.Scattergl(props, skip_invalid=True)
+
+
+def optimize_figure(fig, max_points=MAX_POINTS):
+    """Figura pronta para muitos pontos: Scattergl e LTTB acima de max_points.
+
+    Até max_points pontos somando as séries de linha, a figura volta como está. Acima
+    disso as séries Scatter viram Scattergl, e as que sozinhas passam de max_points
+    são reduzidas por LTTB (picos preservados). Barras e outros traços não mudam.
+    """
+    lines = [trace for trace in fig.data if trace.type == 'scatter' and trace.y is not None]
+    if sum(len(trace.y) for trace in lines) <= max_points:
+        return fig
+
+    traces = [
+        _webgl_trace(trace, max_points) if trace.type == 'scatter' and trace.y is not None else trace
+        for trace in fig.data
+    ]
+    # Troca os traços na própria figura: recriá-la copiaria layout e template inteiros
+    fig.data = []
+    fig.add_traces(traces)
+    return fig
+
+
+def figure_fingerprint(*parts):
+    """Hash das partes que determinam um gráfico: agregados (DataFrame/Series) e opções."""
+    digest = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, (pd.DataFrame, pd.Series)):
+            columns = list(part.columns) if isinstance(part, pd.DataFrame) else [part.name]
+            digest.update(repr((columns, [str(dtype) for dtype in np.atleast_1d(part.dtypes)], part.shape)).encode())
+            digest.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+        else:
+            digest.update(repr(part).encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class _SerializedFigure(go.Figure):
+    """Figura do cache com o dicionário do gráfico montado uma única vez.
+
+    st.plotly_chart só aceita a figura (ou um dicionário, que ele valida de novo) e
+    chama to_dict() a cada exibição, uma cópia profunda de dados e layout antes do
+    JSON; aqui to_dict() devolve sempre o mesmo dicionário, e a cada exibição resta
+    só a serialização.
+    """
+
+    def __init__(self, fig):
+        super().__init__(fig)
+        self._spec = super().to_dict()
+
+    def to_dict(self):
+        return self._spec
+
+
+def cached_figure(cache, name, parts, build):
+    """Figura do gráfico name, reaproveitada enquanto as partes (agregados e opções) não mudam.
+
+    Em falta, build() monta a figura, que passa por optimize_figure e tem o dicionário
+    do gráfico montado antes de ir para o cache (um kpi_cache.LRUCache). A figura
+    devolvida é compartilhada entre sessões e reruns: não deve ser alterada depois
+    (st.plotly_chart só a lê).
+    """
+    return cache.get_or_compute((name, figure_fingerprint(*parts)),
+                                lambda: _SerializedFigure(optimize_figure(build())))
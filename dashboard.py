@@ -3,10 +3,22 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
 import numpy as np
 import hashlib
+import uuid
+
+from analytics import (PERIOD_OPTIONS, FrameSlice, add_sku_columns, apply_filters, build_daily_cube,
+                       build_sku_search_index, load_tax_policy, month_order, pricing_pivot, search_skus,
+                       sku_evolution_pivot, sku_search_index, tax_policy_legend)
+from charts import FIGURE_CACHE_ENTRIES, cached_figure
+from duckdb_engine import engine_requested, engine_unavailable_reason, open_engine
+from ingestion import DataLoadError, discover_exports, load_exports, refresh_store
+from kpi_cache import LRUCache
+from profiling import PROFILE_LOG_FILE, PROFILING, Profiler
+from report_bundle import REPORT_BUNDLE, read_bundle
+from tables import render_paged_table, render_paged_table_fragment, render_table
 
 # Sistema de autenticação
 def check_password():
@@ -50,26 +62,6 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Na função load_data(), substitua o caminho fixo por:
-@st.cache_data
-def load_data():
-    # Procurar pelo arquivo na pasta atual
-    possible_files = [
-        "MercadoTurbo_Financeiro_01_07_2025_a_31_07_2025.xlsx",
-        "dados.xlsx",  # nome alternativo
-        # adicione outros nomes possíveis
-    ]
-    
-    file_path = None
-    for filename in possible_files:
-        if os.path.exists(filename):
-            file_path = filename
-            break
-    
-    if not file_path:
-        st.error("Arquivo de dados não encontrado!")
-        return pd.DataFrame()
-
 # Configuração da página
 st.set_page_config(
     page_title="Dashboard",
@@ -79,729 +71,551 @@ st.set_page_config(
 )
 
 # Função para carregar dados
-@st.cache_data
-def load_data():
-    file_path = r"MercadoTurbo_Financeiro_01_07_2025_a_31_07_2025.xlsx"
+# cache_resource: todas as sessões recebem os mesmos objetos, sem cópia por rerun;
+# por isso os dados carregados são somente leitura (filtros devolvem views/recortes)
+@st.cache_resource
+def _load_data(files_signature):
+    paths = [path for path, _, _ in files_signature]
     
     try:
-        # Tentar identificar automaticamente a linha de cabeçalho (primeira que contenha 'Data')
-        df = None
-        for header_row in range(5):  # tentar nas 5 primeiras linhas
-            tmp = pd.read_excel(file_path, header=header_row)
-            if any(str(col).strip().lower() == 'data' for col in tmp.columns):
-                df = tmp.copy()
-                break
-        if df is None:
-            # Fallback: lê normalmente
-            df = pd.read_excel(file_path)
-        # Remover colunas sem nome (geralmente índices vazios do Excel)
-        df = df.loc[:, ~df.columns.astype(str).str.contains('^Unnamed')]
-        
-        # Limpeza e formatação dos dados
-        # Converter colunas monetárias
-        money_columns = ['Valor Unit.', 'Faturamento', 'Custo (-)', 'Imposto (-)', 
-                        'Tarifa de Venda (-)', 'Frete Comprador (-)', 'Frete Vendedor (-)', 
-                        'Margem Contrib. (=)']
-        
-        for col in money_columns:
-            if col in df.columns:
-                # Verifica o tipo da coluna para evitar remover casas decimais de valores já numéricos
-                if df[col].dtype == 'O':
-                    # Limpeza de strings monetárias no formato brasileiro
-                    df[col] = (
-                        df[col]
-                        .astype(str)
-                        .str.replace('R$ ', '', regex=False)
-                        .str.replace('.', '', regex=False)
-                        .str.replace(',', '.', regex=False)
-                    )
-                    df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-                else:
-                    # Já é numérico, apenas garante coerção e trata NaNs
-                    df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-        
-        # Converter percentuais
-        if 'MC em %' in df.columns:
-            if df['MC em %'].dtype == 'O':
-                df['MC em %'] = (
-                    df['MC em %']
-                    .astype(str)
-                    .str.replace('%', '', regex=False)
-                    .str.replace(',', '.', regex=False)
-                )
-                df['MC em %'] = pd.to_numeric(df['MC em %'], errors='coerce').fillna(0) / 100
-            else:
-                # Se já estiver numérica (0 a 1), apenas garante coerção
-                df['MC em %'] = pd.to_numeric(df['MC em %'], errors='coerce').fillna(0)
-        
-        # Normalizar nomes das colunas para facilitar busca
-        df.columns = [col.strip() for col in df.columns]
-        # Procurar coluna de data (case insensitive, sem espaços)
-        data_candidates = [col for col in df.columns if col.strip().lower() == 'data']
-        if not data_candidates:
-            st.error(f"Erro: Coluna 'Data' não encontrada no arquivo. Colunas disponíveis: {list(df.columns)}")
-            return pd.DataFrame()
-        # Renomear para 'Data' se necessário
-        if data_candidates[0] != 'Data':
-            df = df.rename(columns={data_candidates[0]: 'Data'})
-        # Converter para datetime
-        df['Data'] = pd.to_datetime(df['Data'], dayfirst=True, errors='coerce')
-        if df['Data'].isna().all():
-            st.error("Erro: Nenhuma data válida encontrada na coluna 'Data'.")
-            return pd.DataFrame()
-        if df['Data'].isna().any():
-            st.warning("Aviso: Algumas datas não puderam ser convertidas e serão removidas.")
-        df = df.dropna(subset=['Data'])
-        # Colunas auxiliares
-        df['Ano'] = df['Data'].dt.year
-        df['Mes'] = df['Data'].dt.month
-        df['Dia'] = df['Data'].dt.day
-        df['Semana'] = df['Data'].dt.isocalendar().week
-        
-        # Garantir que Qtd. seja numérica
-        if 'Qtd.' in df.columns:
-            df['Qtd.'] = pd.to_numeric(df['Qtd.'], errors='coerce').fillna(0)
-        
-        # Criar coluna de ID único se não existir
-        if 'ID da venda' not in df.columns:
-            df['ID da venda'] = range(1, len(df) + 1)
-        
-        return df
-    
+        # Arquivos em cache (Parquet) não são lidos novamente; os demais são lidos em paralelo
+        df, avisos = load_exports(paths)
     except FileNotFoundError:
-        st.error("Arquivo não encontrado! Verifique se o arquivo existe no caminho especificado.")
-        return pd.DataFrame()
+        st.error("Arquivo de dados não encontrado!")
+        return pd.DataFrame(), pd.DataFrame()
+    except DataLoadError as e:
+        st.error(str(e))
+        return pd.DataFrame(), pd.DataFrame()
     except Exception as e:
         st.error(f"Erro ao carregar o arquivo: {str(e)}")
-        return pd.DataFrame()
-
-# Função para filtrar dados por período
-def filter_by_period(df, period_type, start_date=None, end_date=None):
-    if df.empty:
-        return df
+        return pd.DataFrame(), pd.DataFrame()
     
-    today = datetime.now().date()
+    for aviso in avisos:
+        st.warning(aviso)
     
-    if period_type == "Personalizado":
-        if start_date and end_date:
-            return df[(df['Data'].dt.date >= start_date) & (df['Data'].dt.date <= end_date)]
-    elif period_type == "Últimos 7 dias":
-        start = today - timedelta(days=7)
-        return df[df['Data'].dt.date >= start]
-    elif period_type == "Últimos 15 dias":
-        start = today - timedelta(days=15)
-        return df[df['Data'].dt.date >= start]
-    elif period_type == "Últimos 30 dias":
-        start = today - timedelta(days=30)
-        return df[df['Data'].dt.date >= start]
-    elif period_type == "Mês atual":
-        return df[(df['Data'].dt.month == today.month) & (df['Data'].dt.year == today.year)]
-    elif period_type == "Diário":
-        return df[df['Data'].dt.date == today]
+    # Colunas derivadas de SKU/descrição calculadas uma única vez
+    df = add_sku_columns(df)
     
-    return df
+    # Cubo diário (dia × canal × conta × status × SKU × origem) para as seções agregadas
+    return df, build_daily_cube(df)
+
+
+# Motor DuckDB (DASHBOARD_ENGINE=duckdb) sobre o consolidado em Parquet da versão dos
+# dados: o consolidado é atualizado sem carregar os pedidos no pandas e todas as seções
+# viram consultas SQL. None quando o motor é o pandas ou o consolidado não pôde ser
+# atualizado (a carga em memória mostra o erro)
+@st.cache_resource
+def get_query_engine(files_signature):
+    if not engine_requested():
+        return None
+    try:
+        avisos = refresh_store([path for path, _, _ in files_signature])
+    except Exception:
+        return None
 
-# Função para calcular período anterior
-def get_previous_period_data(df, current_df, period_type):
-    if df.empty or current_df.empty:
-        return pd.DataFrame()
-    
-    current_start = current_df['Data'].min()
-    current_end = current_df['Data'].max()
-    period_length = (current_end - current_start).days
-    
-    if period_length == 0:
-        period_length = 1  # Para períodos de um dia
+    for aviso in avisos:
+        st.warning(aviso)
+    return open_engine()
+
+
+def load_data():
+    # Retorna (motor DuckDB, pedidos, cubo diário, versão dos dados): com o motor os
+    # pedidos não são carregados (pedidos e cubo None); sem ele o motor é None
+    # Todas as exportações do diretório de dados (DASHBOARD_DATA_DIR); a assinatura
+    # (tamanho e data de modificação) faz o cache recarregar quando um arquivo muda
+    files_signature = tuple(
+        (path, os.path.getsize(path), os.path.getmtime(path)) for path in discover_exports()
+    )
+    query_engine = get_query_engine(files_signature)
+    if query_engine is not None:
+        return query_engine, None, None, files_signature
+    df, cube = _load_data(files_signature)
+    return None, df, cube, files_signature
+
+# Índice de busca de SKUs, construído uma vez por versão dos dados (com o motor, a
+# partir do catálogo de SKUs consultado no consolidado)
+@st.cache_resource
+def get_sku_search_index(files_signature):
+    query_engine = get_query_engine(files_signature)
+    if query_engine is not None:
+        return sku_search_index(query_engine.sku_catalog())
+    df, _ = _load_data(files_signature)
+    return build_sku_search_index(df)
+
+# Limites de data e opções de canal e conta da barra lateral, uma vez por versão dos dados
+@st.cache_resource
+def get_filter_options(files_signature):
+    query_engine = get_query_engine(files_signature)
+    if query_engine is not None:
+        all_data = query_engine.filter("Todos os dados", None, None, "Todos", "Todas")
+    else:
+        df, cube = _load_data(files_signature)
+        all_data = FrameSlice(df, cube)
+    first_date, last_date = all_data.date_range()
+    return {
+        'inicio': first_date.date(),
+        'fim': last_date.date(),
+        'canais': all_data.distinct('Canal de Venda'),
+        'contas': all_data.distinct('Conta'),
+    }
+
+# Cache de KPIs compartilhado entre sessões (limites em kpi_cache: DASHBOARD_KPI_CACHE_ENTRIES/_TTL)
+@st.cache_resource
+def get_kpi_cache():
+    return LRUCache()
+
+# Cache de figuras Plotly compartilhado entre sessões, por gráfico e agregados (charts.cached_figure)
+@st.cache_resource
+def get_figure_cache():
+    return LRUCache(max_entries=FIGURE_CACHE_ENTRIES)
+
+# Cards da visão geral: KPIs do período e variação sobre o período anterior
+def render_overview(overview):
+    # Primeira linha - Faturamento
+    col1, col2, col3, col4, col5 = st.columns(5)
+
+    with col1:
+        st.metric("Faturamento Bruto", f"R$ {overview['bruto']:,.2f}", f"{overview['growth_bruto']:+.1f}%")
+
+    with col2:
+        st.metric("Cancelados (R$)", f"R$ {overview['cancelado']:,.2f}", f"{overview['growth_cancelado']:+.1f}%")
+
+    with col3:
+        st.metric("Cancelados (%)", f"{overview['perc_cancelado_fat']:.1f}%", f"{overview['growth_perc_cancelado_fat']:+.1f}%")
+
+    with col4:
+        st.metric("Faturamento Válido", f"R$ {overview['aprovado']:,.2f}", f"{overview['growth_aprovado']:+.1f}%")
+
+    with col5:
+        st.metric("MC (R$)", f"R$ {overview['margem']:,.2f}", f"{overview['growth_margem']:+.1f}%")
+        st.markdown(f'<div style="margin-top: -10px; opacity: 0.6; font-size: 0.8em;">({overview["mc_perc"]:.1f}%)</div>', unsafe_allow_html=True)
+
+    # Segunda linha - Quantidade de Vendas
+    col1, col2, col3, col4, col5 = st.columns(5)
+
+    with col1:
+        st.metric("Total de Vendas (qtd.)", f"{overview['qtd_total']:,}", f"{overview['growth_qtd_total']:+.1f}%")
+
+    with col2:
+        st.metric("Vendas Aprovadas (qtd.)", f"{overview['qtd_aprovada']:,}", f"{overview['growth_qtd_aprovada']:+.1f}%")
+
+    with col3:
+        st.metric("Vendas Canceladas (qtd.)", f"{overview['qtd_cancelada']:,}", f"{overview['growth_qtd_cancelada']:+.1f}%")
+
+    with col4:
+        st.metric("Cancelados (%)", f"{overview['perc_cancelado_qtd']:.1f}%", f"{overview['growth_perc_cancelado_qtd']:+.1f}%")
+
+    with col5:
+        st.metric("Ticket Médio (MC)", f"R$ {overview['ticket_medio']:.2f}", f"{overview['growth_ticket']:+.1f}%")
+
+# Ícone de cada canal nos cards (canais novos usam o padrão)
+CANAL_ICONS = {'Mercado Livre': '🟡', 'Shopee': '🔴'}
+DEFAULT_CANAL_ICON = '⚪'
+
+def render_channel_card(data):
+    icon = CANAL_ICONS.get(data['canal'], DEFAULT_CANAL_ICON)
+    canal = data['canal']
+    st.metric(f"{icon} {canal} (Fat.)", f"R$ {data['aprovado']:,.2f}", f"{data['growth_fat']:+.1f}%")
+    st.markdown(f'<div style="margin-top: -10px; margin-bottom: 5px; opacity: 0.6; font-size: 0.8em;"><strong>MC:</strong> R$ {data["margem"]:,.2f} <strong>({data["mc_perc"]:.1f}%)</strong> | <strong>Bruto:</strong> R$ {data["bruto"]:,.2f} | <strong>Cancelado:</strong> R$ {data["cancelado"]:,.2f} <strong>({data["perc_cancelado_fat"]:.1f}%)</strong></div>', unsafe_allow_html=True)
+    st.metric(f"{icon} {canal} (Qtd.)", f"{data['qtd_aprovada']:,}", f"{data['growth_qtd']:+.1f}%")
+    st.markdown(f'<div style="margin-top: -10px; margin-bottom: 30px; opacity: 0.6; font-size: 0.8em;"><strong>Total:</strong> {data["qtd_total"]:,} | <strong>Canceladas:</strong> {data["qtd_cancelada"]:,} <strong>({data["perc_cancelado_qtd"]:.1f}%)</strong></div>', unsafe_allow_html=True)
+
+def render_account_card(data):
+    icon = CANAL_ICONS.get(data['canal'], DEFAULT_CANAL_ICON)
+    st.metric(f"{icon} {data['conta']}", f"R$ {data['aprovado']:,.2f}", f"{data['growth_fat']:+.1f}%")
+    st.markdown(f'<div style="margin-top: -10px; margin-bottom: 5px; opacity: 0.6; font-size: 0.8em;"><strong>MC:</strong> R$ {data["margem"]:,.2f} <strong>({data["mc_perc"]:.1f}%)</strong> | <strong>Cancel.(Fat.):</strong> {data["perc_cancelado_fat"]:.1f}%</div>', unsafe_allow_html=True)
+    st.markdown(f'<div style="margin-top: -5px; margin-bottom: 20px; opacity: 0.6; font-size: 0.8em;"><strong>Vendas:</strong> {data["qtd_aprovada"]:,} <strong>({data["growth_qtd"]:+.1f}%)</strong> | <strong>Cancel.(Qtd.):</strong> {data["qtd_cancelada"]:,} <strong>({data["perc_cancelado_qtd"]:.1f}%)</strong></div>', unsafe_allow_html=True)
+
+def render_channel_cards(metrics):
+    # Cards gerados a partir dos canais/contas presentes nos dados (lista de métricas de channel_metrics)
+    canais = [data for data in metrics if data['conta'] is None]
     
-    previous_start = current_start - timedelta(days=period_length + 1)
-    previous_end = current_start - timedelta(days=1)
+    # Primeira linha - Totais por Canal
+    if canais:
+        for col, canal_data in zip(st.columns(len(canais)), canais):
+            with col:
+                render_channel_card(canal_data)
     
-    return df[(df['Data'] >= previous_start) & (df['Data'] <= previous_end)]
+    # Linhas seguintes - Por Conta e Canal
+    for canal_data in canais:
+        contas = [data for data in metrics if data['canal'] == canal_data['canal'] and data['conta'] is not None]
+        if contas:
+            for col, conta_data in zip(st.columns(len(contas)), contas):
+                with col:
+                    render_account_card(conta_data)
+
+# Formatos das tabelas de SKUs, preços e impostos (seções ao vivo e relatório pré-calculado)
+SKU_MONEY_COLUMNS = ['Faturamento', 'Custo (-) Total', 'Custo (-) Unitário', 'Imposto (-) Total',
+                     'Imposto (-) Unitário', 'Valor Unit.', 'Frete Vendedor (-)',
+                     'Tarifa de Venda (-) Total', 'Tarifa de Venda (-) Unitária',
+                     'Margem Contrib. (=) Total', 'Margem Contrib. (=) Unitária']
+
+TAX_BREAKDOWN_FORMAT = {
+    'Imposto (-)': 'R$ {:,.2f}',
+    'Faturamento': 'R$ {:,.2f}',
+    '% Imposto': '{:.2f}%',
+    'Qtd. Pedidos': '{:,.0f}'
+}
+
+def sku_table_format(columns):
+    format_dict = {}
+    for col in columns:
+        if col in SKU_MONEY_COLUMNS:
+            format_dict[col] = 'R$ {:,.2f}'
+        elif col == 'Qtd.':
+            format_dict[col] = '{:,.0f}'
+        elif col == 'MC em %':
+            format_dict[col] = '{:.1f}%'
+    return format_dict
+
+def pricing_table_format(columns):
+    # Colunas (mês, métrica): MC (%) em percentual, preço e MC (R$) em reais
+    return {col: '{:.1f}%' if 'MC (%)' in col[1] else 'R$ {:,.2f}' for col in columns}
+
+# Pacote pré-calculado (report_bundle.py), lido uma vez por versão do arquivo
+@st.cache_resource
+def _load_bundle(path, mtime):
+    return read_bundle(path)
+
+def render_report_bundle(path):
+    """Modo somente leitura: exibe o pacote pré-calculado, sem carregar exportações nem recalcular."""
+    try:
+        tables, manifest = _load_bundle(path, os.path.getmtime(path))
+    except Exception as e:
+        st.error(f"Erro ao abrir o relatório pré-calculado: {str(e)}")
+        st.stop()
+
+    periodo = manifest['periodo']
+    if manifest['inicio']:
+        periodo += f" ({manifest['inicio']} a {manifest['fim']})"
+    st.info(
+        f"📦 Relatório pré-calculado (somente leitura), gerado em {manifest['gerado_em']} | "
+        f"Período: {periodo} | Canal: {manifest['canal']} | Conta: {manifest['conta']} | "
+        f"{manifest['pedidos']:,} pedidos"
+    )
+    with open(path, 'rb') as f:
+        st.download_button("Baixar pacote", f.read(), file_name=os.path.basename(path))
+
+    st.header("📈 Visão Geral")
+    render_overview(tables['visao_geral'].to_dict('records')[0])
+
+    st.subheader("Por Canal e Conta")
+    # Contas vazias voltam do arquivo como NaN: None marca os totais do canal
+    canais = tables['canais'].astype(object).where(tables['canais'].notna(), None)
+    render_channel_cards(canais.to_dict('records'))
+    st.markdown("---")
+
+    st.subheader("Vendas")
+    view_option = st.radio("Visualizar por:", ["Faturamento", "Margem de Contribuição"], horizontal=True)
+    monthly_table = tables['vendas_mensais' if view_option == "Faturamento" else 'vendas_mensais_margem']
+    render_table(monthly_table, {col: '{:,.2f}' for col in monthly_table.columns}, use_container_width=True)
+
+    st.subheader("Diário por Conta e Canal")
+    pivot_qtd, pivot_fat = tables['diario_qtd'], tables['diario_faturamento']
+    if not pivot_qtd.empty:
+        st.write("**Vendas Diárias (Qtd.)**")
+        render_paged_table_fragment(pivot_qtd, {col: '{:,.0f}' for col in pivot_qtd.columns}, key="bundle_daily_qtd",
+                           use_container_width=True)
+        st.write("**Faturamento Diário (R$)**")
+        render_paged_table_fragment(pivot_fat, {col: 'R$ {:,.2f}' for col in pivot_fat.columns}, key="bundle_daily_fat",
+                           use_container_width=True)
+    else:
+        st.info("Nenhum dado encontrado para o relatório diário.")
+
+    st.subheader("Margem por SKU")
+    skus = tables['skus']
+    render_paged_table_fragment(skus, sku_table_format(skus.columns), {'MC em %': 'mc'}, key="bundle_sku_table",
+                       use_container_width=True, hide_index=True)
+
+    st.subheader("Evolução de Preços e Margens")
+    pricing_table = tables['precos']
+    bands = {col: 'mc_pricing' for col in pricing_table.columns if 'MC (%)' in col[1]}
+    render_paged_table_fragment(pricing_table, pricing_table_format(pricing_table.columns), bands, key="bundle_pricing_table",
+                       use_container_width=True, height=500)
+
+    st.subheader("Análise de Impostos")
+    totais = tables['impostos_totais'].iloc[0]
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Total Impostos", f"R$ {totais['impostos']:,.2f}")
+    with col2:
+        st.metric("Faturamento Bruto", f"R$ {totais['faturamento']:,.2f}")
+    with col3:
+        st.metric("% Médio de Impostos", f"{totais['percentual']:.2f}%")
+    with col4:
+        st.metric("Pedidos Analisados", f"{int(totais['pedidos']):,}")
+
+    tax_monthly = tables['impostos_mensal'].rename(columns={'Data_str': 'Mês'})
+    st.dataframe(
+        tax_monthly[['Mês', 'Imposto (-)', 'Faturamento', '% Imposto']].style.format(TAX_BREAKDOWN_FORMAT),
+        use_container_width=True,
+        hide_index=True
+    )
+    st.dataframe(tables['impostos_canal_conta'].style.format(TAX_BREAKDOWN_FORMAT), use_container_width=True,
+                 hide_index=True)
+    with st.expander("ℹ️"):
+        st.dataframe(tables['impostos_filtros'], use_container_width=True, hide_index=True)
 
 # Título principal
 st.title("📊 Dashboard")
 st.markdown("---")
 
+# Modo somente leitura (DASHBOARD_REPORT_BUNDLE): o pacote substitui carga, filtros e cálculos
+if REPORT_BUNDLE:
+    render_report_bundle(REPORT_BUNDLE)
+    st.stop()
+
+# Perfil da execução por seção (?profile=1 na URL; DASHBOARD_PROFILING=1 mede todas as
+# sessões): tempo e linhas no painel lateral e no log JSONL rotativo. O pico de memória
+# (tracemalloc, global ao processo) só é medido nas sessões com ?profile=1
+profile_requested = st.query_params.get("profile") == "1"
+profiler = Profiler(
+    PROFILING or profile_requested,
+    session_id=st.session_state.setdefault("profile_session", uuid.uuid4().hex[:12]),
+    memory=profile_requested
+)
+
 # Carregar dados
-df = load_data()
+query_engine, df, cube, data_version = profiler.measure("carga", load_data)
 
-if df.empty:
+if query_engine is None and df.empty:
+    profiler.finish()
     st.stop()
 
+filter_options = get_filter_options(data_version)
+
 # Sidebar para filtros
 st.sidebar.title("🔍 Filtros")
 
 # Filtro de período
-period_options = ["Todos os dados", "Últimos 7 dias", "Últimos 15 dias", 
-                 "Últimos 30 dias", "Mês atual", "Diário", "Personalizado"]
-period_type = st.sidebar.selectbox("Período:", period_options)
+period_type = st.sidebar.selectbox("Período:", PERIOD_OPTIONS)
 
 # Filtro de data personalizada
 if period_type == "Personalizado":
     col1, col2 = st.sidebar.columns(2)
     with col1:
-        start_date = st.date_input("Data início:", df['Data'].min().date())
+        start_date = st.date_input("Data início:", filter_options['inicio'])
     with col2:
-        end_date = st.date_input("Data fim:", df['Data'].max().date())
+        end_date = st.date_input("Data fim:", filter_options['fim'])
 else:
     start_date = end_date = None
 
 # Filtros adicionais
-canal_options = ["Todos"] + sorted(df['Canal de Venda'].dropna().unique().tolist())
+canal_options = ["Todos"] + filter_options['canais']
 canal_selected = st.sidebar.selectbox("Canal de Venda:", canal_options)
 
-conta_options = ["Todas"] + sorted(df['Conta'].dropna().unique().tolist())
+conta_options = ["Todas"] + filter_options['contas']
 conta_selected = st.sidebar.selectbox("Conta:", conta_options)
 
-# Aplicar filtros
-filtered_df = df.copy()
-
-if period_type != "Todos os dados":
-    filtered_df = filter_by_period(df, period_type, start_date, end_date)
-
-if canal_selected != "Todos":
-    filtered_df = filtered_df[filtered_df['Canal de Venda'] == canal_selected]
-
-if conta_selected != "Todas":
-    filtered_df = filtered_df[filtered_df['Conta'] == conta_selected]
-
-# Obter dados do período anterior para comparação
-previous_df = get_previous_period_data(df, filtered_df, period_type)
+# Aplicar filtros: recorte com a mesma interface nos dois motores (analytics.FrameSlice
+# e duckdb_engine.DuckDBSlice), de onde as seções pedem cada agregação
+if query_engine is not None:
+    # Filtros como consulta ao consolidado, com o motor DuckDB
+    filtered = query_engine.filter(period_type, start_date, end_date, canal_selected, conta_selected)
+else:
+    if engine_unavailable_reason():
+        st.sidebar.warning(engine_unavailable_reason())
+    filtered_df = profiler.measure("filtro_pedidos", apply_filters, df, period_type, start_date, end_date,
+                                   canal_selected, conta_selected)
+    # Mesmos filtros no cubo diário (os períodos são sempre dias inteiros)
+    filtered_cube = profiler.measure("filtro_cubo", apply_filters, cube, period_type, start_date, end_date,
+                                     canal_selected, conta_selected)
+    filtered = FrameSlice(filtered_df, filtered_cube, df)
+filtered_rows = filtered.count()
+
+# KPIs (período atual e anterior) em cache por versão dos dados + filtros; a data
+# de hoje entra na chave porque os períodos relativos mudam na virada do dia
+def compute_kpis():
+    # Período anterior de mesma duração, para as comparações
+    previous = profiler.measure("periodo_anterior", filtered.previous_period)
+    return {
+        'visao_geral': filtered.overview_kpis(previous),
+        'canais': filtered.channel_metrics(previous),
+    }
+
+kpi_key = (data_version, datetime.now().date(), period_type, start_date, end_date, canal_selected, conta_selected)
+with profiler.section("kpis", rows_in=filtered_rows):
+    kpis = get_kpi_cache().get_or_compute(kpi_key, compute_kpis)
+overview = kpis['visao_geral']
+
+# Visão de administração (?admin=1 na URL): uso do cache de KPIs
+if st.query_params.get("admin") == "1":
+    with st.sidebar.expander("⚙️ Administração", expanded=True):
+        cache_stats = get_kpi_cache().stats()
+        st.metric("Cache de KPIs - taxa de acerto", f"{cache_stats['taxa_acerto']:.1f}%")
+        st.caption(
+            f"{cache_stats['acertos']} acertos, {cache_stats['faltas']} faltas | "
+            f"{cache_stats['entradas']}/{cache_stats['max_entradas']} entradas, TTL {cache_stats['ttl_segundos']:.0f}s | "
+            f"{cache_stats['remocoes_lru']} removidas (LRU), {cache_stats['expiradas']} expiradas"
+        )
+        if st.button("Limpar cache de KPIs"):
+            get_kpi_cache().clear()
+
+        figure_stats = get_figure_cache().stats()
+        st.metric("Cache de gráficos - taxa de acerto", f"{figure_stats['taxa_acerto']:.1f}%")
+        st.caption(
+            f"{figure_stats['acertos']} acertos, {figure_stats['faltas']} faltas | "
+            f"{figure_stats['entradas']}/{figure_stats['max_entradas']} entradas | "
+            f"{figure_stats['remocoes_lru']} removidas (LRU)"
+        )
+        if st.button("Limpar cache de gráficos"):
+            get_figure_cache().clear()
 
 # Métricas principais
 st.header("📈 Visão Geral")
-
-# Calcular métricas considerando faturamento bruto e cancelamentos
-total_bruto = filtered_df['Faturamento'].sum()
-cancelados_df = filtered_df[filtered_df['Status Pedido'] == 'Cancelado']
-aprovados_df = filtered_df[filtered_df['Status Pedido'] != 'Cancelado']
-
-total_cancelado = cancelados_df['Faturamento'].sum()
-total_aprovado = aprovados_df['Faturamento'].sum()
-qtd_total_vendas = len(filtered_df)
-qtd_cancelados = len(cancelados_df)
-qtd_aprovados = len(aprovados_df)
-perc_cancelado_fat = (total_cancelado / total_bruto * 100) if total_bruto > 0 else 0
-perc_cancelado_qtd = (qtd_cancelados / qtd_total_vendas * 100) if qtd_total_vendas > 0 else 0
-
-# Período anterior
-prev_bruto = previous_df['Faturamento'].sum() if not previous_df.empty else 0
-prev_cancelados_df = previous_df[previous_df['Status Pedido'] == 'Cancelado'] if not previous_df.empty else pd.DataFrame()
-prev_cancelado = prev_cancelados_df['Faturamento'].sum() if not prev_cancelados_df.empty else 0
-prev_qtd_total = len(previous_df) if not previous_df.empty else 0
-prev_qtd_cancelados = len(prev_cancelados_df) if not prev_cancelados_df.empty else 0
-prev_perc_cancelado_fat = (prev_cancelado / prev_bruto * 100) if prev_bruto > 0 else 0
-prev_perc_cancelado_qtd = (prev_qtd_cancelados / prev_qtd_total * 100) if prev_qtd_total > 0 else 0
-
-# Primeira linha - Faturamento
-col1, col2, col3, col4, col5 = st.columns(5)
-
-with col1:
-    growth_bruto = ((total_bruto - prev_bruto) / prev_bruto * 100) if prev_bruto > 0 else 0
-    st.metric("Faturamento Bruto", f"R$ {total_bruto:,.2f}", f"{growth_bruto:+.1f}%")
-
-with col2:
-    growth_cancelado = ((total_cancelado - prev_cancelado) / prev_cancelado * 100) if prev_cancelado > 0 else 0
-    st.metric("Cancelados (R$)", f"R$ {total_cancelado:,.2f}", f"{growth_cancelado:+.1f}%")
-
-with col3:
-    growth_perc_cancelado = perc_cancelado_fat - prev_perc_cancelado_fat
-    st.metric("Cancelados (%)", f"{perc_cancelado_fat:.1f}%", f"{growth_perc_cancelado:+.1f}%")
-
-with col4:
-    growth_aprovado = ((total_aprovado - (prev_bruto - prev_cancelado)) / (prev_bruto - prev_cancelado) * 100) if (prev_bruto - prev_cancelado) > 0 else 0
-    st.metric("Faturamento Válido", f"R$ {total_aprovado:,.2f}", f"{growth_aprovado:+.1f}%")
-
-with col5:
-    total_margem = aprovados_df['Margem Contrib. (=)'].sum()
-    prev_margem = previous_df[previous_df['Status Pedido'] != 'Cancelado']['Margem Contrib. (=)'].sum() if not previous_df.empty else 0
-    growth_margem = ((total_margem - prev_margem) / prev_margem * 100) if prev_margem > 0 else 0
-    avg_margem_perc = (total_margem / total_aprovado * 100) if total_aprovado > 0 else 0
-    st.metric("MC (R$)", f"R$ {total_margem:,.2f}", f"{growth_margem:+.1f}%")
-    st.markdown(f'<div style="margin-top: -10px; opacity: 0.6; font-size: 0.8em;">({avg_margem_perc:.1f}%)</div>', unsafe_allow_html=True)
-
-
-
-
-# Segunda linha - Quantidade de Vendas
-col1, col2, col3, col4, col5 = st.columns(5)
-
-with col1:
-    growth_qtd_total = ((qtd_total_vendas - prev_qtd_total) / prev_qtd_total * 100) if prev_qtd_total > 0 else 0
-    st.metric("Total de Vendas (qtd.)", f"{qtd_total_vendas:,}", f"{growth_qtd_total:+.1f}%")
-
-with col2:
-    growth_qtd_aprovado = ((qtd_aprovados - (prev_qtd_total - prev_qtd_cancelados)) / (prev_qtd_total - prev_qtd_cancelados) * 100) if (prev_qtd_total - prev_qtd_cancelados) > 0 else 0
-    st.metric("Vendas Aprovadas (qtd.)", f"{qtd_aprovados:,}", f"{growth_qtd_aprovado:+.1f}%")
-
-with col3:
-    growth_qtd_cancelado = ((qtd_cancelados - prev_qtd_cancelados) / prev_qtd_cancelados * 100) if prev_qtd_cancelados > 0 else 0
-    st.metric("Vendas Canceladas (qtd.)", f"{qtd_cancelados:,}", f"{growth_qtd_cancelado:+.1f}%")
-
-with col4:
-    growth_perc_qtd_cancelado = perc_cancelado_qtd - prev_perc_cancelado_qtd
-    st.metric("Cancelados (%)", f"{perc_cancelado_qtd:.1f}%", f"{growth_perc_qtd_cancelado:+.1f}%")
-
-with col5:
-    ticket_medio = total_aprovado / qtd_aprovados if qtd_aprovados > 0 else 0
-    prev_ticket_medio = (prev_bruto - prev_cancelado) / (prev_qtd_total - prev_qtd_cancelados) if (prev_qtd_total - prev_qtd_cancelados) > 0 else 0
-    growth_ticket = ((ticket_medio - prev_ticket_medio) / prev_ticket_medio * 100) if prev_ticket_medio > 0 else 0
-    st.metric("Ticket Médio (MC)", f"R$ {ticket_medio:.2f}", f"{growth_ticket:+.1f}%")
+render_overview(overview)
 
 # Métricas adicionais por Canal e Conta
 st.subheader("Por Canal e Conta")
 
-if not filtered_df.empty:
-    def calculate_channel_metrics(df, prev_df=None):
-        """Calcula métricas por canal considerando cancelamentos"""
-        result = {}
+if filtered_rows:
+    render_channel_cards(list(kpis['canais'].values()))
 
-        for canal in ['Mercado Livre', 'Shopee']:
-            canal_df = df[df['Canal de Venda'] == canal]
-        
-            # Faturamento
-            bruto = canal_df['Faturamento'].sum()
-            cancelado = canal_df[canal_df['Status Pedido'] == 'Cancelado']['Faturamento'].sum()
-            aprovado = bruto - cancelado
-            perc_cancelado_fat = (cancelado / bruto * 100) if bruto > 0 else 0
-        
-            # Quantidade
-            qtd_total = len(canal_df)
-            qtd_cancelada = len(canal_df[canal_df['Status Pedido'] == 'Cancelado'])
-            qtd_aprovada = qtd_total - qtd_cancelada
-            perc_cancelado_qtd = (qtd_cancelada / qtd_total * 100) if qtd_total > 0 else 0
+st.markdown("---")
+
+# Opção de visualização (Faturamento vs Margem)
+view_option = st.radio("Visualizar por:", ["Faturamento", "Margem de Contribuição"], horizontal=True)
+value_column = 'Faturamento' if view_option == "Faturamento" else 'Margem Contrib. (=)'
+
+# Tabela de margem por SKU (parte do fragmento render_sku_report)
+def render_sku_table(sku_slice):
+    # Mesmo recorte dos gráficos (origem e SKUs da busca)
             
-            # Margem
-            margem = canal_df[canal_df['Status Pedido'] != 'Cancelado']['Margem Contrib. (=)'].sum()
-            mc_perc = (margem / aprovado * 100) if aprovado > 0 else 0
+    # Definir todas as colunas disponíveis na ordem correta (incluindo Origem de Aquisição)
+    all_columns = [
+        'SKU', 'Descrição do Produto', 'Origem de Aquisição', 'Faturamento', 'Qtd.', 'Valor Unit.',
+        'Custo (-) Total', 'Custo (-) Unitário', 'Imposto (-) Total', 'Imposto (-) Unitário',
+        'Frete Vendedor (-)', 'Tarifa de Venda (-) Total', 'Tarifa de Venda (-) Unitária',
+        'Margem Contrib. (=) Total', 'Margem Contrib. (=) Unitária', 'MC em %'
+    ]
         
-            # Período anterior
-            prev_bruto = prev_aprovado = prev_qtd_aprovada = prev_cancelado = prev_qtd_cancelada = 0
-            prev_perc_cancelado_fat = prev_perc_cancelado_qtd = 0
-            if prev_df is not None and not prev_df.empty:
-                prev_canal_df = prev_df[prev_df['Canal de Venda'] == canal]
-                prev_bruto = prev_canal_df['Faturamento'].sum()
-                prev_cancelado = prev_canal_df[prev_canal_df['Status Pedido'] == 'Cancelado']['Faturamento'].sum()
-                prev_aprovado = prev_bruto - prev_cancelado
-                prev_qtd_total = len(prev_canal_df)
-                prev_qtd_cancelada = len(prev_canal_df[prev_canal_df['Status Pedido'] == 'Cancelado'])
-                prev_qtd_aprovada = prev_qtd_total - prev_qtd_cancelada
-                prev_perc_cancelado_fat = (prev_cancelado / prev_bruto * 100) if prev_bruto > 0 else 0
-                prev_perc_cancelado_qtd = (prev_qtd_cancelada / prev_qtd_total * 100) if prev_qtd_total > 0 else 0
-            
-            growth_fat = ((aprovado - prev_aprovado) / prev_aprovado * 100) if prev_aprovado > 0 else 0
-            growth_qtd = ((qtd_aprovada - prev_qtd_aprovada) / prev_qtd_aprovada * 100) if prev_qtd_aprovada > 0 else 0
+    # Colunas visíveis por padrão (incluindo Origem de Aquisição)
+    default_visible_columns = [
+        'Descrição do Produto', 'Origem de Aquisição', 'Faturamento', 'Qtd.', 'Valor Unit.',
+        'Custo (-) Unitário', 'Imposto (-) Unitário', 'Tarifa de Venda (-) Unitária',
+        'Margem Contrib. (=) Unitária', 'MC em %'
+    ]
             
-            result[canal] = {
-                'bruto': bruto,
-                'cancelado': cancelado,
-                'aprovado': aprovado,
-                'perc_cancelado_fat': perc_cancelado_fat,
-                'qtd_total': qtd_total,
-                'qtd_cancelada': qtd_cancelada,
-                'qtd_aprovada': qtd_aprovada,
-                'perc_cancelado_qtd': perc_cancelado_qtd,
-                'growth_fat': growth_fat,
-                'growth_qtd': growth_qtd,
-                'margem': margem,
-                'mc_perc': mc_perc
-            }
+    # Seletor de colunas (expansível)
+    with st.expander("Selecione as colunas para exibir"):
+        selected_columns = st.multiselect(
+            "Escolha as colunas:",
+            options=all_columns,
+            default=default_visible_columns,
+            key="table_columns"
+        )
             
-            # Por conta
-            for conta in ['XRack', 'EvolutionX']:
-                conta_df = canal_df[canal_df['Conta'] == conta]
-                
-                # Faturamento
-                conta_bruto = conta_df['Faturamento'].sum()
-                conta_cancelado = conta_df[conta_df['Status Pedido'] == 'Cancelado']['Faturamento'].sum()
-                conta_aprovado = conta_bruto - conta_cancelado
-                conta_perc_cancelado_fat = (conta_cancelado / conta_bruto * 100) if conta_bruto > 0 else 0
-                
-                # Quantidade
-                conta_qtd_total = len(conta_df)
-                conta_qtd_cancelada = len(conta_df[conta_df['Status Pedido'] == 'Cancelado'])
-                conta_qtd_aprovada = conta_qtd_total - conta_qtd_cancelada
-                conta_perc_cancelado_qtd = (conta_qtd_cancelada / conta_qtd_total * 100) if conta_qtd_total > 0 else 0
-                
-                # Margem para contas aprovadas
-                conta_margem = conta_df[conta_df['Status Pedido'] != 'Cancelado']['Margem Contrib. (=)'].sum()
-                conta_mc_perc = (conta_margem / conta_aprovado * 100) if conta_aprovado > 0 else 0
-                
-                # Período anterior para contas
-                prev_conta_aprovado = prev_conta_qtd_aprovada = 0
-                if prev_df is not None and not prev_df.empty:
-                    prev_conta_df = prev_df[(prev_df['Canal de Venda'] == canal) & (prev_df['Conta'] == conta)]
-                    prev_conta_bruto = prev_conta_df['Faturamento'].sum()
-                    prev_conta_cancelado = prev_conta_df[prev_conta_df['Status Pedido'] == 'Cancelado']['Faturamento'].sum()
-                    prev_conta_aprovado = prev_conta_bruto - prev_conta_cancelado
-                    prev_conta_qtd_total = len(prev_conta_df)
-                    prev_conta_qtd_cancelada = len(prev_conta_df[prev_conta_df['Status Pedido'] == 'Cancelado'])
-                    prev_conta_qtd_aprovada = prev_conta_qtd_total - prev_conta_qtd_cancelada
-                
-                conta_growth_fat = ((conta_aprovado - prev_conta_aprovado) / prev_conta_aprovado * 100) if prev_conta_aprovado > 0 else 0
-                conta_growth_qtd = ((conta_qtd_aprovada - prev_conta_qtd_aprovada) / prev_conta_qtd_aprovada * 100) if prev_conta_qtd_aprovada > 0 else 0
-                
-                result[f'{canal}_{conta}'] = {
-                    'bruto': conta_bruto,
-                    'cancelado': conta_cancelado,
-                    'aprovado': conta_aprovado,
-                    'perc_cancelado_fat': conta_perc_cancelado_fat,
-                    'qtd_total': conta_qtd_total,
-                    'qtd_cancelada': conta_qtd_cancelada,
-                    'qtd_aprovada': conta_qtd_aprovada,
-                    'perc_cancelado_qtd': conta_perc_cancelado_qtd,
-                    'margem': conta_margem,
-                    'mc_perc': conta_mc_perc,
-                    'growth_fat': conta_growth_fat,
-                    'growth_qtd': conta_growth_qtd
-                }
-        
-        return result
+    # Uma linha por SKU (totais, médias unitárias e MC em % sobre os totais)
+    resumo_sku = sku_slice.sku_summary()
 
-    
-    metrics = calculate_channel_metrics(filtered_df, previous_df)
-    
-# Primeira linha - Totais por Canal
-col1, col2 = st.columns(2)
-
-with col1:
-    ml_data = metrics['Mercado Livre']
-    st.metric("🟡 Mercado Livre (Fat.)", f"R$ {ml_data['aprovado']:,.2f}", f"{ml_data['growth_fat']:+.1f}%")
-    st.markdown(f'<div style="margin-top: -10px; margin-bottom: 5px; opacity: 0.6; font-size: 0.8em;"><strong>MC:</strong> R$ {ml_data["margem"]:,.2f} <strong>({ml_data["mc_perc"]:.1f}%)</strong> | <strong>Bruto:</strong> R$ {ml_data["bruto"]:,.2f} | <strong>Cancelado:</strong> R$ {ml_data["cancelado"]:,.2f} <strong>({ml_data["perc_cancelado_fat"]:.1f}%)</strong></div>', unsafe_allow_html=True)
-    st.metric("🟡 Mercado Livre (Qtd.)", f"{ml_data['qtd_aprovada']:,}", f"{ml_data['growth_qtd']:+.1f}%")
-    st.markdown(f'<div style="margin-top: -10px; margin-bottom: 30px; opacity: 0.6; font-size: 0.8em;"><strong>Total:</strong> {ml_data["qtd_total"]:,} | <strong>Canceladas:</strong> {ml_data["qtd_cancelada"]:,} <strong>({ml_data["perc_cancelado_qtd"]:.1f}%)</strong></div>', unsafe_allow_html=True)
-
-with col2:
-    shopee_data = metrics['Shopee']
-    st.metric("🔴 Shopee (Fat.)", f"R$ {shopee_data['aprovado']:,.2f}", f"{shopee_data['growth_fat']:+.1f}%")
-    st.markdown(f'<div style="margin-top: -10px; margin-bottom: 5px; opacity: 0.6; font-size: 0.8em;"><strong>MC:</strong> R$ {shopee_data["margem"]:,.2f} <strong>({shopee_data["mc_perc"]:.1f}%)</strong> | <strong>Bruto:</strong> R$ {shopee_data["bruto"]:,.2f} | <strong>Cancelado:</strong> R$ {shopee_data["cancelado"]:,.2f} <strong>({shopee_data["perc_cancelado_fat"]:.1f}%)</strong></div>', unsafe_allow_html=True)
-    st.metric("🔴 Shopee (Qtd.)", f"{shopee_data['qtd_aprovada']:,}", f"{shopee_data['growth_qtd']:+.1f}%")
-    st.markdown(f'<div style="margin-top: -10px; margin-bottom: 30px; opacity: 0.6; font-size: 0.8em;"><strong>Total:</strong> {shopee_data["qtd_total"]:,} | <strong>Canceladas:</strong> {shopee_data["qtd_cancelada"]:,} <strong>({shopee_data["perc_cancelado_qtd"]:.1f}%)</strong></div>', unsafe_allow_html=True)
-
-# Linhas seguintes - Por Conta e Canal
-col1, col2 = st.columns(2)
-
-with col1:
-    ml_xr_data = metrics['Mercado Livre_XRack']
-    st.metric("🟡 XRack", f"R$ {ml_xr_data['aprovado']:,.2f}", f"{ml_xr_data['growth_fat']:+.1f}%")
-    st.markdown(f'<div style="margin-top: -10px; margin-bottom: 5px; opacity: 0.6; font-size: 0.8em;"><strong>MC:</strong> R$ {ml_xr_data["margem"]:,.2f} <strong>({ml_xr_data["mc_perc"]:.1f}%)</strong> | <strong>Cancel.(Fat.):</strong> {ml_xr_data["perc_cancelado_fat"]:.1f}%</div>', unsafe_allow_html=True)
-    st.markdown(f'<div style="margin-top: -5px; margin-bottom: 30px; opacity: 0.6; font-size: 0.8em;"><strong>Vendas:</strong> {ml_xr_data["qtd_aprovada"]:,} <strong>({ml_xr_data["growth_qtd"]:+.1f}%)</strong> | <strong>Cancel.(Qtd.):</strong> {ml_xr_data["qtd_cancelada"]:,} <strong>({ml_xr_data["perc_cancelado_qtd"]:.1f}%)</strong></div>', unsafe_allow_html=True)
-
-with col2:
-    ml_ev_data = metrics['Mercado Livre_EvolutionX']
-    st.metric("🟡 EvolutionX", f"R$ {ml_ev_data['aprovado']:,.2f}", f"{ml_ev_data['growth_fat']:+.1f}%")
-    st.markdown(f'<div style="margin-top: -10px; margin-bottom: 5px; opacity: 0.6; font-size: 0.8em;"><strong>MC:</strong> R$ {ml_ev_data["margem"]:,.2f} <strong>({ml_ev_data["mc_perc"]:.1f}%)</strong> | <strong>Cancel.(Fat.):</strong> {ml_ev_data["perc_cancelado_fat"]:.1f}%</div>', unsafe_allow_html=True)
-    st.markdown(f'<div style="margin-top: -5px; margin-bottom: 20px; opacity: 0.6; font-size: 0.8em;"><strong>Vendas:</strong> {ml_ev_data["qtd_aprovada"]:,} <strong>({ml_ev_data["growth_qtd"]:+.1f}%)</strong> | <strong>Cancel.(Qtd.):</strong> {ml_ev_data["qtd_cancelada"]:,} <strong>({ml_ev_data["perc_cancelado_qtd"]:.1f}%)</strong></div>', unsafe_allow_html=True)
-
-col1, col2 = st.columns(2)
-
-with col1:
-    sh_xr_data = metrics['Shopee_XRack']
-    st.metric("🔴 XRack", f"R$ {sh_xr_data['aprovado']:,.2f}", f"{sh_xr_data['growth_fat']:+.1f}%")
-    st.markdown(f'<div style="margin-top: -10px; margin-bottom: 5px; opacity: 0.6; font-size: 0.8em;"><strong>MC:</strong> R$ {sh_xr_data["margem"]:,.2f} <strong>({sh_xr_data["mc_perc"]:.1f}%)</strong> | <strong>Cancel.(Fat.):</strong> {sh_xr_data["perc_cancelado_fat"]:.1f}%</div>', unsafe_allow_html=True)
-    st.markdown(f'<div style="margin-top: -5px; margin-bottom: 20px; opacity: 0.6; font-size: 0.8em;"><strong>Vendas:</strong> {sh_xr_data["qtd_aprovada"]:,} <strong>({sh_xr_data["growth_qtd"]:+.1f}%)</strong> | <strong>Cancel.(Qtd.):</strong> {sh_xr_data["qtd_cancelada"]:,} <strong>({sh_xr_data["perc_cancelado_qtd"]:.1f}%)</strong></div>', unsafe_allow_html=True)
-
-with col2:
-    sh_ev_data = metrics['Shopee_EvolutionX']
-    st.metric("🔴 EvolutionX", f"R$ {sh_ev_data['aprovado']:,.2f}", f"{sh_ev_data['growth_fat']:+.1f}%")
-    st.markdown(f'<div style="margin-top: -10px; margin-bottom: 5px; opacity: 0.6; font-size: 0.8em;"><strong>MC:</strong> R$ {sh_ev_data["margem"]:,.2f} <strong>({sh_ev_data["mc_perc"]:.1f}%)</strong> | <strong>Cancel.(Fat.):</strong> {sh_ev_data["perc_cancelado_fat"]:.1f}%</div>', unsafe_allow_html=True)
-    st.markdown(f'<div style="margin-top: -5px; margin-bottom: 20px; opacity: 0.6; font-size: 0.8em;"><strong>Vendas:</strong> {sh_ev_data["qtd_aprovada"]:,} <strong>({sh_ev_data["growth_qtd"]:+.1f}%)</strong> | <strong>Cancel.(Qtd.):</strong> {sh_ev_data["qtd_cancelada"]:,} <strong>({sh_ev_data["perc_cancelado_qtd"]:.1f}%)</strong></div>', unsafe_allow_html=True)    
-st.markdown("---")
+    # Filtrar apenas as colunas selecionadas mantendo a ordem original
+    ordered_selected_columns = [col for col in all_columns if col in selected_columns]
+    display_resumo = resumo_sku[ordered_selected_columns]
 
-# Opção de visualização (Faturamento vs Margem)
-view_option = st.radio("Visualizar por:", ["Faturamento", "Margem de Contribuição"], horizontal=True)
-value_column = 'Faturamento' if view_option == "Faturamento" else 'Margem Contrib. (=)'
+    # Formatação das colunas selecionadas
+    format_dict = sku_table_format(selected_columns)
 
-# Abas para diferentes relatórios
-tab1, tab2, tab3, tab4 = st.tabs([
-    "💲 Faturamento", "📈 Desempenho por SKU", "🚚 Canal de Envio", "🏛️ Impostos"
-])
+    # Exibir tabela (faixas de MC em % calculadas de forma vetorizada)
+    bands = {'MC em %': 'mc'} if 'MC em %' in selected_columns else {}
+    render_paged_table(display_resumo, format_dict, bands, key="sku_table", use_container_width=True, hide_index=True)
 
-with tab1:
-    st.subheader("Vendas")
-    
-    # Agrupar por mês considerando status
-    monthly_sales = filtered_df.groupby([filtered_df['Data'].dt.to_period('M'), 'Status Pedido']).agg({
-        value_column: 'sum',
-        'ID da venda': 'count'
-    }).reset_index()
-    monthly_sales['Data_str'] = monthly_sales['Data'].astype(str)
-
-    # Separar aprovados e cancelados
-    monthly_aprovados = monthly_sales[monthly_sales['Status Pedido'] != 'Cancelado'].groupby('Data_str').agg({
-        value_column: 'sum',
-        'ID da venda': 'sum'
-    }).reset_index()
-
-    monthly_cancelados = monthly_sales[monthly_sales['Status Pedido'] == 'Cancelado'].groupby('Data_str').agg({
-        value_column: 'sum',
-        'ID da venda': 'sum'
-    }).reset_index()
-
-    if not monthly_sales.empty:
-        # Gráfico de vendas mensais com aprovados e cancelados
-        fig_monthly = make_subplots(
-            rows=2, cols=1,
-            subplot_titles=[f'{view_option} Mensal', 'Quantidade de Vendas Mensais'],
-            vertical_spacing=0.1
-        )
-        
-        # Adicionar barras de aprovados
-        if not monthly_aprovados.empty:
-            fig_monthly.add_trace(
-                go.Bar(x=monthly_aprovados['Data_str'], y=monthly_aprovados[value_column], 
-                    name=f'{view_option} Aprovado', marker_color='#1f77b4'),
-                row=1, col=1
-            )
-        
-        # Adicionar barras de cancelados
-        if not monthly_cancelados.empty:
-            fig_monthly.add_trace(
-                go.Bar(x=monthly_cancelados['Data_str'], y=monthly_cancelados[value_column], 
-                    name=f'{view_option} Cancelado', marker_color='#ff0000'),
-                row=1, col=1
-            )
-        
-        # Quantidade - aprovados
-        if not monthly_aprovados.empty:
-            fig_monthly.add_trace(
-                go.Scatter(x=monthly_aprovados['Data_str'], y=monthly_aprovados['ID da venda'], 
-                        mode='lines+markers', name='Qtd. Aprovada', marker_color='#1f77b4'),
-                row=2, col=1
-            )
-        
-        # Quantidade - cancelados
-        if not monthly_cancelados.empty:
-            fig_monthly.add_trace(
-                go.Scatter(x=monthly_cancelados['Data_str'], y=monthly_cancelados['ID da venda'], 
-                        mode='lines+markers', name='Qtd. Cancelada', marker_color='#ff0000'),
-                row=2, col=1
-            )
+# Evolução mensal por SKU/Código (parte do fragmento render_sku_report)
+def render_sku_evolution(sku_slice):
+    # Seletor de visualização: SKU ou Código (ID do Anúncio)
+    col_vis1, col_vis2 = st.columns([1, 3])
         
-        fig_monthly.update_layout(
-            height=700, 
-            showlegend=True,
-            margin=dict(t=60, b=60, l=60, r=60),
-            barmode='stack'
+    with col_vis1:
+        view_by = st.selectbox(
+            "Visualizar por:",
+            ["SKU", "ID do Anúncio (Código)"],
+            key="view_by_selector"
         )
-        fig_monthly.update_yaxes(title_text="Valor (R$)", row=1, col=1)
-        fig_monthly.update_yaxes(title_text="Quantidade", row=2, col=1)
-        
-        st.plotly_chart(fig_monthly, use_container_width=True)
         
-        # Tabela de vendas mensais com aprovados e cancelados
-        monthly_complete = filtered_df.groupby([filtered_df['Data'].dt.to_period('M'), 'Status Pedido']).agg({
-            value_column: 'sum',
-            'ID da venda': 'count'
-        }).reset_index()
-        monthly_complete['Mês'] = monthly_complete['Data'].astype(str)
+    with col_vis2:
+        st.write("")  # Espaçamento
         
-        monthly_pivot = monthly_complete.pivot_table(
-            index='Mês',
-            columns='Status Pedido',
-            values=[value_column, 'ID da venda'],
-            fill_value=0,
-            aggfunc='sum'
-        )
+    # Definir coluna de agrupamento baseada na seleção
+    group_column = 'SKU' if view_by == "SKU" else 'Código'
         
-        st.dataframe(monthly_pivot.style.format('{:,.2f}'), use_container_width=True)
+    # Verificar se a coluna existe
+    if group_column not in sku_slice.columns:
+        st.error(f"Coluna '{group_column}' não encontrada no dataset.")
+        st.info(f"Colunas disponíveis: {sku_slice.columns}")
+    else:
+        # Vendas por mês × item, com variação sobre o mês anterior de cada item
+        monthly_performance = sku_slice.sku_monthly_performance(group_column)
 
-        st.subheader("Faturamento por Origem de Aquisição")
-        
-        # Filtro para status de pedidos
-        status_filter = st.radio(
-            "Filtrar por status:",
-            ["Ambos", "Apenas Aprovados", "Apenas Cancelados"],
-            horizontal=True,
-            key="origem_status_filter"
-        )
-        
-        # Aplicar filtro de status
-        if status_filter == "Apenas Aprovados":
-            origem_filtered_df = filtered_df[filtered_df['Status Pedido'] != 'Cancelado']
-        elif status_filter == "Apenas Cancelados":
-            origem_filtered_df = filtered_df[filtered_df['Status Pedido'] == 'Cancelado']
-        else:
-            origem_filtered_df = filtered_df
-        
-        # Verificar se existe coluna Origem de Aquisição
-        if 'Origem de Aquisição' in origem_filtered_df.columns:
-            # Agrupar por mês e origem de aquisição
-            origem_monthly = origem_filtered_df.groupby([
-                origem_filtered_df['Data'].dt.to_period('M'), 
-                'Origem de Aquisição'
-            ]).agg({
-                value_column: 'sum'
-            }).reset_index()
-            origem_monthly['Data_str'] = origem_monthly['Data'].astype(str)
-            
-            if not origem_monthly.empty:
-                # Calcular total por mês para percentuais
-                total_por_mes = origem_monthly.groupby('Data_str')[value_column].sum().to_dict()
-                origem_monthly['Percentual'] = origem_monthly.apply(
-                    lambda row: (row[value_column] / total_por_mes[row['Data_str']] * 100) if total_por_mes[row['Data_str']] > 0 else 0, 
-                    axis=1
-                )
+        # CRIAR TABELA PIVOTADA COM MULTIINDEX (como no relatório Diário)
+        if not monthly_performance.empty:
+            # Tabela Identificador × (mês, métrica) montada de forma vetorizada
+            pivot_table = sku_evolution_pivot(monthly_performance)
                 
-                # Criar texto com valor e percentual
-                origem_monthly['Texto'] = origem_monthly.apply(
-                    lambda row: f"R$ {row[value_column]:,.2f}<br>({row['Percentual']:.1f}%)", 
-                    axis=1
-                )
+            # Criar dicionário de formatação
+            format_dict = {}
+            for col in pivot_table.columns:
+                mes, metrica = col
+                if metrica == 'Qtd':
+                    format_dict[col] = '{:,.0f}'
+                elif metrica == 'R$':
+                    format_dict[col] = 'R$ {:,.2f}'
+                elif metrica in ['Var%Qtd', 'Var%Fat']:
+                    format_dict[col] = '{:+.1f}%'
                 
-                fig_origem = px.bar(
-                    origem_monthly,
-                    x='Data_str',
-                    y=value_column,
-                    color='Origem de Aquisição',
-                    title=f'{view_option} por Origem de Aquisição',
-                    labels={'Data_str': 'Mês', value_column: f'{view_option} (R$)'},
-                    text='Texto'
-                )
-                fig_origem.update_traces(textposition='inside', textfont_size=10)
-                fig_origem.update_layout(height=500)
-                st.plotly_chart(fig_origem, use_container_width=True)
-            else:
-                st.info("Nenhum dado encontrado para o filtro selecionado.")
+            # Cores nas colunas de variação
+            bands = {col: 'variation' for col in pivot_table.columns if col[1] in ['Var%Qtd', 'Var%Fat']}
+            render_paged_table(pivot_table, format_dict, bands, key="sku_evolution_table", use_container_width=True, height=500)
         else:
-            st.warning("Coluna 'Origem de Aquisição' não encontrada no dataset.")
-
-        st.subheader("Pedidos")
-        
-        if not filtered_df.empty:
-            col1, col2 = st.columns(2)
+            st.info("Nenhum dado encontrado para o relatório de desempenho mensal.")
             
+        # Gráficos só quando algum item tem mês anterior para comparar
+        if monthly_performance['Qtd_Anterior'].notna().any():
+            # Gráficos de evolução absoluta
+            st.markdown("---")
+                
+            col1, col2 = st.columns(2)
+                
             with col1:
-                # Pedidos por canal com status
-                canal_status = filtered_df.groupby(['Canal de Venda', 'Status Pedido']).size().reset_index(name='Quantidade')
+                def build_fig_abs_qtd():
+                    fig_abs_qtd = px.line(
+                        monthly_performance,
+                        x='Mes_Ano_Str',
+                        y='Qtd',
+                        color='Identificador',
+                        markers=True,
+                        title='Evolução (Qtd.)',
+                        labels={'Mes_Ano_Str': 'Mês', 'Qtd': 'Quantidade de Vendas'},
+                        height=400
+                    )
+                    return fig_abs_qtd
 
-                if not canal_status.empty:
-                    # Criar labels combinados
-                    canal_status['Label'] = canal_status['Canal de Venda'] + ' - ' + canal_status['Status Pedido']
-                    
-                    # Definir cores
-                    color_map = {}
-                    for _, row in canal_status.iterrows():
-                        if row['Status Pedido'] == 'Cancelado':
-                            color_map[row['Label']] = '#ff0000'
-                        else:
-                            color_map[row['Label']] = '#1f77b4' if 'Mercado Livre' in row['Canal de Venda'] else '#ffa500'
+                fig_abs_qtd = cached_figure(get_figure_cache(), 'fig_abs_qtd', [monthly_performance], build_fig_abs_qtd)
+                st.plotly_chart(fig_abs_qtd, use_container_width=True)
                 
-                fig_canal = px.pie(
-                    canal_status, 
-                    values='Quantidade', 
-                    names='Label',
-                    title='Pedidos por Canal de Venda e Status',
-                    color='Label',
-                    color_discrete_map=color_map
-                )
-                st.plotly_chart(fig_canal, use_container_width=True)
-            
             with col2:
-                # Pedidos por canal
-                canal_count = filtered_df['Canal de Venda'].value_counts()
-                
-                if not canal_count.empty:
-                    fig_canal = px.bar(
-                        x=canal_count.index, y=canal_count.values,
-                        title='Pedidos por Canal de Venda'
+                def build_fig_abs_fat():
+                    fig_abs_fat = px.line(
+                        monthly_performance,
+                        x='Mes_Ano_Str',
+                        y='Faturamento',
+                        color='Identificador',
+                        markers=True,
+                        title='Evolução (R$)',
+                        labels={'Mes_Ano_Str': 'Mês', 'Faturamento': 'Faturamento (R$)'},
+                        height=400
                     )
-                    st.plotly_chart(fig_canal, use_container_width=True)
-            
-            # Evolução diária de pedidos - Corrigido
-            daily_orders = filtered_df.groupby(filtered_df['Data'].dt.date).agg({
-                'ID da venda': 'count',
-                'Faturamento': 'sum'
-            }).reset_index()
-            
-            if not daily_orders.empty:
-                fig_daily = make_subplots(
-                    rows=1, cols=2,
-                    subplot_titles=['Pedidos Diários (Qtd.)', 'Faturamento Diário (R$)']
-                )
-                
-                fig_daily.add_trace(
-                    go.Scatter(x=daily_orders['Data'], y=daily_orders['ID da venda'], 
-                            mode='lines+markers', name='Pedidos'),
-                    row=1, col=1
-                )
-                
-                fig_daily.add_trace(
-                    go.Scatter(x=daily_orders['Data'], y=daily_orders['Faturamento'], 
-                            mode='lines+markers', name='Faturamento', line=dict(color='orange')),
-                    row=1, col=2
-                )
-                
-                fig_daily.update_layout(height=400, showlegend=False)
-                st.plotly_chart(fig_daily, use_container_width=True)
-            
-            st.markdown("---")
+                    return fig_abs_fat
 
-            st.subheader("Diário por Conta e Canal")
-            
-            # Criar relatório diário por conta e canal
-            relatorio_diario = filtered_df.groupby([
-                filtered_df['Data'].dt.date, 'Canal de Venda', 'Conta'
-            ]).agg({
-                'ID da venda': 'count',
-                'Faturamento': 'sum'
-            }).reset_index()
-            relatorio_diario.columns = ['Data', 'Canal de Venda', 'Conta', 'Qtd. Vendas', 'Faturamento']
-            
-            if not relatorio_diario.empty:
-                # Criar pivot para formato de tabela cruzada
-                pivot_qtd = relatorio_diario.pivot_table(
-                    index='Data',
-                    columns=['Canal de Venda', 'Conta'],
-                    values='Qtd. Vendas',
-                    fill_value=0,
-                    aggfunc='sum'
-                )
-                
-                pivot_fat = relatorio_diario.pivot_table(
-                    index='Data',
-                    columns=['Canal de Venda', 'Conta'],
-                    values='Faturamento',
-                    fill_value=0,
-                    aggfunc='sum'
-                )
-                
-                # Adicionar totais por canal
-                if not pivot_qtd.empty:
-                    # QUANTIDADE - Armazenar colunas originais antes de adicionar totais
-                    original_qtd_cols = pivot_qtd.columns.tolist()
-                    
-                    # Adicionar totais por canal
-                    for canal in pivot_qtd.columns.get_level_values(0).unique():
-                        canal_cols = [col for col in pivot_qtd.columns if col[0] == canal]
-                        pivot_qtd[(canal, 'Total')] = pivot_qtd[canal_cols].sum(axis=1)
-                    
-                    # Total Geral usando APENAS as colunas originais (sem os totais por canal)
-                    pivot_qtd[('Total Geral', '')] = pivot_qtd[original_qtd_cols].sum(axis=1)
-                    
-                    st.write("**Vendas Diárias (Qtd.)**")
-                    st.dataframe(pivot_qtd.style.format('{:,.0f}'), use_container_width=True)
-                    
-                    # FATURAMENTO - Armazenar colunas originais antes de adicionar totais
-                    original_fat_cols = pivot_fat.columns.tolist()
-                    
-                    # Adicionar totais por canal
-                    for canal in pivot_fat.columns.get_level_values(0).unique():
-                        canal_cols = [col for col in pivot_fat.columns if col[0] == canal]
-                        pivot_fat[(canal, 'Total')] = pivot_fat[canal_cols].sum(axis=1)
-                    
-                    # Total Geral usando APENAS as colunas originais (sem os totais por canal)
-                    pivot_fat[('Total Geral', '')] = pivot_fat[original_fat_cols].sum(axis=1)
-                    
-                    st.write("**Faturamento Diário (R$)**")
-                    st.dataframe(pivot_fat.style.format('R$ {:,.2f}'), use_container_width=True)
-            else:
-                st.info("Nenhum dado encontrado para o relatório diário.")
-        else:
-            st.info("Nenhum dado encontrado para o período selecionado.")
+                fig_abs_fat = cached_figure(get_figure_cache(), 'fig_abs_fat', [monthly_performance], build_fig_abs_fat)
+                st.plotly_chart(fig_abs_fat, use_container_width=True)
 
 
-with tab2:
+# Explorador de SKUs como fragmento: busca, origem, seleção de SKUs, colunas da tabela,
+# visualização da evolução e paginação reexecutam só esta função, reaproveitando o
+# recorte filtered da última execução completa (visão geral, cards e demais
+# relatórios não são recalculados). É o único nível de fragmento: as tabelas daqui
+# usam render_paged_table, e não a versão em fragmento
+@st.fragment
+def render_sku_report(filtered, sku_index):
     st.subheader("Desempenho de Vendas por SKU")
     
     # Filtro de pesquisa para SKUs, Descrição e Origem de Aquisição
@@ -815,72 +629,37 @@ with tab2:
     
     with col_search3:
         # Filtro de Origem de Aquisição
-        if 'Origem de Aquisição' in filtered_df.columns:
-            origem_options = ["Todas"] + sorted(filtered_df['Origem de Aquisição'].dropna().unique().tolist())
+        if 'Origem de Aquisição' in filtered.columns:
+            origem_options = ["Todas"] + filtered.distinct('Origem de Aquisição')
             origem_selected = st.selectbox("Origem de Aquisição:", origem_options, key="origem_filter_main")
         else:
             origem_selected = "Todas"
 
-    # Garantir que os SKUs sejam tratados como texto e criar mapeamento consistente
-    filtered_df_copy = filtered_df.copy()
-    
-    # Aplicar filtro de origem de aquisição
-    if origem_selected != "Todas" and 'Origem de Aquisição' in filtered_df_copy.columns:
-        filtered_df_copy = filtered_df_copy[filtered_df_copy['Origem de Aquisição'] == origem_selected]
-    
-    filtered_df_copy['SKU'] = filtered_df_copy['SKU'].astype(str)
-    filtered_df_copy['Descrição do Produto'] = filtered_df_copy['Descrição do Produto'].astype(str).fillna('Sem descrição')
+    # Base da aba: recorte filtrado com o filtro de origem de aquisição (SKU, descrição
+    # e rótulo já vêm prontos da carga, ver add_sku_columns)
+    has_orders = filtered.count() > 0
+    sku_base = filtered.narrow(origem_selected if origem_selected != "Todas" else None)
 
-    # Criar lista de SKUs únicos com suas descrições (usando SKUs como string)
-    sku_desc_mapping = filtered_df_copy.groupby('SKU')['Descrição do Produto'].first().to_dict()
-    available_skus = sorted(filtered_df_copy['SKU'].unique())
+    # Uma linha por SKU do recorte: rótulo do seletor e quantidade vendida
+    sku_catalog = sku_base.sku_options()
+    sku_option_mapping = sku_catalog['SKU_Opcao'].astype(str).to_dict()
+    available_skus = sorted(sku_catalog.index.astype(str))
 
-    # Filtrar SKUs baseado na busca por SKU ou Descrição (apenas para o multiselect)
+    # Filtrar SKUs baseado na busca por SKU ou Descrição (apenas para o multiselect),
+    # pelo índice pré-calculado: ignora maiúsculas/acentos e ordena por relevância
     if search_term or desc_search_term:
-        filtered_skus = []
-        for sku in available_skus:
-            try:
-                sku_match = search_term.upper() in sku.upper() if search_term else True
-                desc_match = desc_search_term.upper() in sku_desc_mapping[sku].upper() if desc_search_term else True
-                if sku_match and desc_match:
-                    filtered_skus.append(sku)
-            except KeyError:
-                continue
-        available_skus = filtered_skus
+        matches = search_skus(sku_index, search_term, desc_search_term)
+        available_skus = matches.loc[matches['SKU'].isin(available_skus), 'SKU'].tolist()
 
     with col_select:
-        # Criar opções que mostram SKU + Descrição
-        sku_options = []
-        for sku in available_skus:
-            try:
-                desc = sku_desc_mapping.get(sku, 'Sem descrição')
-                if len(desc) > 50:
-                    option = f"{sku} - {desc[:50]}..."
-                else:
-                    option = f"{sku} - {desc}"
-                sku_options.append(option)
-            except (KeyError, TypeError):
-                sku_options.append(f"{sku} - Sem descrição")
+        # Opções que mostram SKU + Descrição (rótulos calculados na carga)
+        sku_options = [sku_option_mapping[sku] for sku in available_skus]
+        option_to_sku = {option: sku for sku, option in sku_option_mapping.items()}
         
-        # Calcular os 3 SKUs que mais venderam (por quantidade total)
-        top_skus_by_sales = filtered_df_copy.groupby('SKU').agg({
-            'Qtd.': 'sum',
-            'Descrição do Produto': 'first'
-        }).reset_index().sort_values('Qtd.', ascending=False).head(3)
-        
-        # Criar lista dos top 3 SKUs no formato das opções
-        default_sku_options = []
-        for _, row in top_skus_by_sales.iterrows():
-            sku = str(row['SKU'])
-            desc = str(row['Descrição do Produto']) if pd.notna(row['Descrição do Produto']) else 'Sem descrição'
-            if len(desc) > 50:
-                option = f"{sku} - {desc[:50]}..."
-            else:
-                option = f"{sku} - {desc}"
-            
-            # Verificar se a opção existe na lista de opções disponíveis
-            if option in sku_options:
-                default_sku_options.append(option)
+        # Os 3 SKUs que mais venderam (por quantidade total), se estiverem entre as opções
+        top_skus_by_sales = sku_catalog['Qtd.'].sort_values(ascending=False, kind='stable').head(3).index.astype(str)
+        available_set = set(available_skus)
+        default_sku_options = [sku_option_mapping[sku] for sku in top_skus_by_sales if sku in available_set]
         
         selected_sku_options = st.multiselect(
             "Selecionar SKUs:",
@@ -890,254 +669,224 @@ with tab2:
         )
         
         # Extrair apenas os SKUs das opções selecionadas
-        selected_skus = [option.split(" - ")[0] for option in selected_sku_options]
+        selected_skus = [option_to_sku[option] for option in selected_sku_options if option in option_to_sku]
 
     # Lógica principal: definir dados para relatórios
-    if selected_skus:
-        # Se SKUs específicos foram selecionados, usar apenas eles
-        filtered_sku_df = filtered_df_copy[filtered_df_copy['SKU'].astype(str).isin(selected_skus)]
-    else:
-        # Se nenhum SKU foi selecionado, usar TODOS os SKUs (respeitando filtro de origem)
-        filtered_sku_df = filtered_df_copy
+    # Se SKUs específicos foram selecionados, usar apenas eles; senão, TODOS os SKUs
+    # (respeitando filtro de origem)
+    sku_slice = sku_base.narrow(skus=selected_skus)
+    sku_rows = sku_slice.count()
 
     # NOVO: Painel de Resultado Geral dos SKUs selecionados/filtrados
-    if not filtered_sku_df.empty:
+    if sku_rows:
         st.markdown("---")
         st.subheader("Resumo Geral")
         
         # Calcular métricas gerais
-        total_faturamento_skus = filtered_sku_df['Faturamento'].sum()
-        total_vendas_skus = filtered_sku_df.shape[0]  # Total de linhas/vendas
-        total_margem_skus = filtered_sku_df['Margem Contrib. (=)'].sum()
-        total_quantidade_produtos = filtered_sku_df['Qtd.'].sum()  # NOVA MÉTRICA
-        margem_perc_skus = (total_margem_skus / total_faturamento_skus * 100) if total_faturamento_skus > 0 else 0
+        totais_skus = sku_slice.sku_totals()
         
         col1, col2, col3, col4, col5, col6, col7 = st.columns(7)
         
         with col1:
-            st.metric("Faturamento", f"R$ {total_faturamento_skus:,.2f}")
+            st.metric("Faturamento", f"R$ {totais_skus['faturamento']:,.2f}")
         
         with col2:
-            st.metric("Qtd. de Vendas", f"{total_vendas_skus:,}")
+            st.metric("Qtd. de Vendas", f"{totais_skus['vendas']:,}")
         
         with col3:
-            st.metric("Qtd. de Produtos", f"{total_quantidade_produtos:,.0f}")
+            st.metric("Qtd. de Produtos", f"{totais_skus['quantidade']:,.0f}")
         
         with col4:
-            # Calcular preço médio: Faturamento Total / Quantidade Total
-            preco_medio = total_faturamento_skus / total_quantidade_produtos if total_quantidade_produtos > 0 else 0
-            st.metric("Ticket Médio", f"R$ {preco_medio:,.2f}")
+            # Preço médio: Faturamento Total / Quantidade Total
+            st.metric("Ticket Médio", f"R$ {totais_skus['ticket_medio']:,.2f}")
         
         with col5:
-            st.metric("Margem Contrib. (R$)", f"R$ {total_margem_skus:,.2f}")
+            st.metric("Margem Contrib. (R$)", f"R$ {totais_skus['margem']:,.2f}")
         
         with col6:
-            # Calcular margem média por unidade: Margem Total / Quantidade Total
-            margem_media_unitaria = total_margem_skus / total_quantidade_produtos if total_quantidade_produtos > 0 else 0
-            st.metric("Margem Contrib. (R$)/Un.", f"R$ {margem_media_unitaria:,.2f}")
+            # Margem média por unidade: Margem Total / Quantidade Total
+            st.metric("Margem Contrib. (R$)/Un.", f"R$ {totais_skus['margem_unitaria']:,.2f}")
         
         with col7:
-            st.metric("Margem Contrib. (%)", f"{margem_perc_skus:.1f}%")
+            st.metric("Margem Contrib. (%)", f"{totais_skus['mc_perc']:.1f}%")
 
         
     st.markdown("---")
     
-    if not filtered_df.empty:
-        filtered_sku_df_with_desc = filtered_sku_df.copy()
-        sku_desc_map = filtered_sku_df.groupby('SKU')['Descrição do Produto'].first().to_dict()
-        filtered_sku_df_with_desc['SKU_Desc'] = filtered_sku_df_with_desc['SKU'].map(sku_desc_map)
+    if has_orders:
+        # Quantidade e faturamento por mês × "SKU - descrição"
+        sku_monthly = sku_slice.sku_monthly_totals()
 
-        if not filtered_sku_df.empty:
+        if sku_rows:
             # SKUs por quantidade mensal
-            
-            sku_monthly_qty = filtered_sku_df_with_desc.groupby([filtered_sku_df_with_desc['Data'].dt.to_period('M'), 'SKU_Desc']).agg({
-                'Qtd.': 'sum'
-            }).reset_index()
-            sku_monthly_qty['Mês'] = sku_monthly_qty['Data'].dt.strftime('%B')
-            
-            if not sku_monthly_qty.empty:
-                fig_sku_qty = px.bar(
-                    sku_monthly_qty, x='Mês', y='Qtd.', color='SKU_Desc',  # ← Corrigido
-                    title='Quantidade',
-                    labels={'Mês': 'Mês', 'Qtd.': 'Qtd.', 'SKU_Desc': 'SKU - Descrição'}  # ← Corrigido
-                )
+            if not sku_monthly.empty:
+                def build_fig_sku_qty():
+                    fig_sku_qty = px.bar(
+                        sku_monthly, x='Mês', y='Qtd.', color='SKU_Desc',  # ← Corrigido
+                        title='Quantidade',
+                        labels={'Mês': 'Mês', 'Qtd.': 'Qtd.', 'SKU_Desc': 'SKU - Descrição'}  # ← Corrigido
+                    )
 
-                fig_sku_qty.update_layout(height=600)
+                    fig_sku_qty.update_layout(height=600)
+                    return fig_sku_qty
+
+                fig_sku_qty = cached_figure(get_figure_cache(), 'fig_sku_qty', [sku_monthly], build_fig_sku_qty)
                 st.plotly_chart(fig_sku_qty, use_container_width=True)
             
             # SKUs por faturamento mensal
-            sku_monthly_revenue = filtered_sku_df_with_desc.groupby([filtered_sku_df_with_desc['Data'].dt.to_period('M'), 'SKU_Desc']).agg({
-                'Faturamento': 'sum'
-            }).reset_index()
-            sku_monthly_revenue['Mês'] = sku_monthly_revenue['Data'].dt.strftime('%B')
-            
-            if not sku_monthly_revenue.empty:
-                fig_sku_revenue = px.bar(
-                    sku_monthly_revenue, x='Mês', y='Faturamento', color='SKU_Desc',  # ← Corrigido
-                    title='Faturamento',
-                    labels={'Mês': 'Mês', 'Faturamento': 'R$', 'SKU_Desc': 'SKU - Descrição'}  # ← Corrigido
-                )
+            if not sku_monthly.empty:
+                def build_fig_sku_revenue():
+                    fig_sku_revenue = px.bar(
+                        sku_monthly, x='Mês', y='Faturamento', color='SKU_Desc',  # ← Corrigido
+                        title='Faturamento',
+                        labels={'Mês': 'Mês', 'Faturamento': 'R$', 'SKU_Desc': 'SKU - Descrição'}  # ← Corrigido
+                    )
 
-                fig_sku_revenue.update_layout(height=600)
+                    fig_sku_revenue.update_layout(height=600)
+                    return fig_sku_revenue
+
+                fig_sku_revenue = cached_figure(get_figure_cache(), 'fig_sku_revenue', [sku_monthly], build_fig_sku_revenue)
                 st.plotly_chart(fig_sku_revenue, use_container_width=True)
         
     # NOVO: Gráficos de barras agrupadas por SKU
     st.markdown("---")
 
-    if not filtered_sku_df.empty:
-        # Preparar dados para gráficos agrupados
-        monthly_comparison = filtered_sku_df.groupby([
-            filtered_sku_df['Data'].dt.to_period('M'), 'SKU', 'Descrição do Produto'
-        ]).agg({
-            'Qtd.': 'sum',
-            'Faturamento': 'sum'
-        }).reset_index()
-        
-        # Converter período para string legível
-        monthly_comparison['Mês'] = monthly_comparison['Data'].dt.strftime('%b %Y')
-        
-        # Criar coluna combinada SKU + Descrição (abreviada)
-        monthly_comparison['SKU_Label'] = monthly_comparison.apply(
-            lambda row: f"{row['SKU']} - {row['Descrição do Produto'][:100]}{'...' if len(row['Descrição do Produto']) > 100 else ''}", 
-            axis=1
-        )
+    if sku_rows:
+        # Quantidade e faturamento por mês × SKU, com rótulo "SKU - descrição (abreviada)"
+        monthly_comparison = sku_slice.sku_monthly_comparison()
         
         if not monthly_comparison.empty:
+            # Meses em ordem cronológica nos gráficos
+            comparison_months = month_order(monthly_comparison, 'Mês')
             col1, col2 = st.columns(2)
             
             with col1:
                 # Gráfico de Quantidade Agrupado
-                fig_qty_grouped = px.bar(
-                    monthly_comparison, 
-                    x="Mês", 
-                    y="Qtd.", 
-                    color="SKU_Label",
-                    barmode="group",
-                    title="Quantidade",
-                    labels={
-                        'Mês': 'Mês',
-                        'Qtd.': 'Quantidade',
-                        'SKU_Label': 'SKU - Descrição'
-                    },
-                    # Ordenar meses cronologicamente
-                    category_orders={
-                        "Mês": sorted(monthly_comparison['Mês'].unique(), 
-                                    key=lambda x: monthly_comparison[monthly_comparison['Mês'] == x]['Data'].iloc[0])
-                    }
-                )
-                fig_qty_grouped.update_layout(
-                    height=500,
-                    legend=dict(
-                        orientation="v",
-                        yanchor="top",
-                        y=1,
-                        xanchor="left",
-                        x=1.02
-                    ),
-                    margin=dict(r=200)  # Margem direita para a legenda
-                )
-                st.plotly_chart(fig_qty_grouped, use_container_width=True)
-            
-            with col2:
-                # Gráfico de Faturamento Agrupado
-                fig_revenue_grouped = px.bar(
-                    monthly_comparison, 
-                    x="Mês", 
-                    y="Faturamento", 
-                    color="SKU_Label",
-                    barmode="group",
-                    title="Faturamento",
-                    labels={
-                        'Mês': 'Mês',
-                        'Faturamento': 'Faturamento (R$)',
-                        'SKU_Label': 'SKU - Descrição'
-                    },
-                    # Ordenar meses cronologicamente
-                    category_orders={
-                        "Mês": sorted(monthly_comparison['Mês'].unique(), 
-                                    key=lambda x: monthly_comparison[monthly_comparison['Mês'] == x]['Data'].iloc[0])
-                    }
-                )
-                fig_revenue_grouped.update_layout(
-                    height=500,
-                    legend=dict(
-                        orientation="v",
-                        yanchor="top",
-                        y=1,
-                        xanchor="left",
-                        x=1.02
-                    ),
-                    margin=dict(r=200)  # Margem direita para a legenda
-                )
-                st.plotly_chart(fig_revenue_grouped, use_container_width=True)
-            
-            # ADICIONAL: Versão com facetas por Canal de Venda (se houver múltiplos canais)
-            if len(filtered_sku_df['Canal de Venda'].unique()) > 1:
-                st.markdown("---")
-                st.subheader("Por Canal de Venda")
-                
-                # Preparar dados com canal
-                monthly_channel_comparison = filtered_sku_df.groupby([
-                    filtered_sku_df['Data'].dt.to_period('M'), 'SKU', 'Canal de Venda', 'Descrição do Produto'
-                ]).agg({
-                    'Qtd.': 'sum',
-                    'Faturamento': 'sum'
-                }).reset_index()
-                
-                monthly_channel_comparison['Mês'] = monthly_channel_comparison['Data'].dt.strftime('%b %Y')
-                monthly_channel_comparison['SKU_Label'] = monthly_channel_comparison.apply(
-                    lambda row: f"{row['SKU']} - {row['Descrição do Produto'][:15]}{'...' if len(row['Descrição do Produto']) > 15 else ''}", 
-                    axis=1
-                )
-                
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    # Quantidade com facetas por canal
-                    fig_qty_facet = px.bar(
-                        monthly_channel_comparison,
+                def build_fig_qty_grouped():
+                    fig_qty_grouped = px.bar(
+                        monthly_comparison, 
                         x="Mês", 
                         y="Qtd.", 
                         color="SKU_Label",
-                        facet_col="Canal de Venda",
                         barmode="group",
                         title="Quantidade",
                         labels={
                             'Mês': 'Mês',
                             'Qtd.': 'Quantidade',
-                            'SKU_Label': 'SKU - Descrição',
-                            'Canal de Venda': 'Canal'
+                            'SKU_Label': 'SKU - Descrição'
                         },
-                        category_orders={
-                            "Mês": sorted(monthly_channel_comparison['Mês'].unique(), 
-                                        key=lambda x: monthly_channel_comparison[monthly_channel_comparison['Mês'] == x]['Data'].iloc[0])
-                        }
+                        # Ordenar meses cronologicamente
+                        category_orders={"Mês": comparison_months}
                     )
-                    fig_qty_facet.update_layout(height=500)
-                    st.plotly_chart(fig_qty_facet, use_container_width=True)
-                
-                with col2:
-                    # Faturamento com facetas por canal
-                    fig_revenue_facet = px.bar(
-                        monthly_channel_comparison,
+                    fig_qty_grouped.update_layout(
+                        height=500,
+                        legend=dict(
+                            orientation="v",
+                            yanchor="top",
+                            y=1,
+                            xanchor="left",
+                            x=1.02
+                        ),
+                        margin=dict(r=200)  # Margem direita para a legenda
+                    )
+                    return fig_qty_grouped
+
+                fig_qty_grouped = cached_figure(get_figure_cache(), 'fig_qty_grouped', [monthly_comparison], build_fig_qty_grouped)
+                st.plotly_chart(fig_qty_grouped, use_container_width=True)
+            
+            with col2:
+                # Gráfico de Faturamento Agrupado
+                def build_fig_revenue_grouped():
+                    fig_revenue_grouped = px.bar(
+                        monthly_comparison, 
                         x="Mês", 
                         y="Faturamento", 
                         color="SKU_Label",
-                        facet_col="Canal de Venda",
                         barmode="group",
                         title="Faturamento",
                         labels={
                             'Mês': 'Mês',
                             'Faturamento': 'Faturamento (R$)',
-                            'SKU_Label': 'SKU - Descrição',
-                            'Canal de Venda': 'Canal'
+                            'SKU_Label': 'SKU - Descrição'
                         },
-                        category_orders={
-                            "Mês": sorted(monthly_channel_comparison['Mês'].unique(), 
-                                        key=lambda x: monthly_channel_comparison[monthly_channel_comparison['Mês'] == x]['Data'].iloc[0])
-                        }
+                        # Ordenar meses cronologicamente
+                        category_orders={"Mês": comparison_months}
+                    )
+                    fig_revenue_grouped.update_layout(
+                        height=500,
+                        legend=dict(
+                            orientation="v",
+                            yanchor="top",
+                            y=1,
+                            xanchor="left",
+                            x=1.02
+                        ),
+                        margin=dict(r=200)  # Margem direita para a legenda
                     )
-                    fig_revenue_facet.update_layout(height=500)
+                    return fig_revenue_grouped
+
+                fig_revenue_grouped = cached_figure(get_figure_cache(), 'fig_revenue_grouped', [monthly_comparison], build_fig_revenue_grouped)
+                st.plotly_chart(fig_revenue_grouped, use_container_width=True)
+            
+            # ADICIONAL: Versão com facetas por Canal de Venda (se houver múltiplos canais)
+            if len(sku_slice.distinct('Canal de Venda')) > 1:
+                st.markdown("---")
+                st.subheader("Por Canal de Venda")
+                
+                # Mesmos dados por canal (rótulo mais curto: os gráficos são divididos por canal)
+                monthly_channel_comparison = sku_slice.sku_monthly_comparison(by_channel=True, label_length=15)
+                channel_months = month_order(monthly_channel_comparison, 'Mês')
+                
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    # Quantidade com facetas por canal
+                    def build_fig_qty_facet():
+                        fig_qty_facet = px.bar(
+                            monthly_channel_comparison,
+                            x="Mês", 
+                            y="Qtd.", 
+                            color="SKU_Label",
+                            facet_col="Canal de Venda",
+                            barmode="group",
+                            title="Quantidade",
+                            labels={
+                                'Mês': 'Mês',
+                                'Qtd.': 'Quantidade',
+                                'SKU_Label': 'SKU - Descrição',
+                                'Canal de Venda': 'Canal'
+                            },
+                            category_orders={"Mês": channel_months}
+                        )
+                        fig_qty_facet.update_layout(height=500)
+                        return fig_qty_facet
+
+                    fig_qty_facet = cached_figure(get_figure_cache(), 'fig_qty_facet', [monthly_channel_comparison], build_fig_qty_facet)
+                    st.plotly_chart(fig_qty_facet, use_container_width=True)
+                
+                with col2:
+                    # Faturamento com facetas por canal
+                    def build_fig_revenue_facet():
+                        fig_revenue_facet = px.bar(
+                            monthly_channel_comparison,
+                            x="Mês", 
+                            y="Faturamento", 
+                            color="SKU_Label",
+                            facet_col="Canal de Venda",
+                            barmode="group",
+                            title="Faturamento",
+                            labels={
+                                'Mês': 'Mês',
+                                'Faturamento': 'Faturamento (R$)',
+                                'SKU_Label': 'SKU - Descrição',
+                                'Canal de Venda': 'Canal'
+                            },
+                            category_orders={"Mês": channel_months}
+                        )
+                        fig_revenue_facet.update_layout(height=500)
+                        return fig_revenue_facet
+
+                    fig_revenue_facet = cached_figure(get_figure_cache(), 'fig_revenue_facet', [monthly_channel_comparison], build_fig_revenue_facet)
                     st.plotly_chart(fig_revenue_facet, use_container_width=True)
 
             # Tabela completa
@@ -1149,105 +898,8 @@ with tab2:
         else:
             st.info("Use os filtros acima para visualizar gráficos detalhados.")
 
-        if not filtered_df.empty:
-            # Aplicar os mesmos filtros da busca na tabela (removendo filtros duplicados)
-            table_filtered_df = filtered_sku_df.copy()  # Usar o mesmo filtro dos gráficos
-            
-            # Definir todas as colunas disponíveis na ordem correta (incluindo Origem de Aquisição)
-            all_columns = [
-                'SKU', 'Descrição do Produto', 'Origem de Aquisição', 'Faturamento', 'Qtd.', 'Valor Unit.',
-                'Custo (-) Total', 'Custo (-) Unitário', 'Imposto (-) Total', 'Imposto (-) Unitário',
-                'Frete Vendedor (-)', 'Tarifa de Venda (-) Total', 'Tarifa de Venda (-) Unitária',
-                'Margem Contrib. (=) Total', 'Margem Contrib. (=) Unitária', 'MC em %'
-            ]
-        
-            # Colunas visíveis por padrão (incluindo Origem de Aquisição)
-            default_visible_columns = [
-                'Descrição do Produto', 'Origem de Aquisição', 'Faturamento', 'Qtd.', 'Valor Unit.',
-                'Custo (-) Unitário', 'Imposto (-) Unitário', 'Tarifa de Venda (-) Unitária',
-                'Margem Contrib. (=) Unitária', 'MC em %'
-            ]
-            
-            # Seletor de colunas (expansível)
-            with st.expander("Selecione as colunas para exibir"):
-                selected_columns = st.multiselect(
-                    "Escolha as colunas:",
-                    options=all_columns,
-                    default=default_visible_columns,
-                    key="table_columns"
-                )
-            
-            # Agrupar dados por SKU com cálculos corretos (incluindo Origem de Aquisição)
-            resumo_sku = table_filtered_df.groupby('SKU').agg({
-                'Descrição do Produto': 'first',
-                'Origem de Aquisição': 'first',
-                'Faturamento': 'sum',
-                'Qtd.': 'sum',
-                'Valor Unit.': 'mean',
-                'Custo (-)': ['sum', 'mean'],
-                'Imposto (-)': ['sum', 'mean'],
-                'Frete Vendedor (-)': 'mean',
-                'Tarifa de Venda (-)': ['sum', 'mean'],
-                'Margem Contrib. (=)': ['sum', 'mean']
-            }).reset_index()
-
-            # Achatar colunas multi-nível
-            resumo_sku.columns = [
-                'SKU', 'Descrição do Produto', 'Origem de Aquisição',
-                'Faturamento', 'Qtd.', 'Valor Unit.',
-                'Custo (-) Total', 'Custo (-) Unitário',
-                'Imposto (-) Total', 'Imposto (-) Unitário',
-                'Frete Vendedor (-)', 
-                'Tarifa de Venda (-) Total', 'Tarifa de Venda (-) Unitária',
-                'Margem Contrib. (=) Total', 'Margem Contrib. (=) Unitária'
-            ]
-            
-            # CORREÇÃO: Calcular MC em % corretamente baseado nos totais agrupados
-            # MC% = (Margem Total / Faturamento Total) * 100
-            resumo_sku['MC em %'] = np.where(
-                resumo_sku['Faturamento'] > 0,
-                (resumo_sku['Margem Contrib. (=) Total'] / resumo_sku['Faturamento']) * 100,
-                0
-            )
-
-            # Filtrar apenas as colunas selecionadas mantendo a ordem original
-            ordered_selected_columns = [col for col in all_columns if col in selected_columns]
-            display_resumo = resumo_sku[ordered_selected_columns]
-
-            def color_mc(val):
-                if pd.isna(val):
-                    return ''
-                if val <= 20:
-                    return 'background-color:#FF0000'
-                elif val < 30:
-                    return 'background-color:#C7AF00'
-                elif val < 40:
-                    return 'background-color:#00C700'
-                else:
-                    return 'background-color:#00D9FF'
-
-            # Criar dicionário de formatação dinâmico baseado nas colunas selecionadas
-            format_dict = {}
-            for col in selected_columns:
-                if col in ['Faturamento', 'Custo (-) Total', 'Custo (-) Unitário', 'Imposto (-) Total', 
-                        'Imposto (-) Unitário', 'Valor Unit.', 'Frete Vendedor (-)',
-                        'Tarifa de Venda (-) Total', 'Tarifa de Venda (-) Unitária',
-                        'Margem Contrib. (=) Total', 'Margem Contrib. (=) Unitária']:
-                    format_dict[col] = 'R$ {:,.2f}'
-                elif col == 'Qtd.':
-                    format_dict[col] = '{:,.0f}'
-                elif col == 'MC em %':
-                    format_dict[col] = '{:.1f}%'
-
-            # Aplicar formatação e coloração
-            if 'MC em %' in selected_columns:
-                styled = display_resumo.style.format(format_dict).applymap(color_mc, subset=['MC em %'])
-            else:
-                styled = display_resumo.style.format(format_dict)
-
-            # Exibir tabela
-            st.dataframe(styled, use_container_width=True, hide_index=True)
-
+        if has_orders:
+            render_sku_table(sku_slice)
         else:
             st.info("Nenhum dado encontrado para o período selecionado.")
 
@@ -1262,282 +914,73 @@ with tab2:
     st.markdown("---")
     st.subheader("Evolução Mensal")
 
-    if not filtered_sku_df.empty:
-        # Seletor de visualização: SKU ou Código (ID do Anúncio)
-        col_vis1, col_vis2 = st.columns([1, 3])
-        
-        with col_vis1:
-            view_by = st.selectbox(
-                "Visualizar por:",
-                ["SKU", "ID do Anúncio (Código)"],
-                key="view_by_selector"
-            )
-        
-        with col_vis2:
-            st.write("")  # Espaçamento
-        
-        # Definir coluna de agrupamento baseada na seleção
-        group_column = 'SKU' if view_by == "SKU" else 'Código'
-        
-        # Verificar se a coluna existe
-        if group_column not in filtered_sku_df.columns:
-            st.error(f"Coluna '{group_column}' não encontrada no dataset.")
-            st.info(f"Colunas disponíveis: {list(filtered_sku_df.columns)}")
-        else:
-            # Preparar dados mensais
-            filtered_sku_df_analysis = filtered_sku_df.copy()
-            filtered_sku_df_analysis['Mes_Ano'] = filtered_sku_df_analysis['Data'].dt.to_period('M')
-
-            # Agrupar por mês e SKU/Código
-            monthly_performance = filtered_sku_df_analysis.groupby([
-                'Mes_Ano', group_column, 'Descrição do Produto'
-            ]).agg({
-                'ID da venda': 'count',  # Quantidade de vendas
-                'Faturamento': 'sum'
-            }).reset_index()
-
-            monthly_performance.columns = ['Mes_Ano', group_column, 'Descrição do Produto', 'Qtd', 'Faturamento']
-
-            # Ordenar por período CRONOLOGICAMENTE
-            monthly_performance = monthly_performance.sort_values(['Mes_Ano', group_column])
-
-            # CRIAR IDENTIFICADOR AQUI (ANTES DE USAR)
-            monthly_performance['Identificador'] = monthly_performance.apply(
-                lambda row: f"{row[group_column]} - {row['Descrição do Produto'][:50]}{'...' if len(row['Descrição do Produto']) > 50 else ''}", 
-                axis=1
-            )
-
-            # Criar string de mês MANTENDO a ordenação cronológica
-            monthly_performance['Mes_Ano_Str'] = monthly_performance['Mes_Ano'].dt.strftime('%b/%Y')
-
-            # Calcular variação percentual em relação ao mês anterior DENTRO DE CADA GRUPO
-            monthly_performance = monthly_performance.sort_values(['Identificador', 'Mes_Ano'])
-
-            monthly_performance['Qtd_Anterior'] = monthly_performance.groupby('Identificador')['Qtd'].shift(1)
-            monthly_performance['Fat_Anterior'] = monthly_performance.groupby('Identificador')['Faturamento'].shift(1)
-
-            monthly_performance['Var_Qtd'] = np.where(
-                monthly_performance['Qtd_Anterior'] > 0,  # ← Aqui está o problema!
-                ((monthly_performance['Qtd'] - monthly_performance['Qtd_Anterior']) / monthly_performance['Qtd_Anterior'] * 100),
-                0  # ← Retorna 0 quando não há venda anterior
-            )
-
-            monthly_performance['Var_Fat'] = np.where(
-                monthly_performance['Fat_Anterior'] > 0,
-                ((monthly_performance['Faturamento'] - monthly_performance['Fat_Anterior']) / monthly_performance['Fat_Anterior'] * 100),
-                0
-            )
-
+    if sku_rows:
+        render_sku_evolution(sku_slice)
 
-            # CRIAR TABELA PIVOTADA COM MULTIINDEX (como no relatório Diário)
-            if not monthly_performance.empty:
-                # Obter lista ordenada de meses (cronologicamente)
-                meses_ordenados = monthly_performance.sort_values('Mes_Ano')['Mes_Ano_Str'].unique().tolist()
-                
-                # Preparar dados no formato longo para pivot
-                data_for_pivot = []
-                
-                for _, row in monthly_performance.iterrows():
-                    mes = row['Mes_Ano_Str']
-                    identificador = row['Identificador']
-                    
-                    # Adicionar linha para Qtd
-                    data_for_pivot.append({
-                        'Identificador': identificador,
-                        'Mes': mes,
-                        'Metrica': 'Qtd',
-                        'Valor': row['Qtd']
-                    })
-                    
-                    # Adicionar linha para R$
-                    data_for_pivot.append({
-                        'Identificador': identificador,
-                        'Mes': mes,
-                        'Metrica': 'R$',
-                        'Valor': row['Faturamento']
-                    })
-                    
-                    # Adicionar linha para Var%Qtd
-                    data_for_pivot.append({
-                        'Identificador': identificador,
-                        'Mes': mes,
-                        'Metrica': 'Var%Qtd',
-                        'Valor': row['Var_Qtd']
-                    })
-                    
-                    # Adicionar linha para Var%Fat
-                    data_for_pivot.append({
-                        'Identificador': identificador,
-                        'Mes': mes,
-                        'Metrica': 'Var%Fat',
-                        'Valor': row['Var_Fat']
-                    })
-                
-                df_long = pd.DataFrame(data_for_pivot)
-                
-                # Converter 'Mes' para Categorical com ordem específica (cronológica)
-                df_long['Mes'] = pd.Categorical(df_long['Mes'], categories=meses_ordenados, ordered=True)
-                
-                # Criar pivot table com MultiIndex
-                pivot_table = df_long.pivot_table(
-                    index='Identificador',
-                    columns=['Mes', 'Metrica'],
-                    values='Valor',
-                    fill_value=0,
-                    aggfunc='sum',
-                    sort=False  # Não reordenar alfabeticamente
-                )
-                
-                # Reordenar colunas explicitamente na ordem cronológica
-                ordered_columns = []
-                for mes in meses_ordenados:
-                    for metrica in ['Qtd', 'R$', 'Var%Qtd', 'Var%Fat']:
-                        if (mes, metrica) in pivot_table.columns:
-                            ordered_columns.append((mes, metrica))
-                
-                pivot_table = pivot_table[ordered_columns]
-                
-                # Função para colorir variações
-                def color_variation(val):
-                    if pd.isna(val) or val == 0:
-                        return ''
-                    elif val > 0:
-                        return 'background-color: #90EE90; color: #006400; font-weight: bold'
-                    else:
-                        return 'background-color: #FFB6C1; color: #8B0000; font-weight: bold'
-                
-                # Criar dicionário de formatação
-                format_dict = {}
-                for col in pivot_table.columns:
-                    mes, metrica = col
-                    if metrica == 'Qtd':
-                        format_dict[col] = '{:,.0f}'
-                    elif metrica == 'R$':
-                        format_dict[col] = 'R$ {:,.2f}'
-                    elif metrica in ['Var%Qtd', 'Var%Fat']:
-                        format_dict[col] = '{:+.1f}%'
-                
-                # Aplicar estilo
-                styled_table = pivot_table.style.format(format_dict)
-                
-                # Aplicar cores nas colunas de variação
-                for col in pivot_table.columns:
-                    mes, metrica = col
-                    if metrica in ['Var%Qtd', 'Var%Fat']:
-                        styled_table = styled_table.applymap(color_variation, subset=[col])
-                
-                st.dataframe(styled_table, use_container_width=True, height=500)
-            else:
-                st.info("Nenhum dado encontrado para o relatório de desempenho mensal.")
-            
-            # Filtrar dados com variação (excluir primeiro registro de cada item)
-            trend_data = monthly_performance[monthly_performance['Qtd_Anterior'].notna()].copy()
-            
-            if not trend_data.empty and len(trend_data) > 0:              
-                # Gráficos de evolução absoluta
-                st.markdown("---")
-                
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    fig_abs_qtd = px.line(
-                        monthly_performance,
-                        x='Mes_Ano_Str',
-                        y='Qtd',
-                        color='Identificador',
-                        markers=True,
-                        title='Evolução (Qtd.)',
-                        labels={'Mes_Ano_Str': 'Mês', 'Qtd': 'Quantidade de Vendas'},
-                        height=400
-                    )
-                    st.plotly_chart(fig_abs_qtd, use_container_width=True)
-                
-                with col2:
-                    fig_abs_fat = px.line(
-                        monthly_performance,
-                        x='Mes_Ano_Str',
-                        y='Faturamento',
-                        color='Identificador',
-                        markers=True,
-                        title='Evolução (R$)',
-                        labels={'Mes_Ano_Str': 'Mês', 'Faturamento': 'Faturamento (R$)'},
-                        height=400
-                    )
-                    st.plotly_chart(fig_abs_fat, use_container_width=True)
-            
-            st.markdown("---")
+        st.markdown("---")
     st.subheader("Variação de Preço")
     
-    if not filtered_sku_df.empty:        
-        # Preparar dados mensais com preços e margens médias
-        pricing_monthly = filtered_sku_df.groupby([
-            filtered_sku_df['Data'].dt.to_period('M'), 'SKU', 'Descrição do Produto'
-        ]).agg({
-            'Valor Unit.': 'mean',  # Preço médio unitário
-            'Margem Contrib. (=)': 'sum',  # Margem total
-            'Qtd.': 'sum',  # Quantidade total
-            'Faturamento': 'sum'  # Faturamento total
-        }).reset_index()
+    if sku_rows:        
+        # Preço médio e margem unitária por mês × SKU, em ordem cronológica
+        pricing = sku_slice.pricing_monthly()
+        meses_ordenados = pricing['Mes_Str'].unique().tolist()
         
-        # Calcular margem unitária
-        pricing_monthly['MC Unitária (R$)'] = pricing_monthly['Margem Contrib. (=)'] / pricing_monthly['Qtd.']
-        pricing_monthly['MC Unitária (%)'] = (pricing_monthly['Margem Contrib. (=)'] / pricing_monthly['Faturamento'] * 100)
-        
-        # Criar identificador e formatar mês
-        pricing_monthly['Identificador'] = pricing_monthly.apply(
-            lambda row: f"{row['SKU']} - {row['Descrição do Produto'][:50]}{'...' if len(row['Descrição do Produto']) > 50 else ''}", 
-            axis=1
-        )
-        pricing_monthly['Mes_Str'] = pricing_monthly['Data'].dt.strftime('%b/%Y')
-        
-        # Ordenar cronologicamente
-        pricing_monthly = pricing_monthly.sort_values('Data')
-        meses_ordenados = pricing_monthly['Mes_Str'].unique().tolist()
-        
-        if not pricing_monthly.empty:
+        if not pricing.empty:
             # GRÁFICOS DE LINHA - Evolução temporal            
             col1, col2, col3 = st.columns(3)
             
             with col1:
-                fig_preco = px.line(
-                    pricing_monthly,
-                    x='Mes_Str',
-                    y='Valor Unit.',
-                    color='Identificador',
-                    markers=True,
-                    title='Preço Unitário (R$)',
-                    labels={'Mes_Str': 'Mês', 'Valor Unit.': 'Preço (R$)'},
-                    height=400,
-                    category_orders={'Mes_Str': meses_ordenados}  # ← ADICIONADO
-                )
+                def build_fig_preco():
+                    fig_preco = px.line(
+                        pricing,
+                        x='Mes_Str',
+                        y='Valor Unit.',
+                        color='Identificador',
+                        markers=True,
+                        title='Preço Unitário (R$)',
+                        labels={'Mes_Str': 'Mês', 'Valor Unit.': 'Preço (R$)'},
+                        height=400,
+                        category_orders={'Mes_Str': meses_ordenados}  # ← ADICIONADO
+                    )
+                    return fig_preco
+
+                fig_preco = cached_figure(get_figure_cache(), 'fig_preco', [pricing], build_fig_preco)
                 st.plotly_chart(fig_preco, use_container_width=True)
             
             with col2:
-                fig_mc_rs = px.line(
-                    pricing_monthly,
-                    x='Mes_Str',
-                    y='MC Unitária (R$)',
-                    color='Identificador',
-                    markers=True,
-                    title='Margem de Contribuição Unitária (R$)',
-                    labels={'Mes_Str': 'Mês', 'MC Unitária (R$)': 'MC (R$)'},
-                    height=400,
-                    category_orders={'Mes_Str': meses_ordenados}  # ← ADICIONADO
-                )
+                def build_fig_mc_rs():
+                    fig_mc_rs = px.line(
+                        pricing,
+                        x='Mes_Str',
+                        y='MC Unitária (R$)',
+                        color='Identificador',
+                        markers=True,
+                        title='Margem de Contribuição Unitária (R$)',
+                        labels={'Mes_Str': 'Mês', 'MC Unitária (R$)': 'MC (R$)'},
+                        height=400,
+                        category_orders={'Mes_Str': meses_ordenados}  # ← ADICIONADO
+                    )
+                    return fig_mc_rs
+
+                fig_mc_rs = cached_figure(get_figure_cache(), 'fig_mc_rs', [pricing], build_fig_mc_rs)
                 st.plotly_chart(fig_mc_rs, use_container_width=True)
             
             with col3:
-                fig_mc_perc = px.line(
-                    pricing_monthly,
-                    x='Mes_Str',
-                    y='MC Unitária (%)',
-                    color='Identificador',
-                    markers=True,
-                    title='Margem de Contribuição Unitária (%)',
-                    labels={'Mes_Str': 'Mês', 'MC Unitária (%)': 'MC (%)'},
-                    height=400,
-                    category_orders={'Mes_Str': meses_ordenados}  # ← ADICIONADO
-                )
+                def build_fig_mc_perc():
+                    fig_mc_perc = px.line(
+                        pricing,
+                        x='Mes_Str',
+                        y='MC Unitária (%)',
+                        color='Identificador',
+                        markers=True,
+                        title='Margem de Contribuição Unitária (%)',
+                        labels={'Mes_Str': 'Mês', 'MC Unitária (%)': 'MC (%)'},
+                        height=400,
+                        category_orders={'Mes_Str': meses_ordenados}  # ← ADICIONADO
+                    )
+                    return fig_mc_perc
+
+                fig_mc_perc = cached_figure(get_figure_cache(), 'fig_mc_perc', [pricing], build_fig_mc_perc)
                 st.plotly_chart(fig_mc_perc, use_container_width=True)
             
             st.markdown("---")
@@ -1545,92 +988,15 @@ with tab2:
             # TABELA PIVOTADA
             st.markdown("#### Tabela")
             
-            # Preparar dados para pivot
-            pricing_pivot_data = []
-            
-            for _, row in pricing_monthly.iterrows():
-                mes = row['Mes_Str']
-                identificador = row['Identificador']
-                
-                # Preço Unitário
-                pricing_pivot_data.append({
-                    'Identificador': identificador,
-                    'Mes': mes,
-                    'Metrica': 'Preço (R$)',
-                    'Valor': row['Valor Unit.']
-                })
-                
-                # MC Unitária (R$)
-                pricing_pivot_data.append({
-                    'Identificador': identificador,
-                    'Mes': mes,
-                    'Metrica': 'MC (R$)',
-                    'Valor': row['MC Unitária (R$)']
-                })
-                
-                # MC Unitária (%)
-                pricing_pivot_data.append({
-                    'Identificador': identificador,
-                    'Mes': mes,
-                    'Metrica': 'MC (%)',
-                    'Valor': row['MC Unitária (%)']
-                })
-            
-            df_pricing_long = pd.DataFrame(pricing_pivot_data)
-            
-            # Converter mes para categorical
-            df_pricing_long['Mes'] = pd.Categorical(df_pricing_long['Mes'], categories=meses_ordenados, ordered=True)
-            
-            # Criar pivot
-            pricing_pivot = df_pricing_long.pivot_table(
-                index='Identificador',
-                columns=['Mes', 'Metrica'],
-                values='Valor',
-                fill_value=0,
-                aggfunc='sum',
-                sort=False
-            )
-            
-            # Reordenar colunas
-            ordered_cols = []
-            for mes in meses_ordenados:
-                for metrica in ['Preço (R$)', 'MC (R$)', 'MC (%)']:
-                    if (mes, metrica) in pricing_pivot.columns:
-                        ordered_cols.append((mes, metrica))
-            
-            pricing_pivot = pricing_pivot[ordered_cols]
+            # Tabela Identificador × (mês, métrica) montada de forma vetorizada
+            pricing_table = pricing_pivot(pricing)
             
             # Formatação
-            format_dict = {}
-            for col in pricing_pivot.columns:
-                mes, metrica = col
-                if 'MC (%)' in metrica:
-                    format_dict[col] = '{:.1f}%'
-                else:
-                    format_dict[col] = 'R$ {:,.2f}'
+            format_dict = pricing_table_format(pricing_table.columns)
             
             # Colorir MC (%)
-            def color_mc_pricing(val):
-                if pd.isna(val) or val == 0:
-                    return ''
-                if val <= 20:
-                    return 'background-color:#FF0000; color: white'
-                elif val < 30:
-                    return 'background-color:#C7AF00; color: white'
-                elif val < 40:
-                    return 'background-color:#00C700; color: white'
-                else:
-                    return 'background-color:#00D9FF; color: white'
-            
-            styled_pricing = pricing_pivot.style.format(format_dict)
-            
-            # Aplicar cores apenas nas colunas de MC (%)
-            for col in pricing_pivot.columns:
-                mes, metrica = col
-                if 'MC (%)' in metrica:
-                    styled_pricing = styled_pricing.applymap(color_mc_pricing, subset=[col])
-            
-            st.dataframe(styled_pricing, use_container_width=True, height=500)
+            bands = {col: 'mc_pricing' for col in pricing_table.columns if 'MC (%)' in col[1]}
+            render_paged_table(pricing_table, format_dict, bands, key="pricing_table", use_container_width=True, height=500)
             
             st.markdown("""
             **Legenda (%):**
@@ -1640,173 +1006,360 @@ with tab2:
             - 🔵 ≥ 40%
             """)
             
-with tab3:
-    st.subheader("Canal de Envio")
+
+# Relatórios: só a seção selecionada é calculada (st.tabs executaria as quatro a cada rerun)
+REPORT_SECTIONS = ["💲 Faturamento", "📈 Desempenho por SKU", "🚚 Canal de Envio", "🏛️ Impostos"]
+report_section = st.radio("Relatório:", REPORT_SECTIONS, horizontal=True, key="report_section", label_visibility="collapsed")
+
+with profiler.section(f"relatorio: {report_section}", rows_in=filtered_rows):
+    if report_section == "💲 Faturamento":
+        st.subheader("Vendas")
     
-    if not filtered_df.empty:
-        col1, col2 = st.columns(2)
+        # Vendas por mês e status, separadas em aprovados e cancelados
+        sales = profiler.measure("vendas_mensais", filtered.monthly_sales, value_column)
+        monthly_aprovados = sales['aprovados']
+        monthly_cancelados = sales['cancelados']
+
+        if not sales['vendas'].empty:
+            # Gráfico de vendas mensais com aprovados e cancelados (em cache enquanto os agregados não mudam)
+            def build_fig_monthly():
+                fig_monthly = make_subplots(
+                    rows=2, cols=1,
+                    subplot_titles=[f'{view_option} Mensal', 'Quantidade de Vendas Mensais'],
+                    vertical_spacing=0.1
+                )
         
-        with col1:
-            # NOVO: Gráfico de pizza da distribuição de fretes por quantidade de pedidos
-            if 'Frete' in filtered_df.columns:
-                frete_distribution = filtered_df['Frete'].value_counts()
-                
-                if not frete_distribution.empty:
-                    fig_frete_dist = px.pie(
-                        values=frete_distribution.values, 
-                        names=frete_distribution.index,
-                        title='Distribuição de Fretes por Quantidade de Pedidos'
+                # Adicionar barras de aprovados
+                if not monthly_aprovados.empty:
+                    fig_monthly.add_trace(
+                        go.Bar(x=monthly_aprovados['Data_str'], y=monthly_aprovados[value_column], 
+                            name=f'{view_option} Aprovado', marker_color='#1f77b4'),
+                        row=1, col=1
+                    )
+        
+                # Adicionar barras de cancelados
+                if not monthly_cancelados.empty:
+                    fig_monthly.add_trace(
+                        go.Bar(x=monthly_cancelados['Data_str'], y=monthly_cancelados[value_column], 
+                            name=f'{view_option} Cancelado', marker_color='#ff0000'),
+                        row=1, col=1
                     )
-                    st.plotly_chart(fig_frete_dist, use_container_width=True)   
+        
+                # Quantidade - aprovados
+                if not monthly_aprovados.empty:
+                    fig_monthly.add_trace(
+                        go.Scatter(x=monthly_aprovados['Data_str'], y=monthly_aprovados['ID da venda'], 
+                                mode='lines+markers', name='Qtd. Aprovada', marker_color='#1f77b4'),
+                        row=2, col=1
+                    )
+        
+                # Quantidade - cancelados
+                if not monthly_cancelados.empty:
+                    fig_monthly.add_trace(
+                        go.Scatter(x=monthly_cancelados['Data_str'], y=monthly_cancelados['ID da venda'], 
+                                mode='lines+markers', name='Qtd. Cancelada', marker_color='#ff0000'),
+                        row=2, col=1
+                    )
+        
+                fig_monthly.update_layout(
+                    height=700, 
+                    showlegend=True,
+                    margin=dict(t=60, b=60, l=60, r=60),
+                    barmode='stack'
+                )
+                fig_monthly.update_yaxes(title_text="Valor (R$)", row=1, col=1)
+                fig_monthly.update_yaxes(title_text="Quantidade", row=2, col=1)
+                return fig_monthly
+
+            fig_monthly = cached_figure(
+                get_figure_cache(), 'fig_monthly', [monthly_aprovados, monthly_cancelados, view_option, value_column],
+                build_fig_monthly
+            )
+            st.plotly_chart(fig_monthly, use_container_width=True)
+        
+            # Tabela de vendas mensais com aprovados e cancelados
+            monthly_table = sales['tabela']
+            render_table(monthly_table, {col: '{:,.2f}' for col in monthly_table.columns}, use_container_width=True)
+
+            st.subheader("Faturamento por Origem de Aquisição")
+        
+            # Filtro para status de pedidos
+            status_filter = st.radio(
+                "Filtrar por status:",
+                ["Ambos", "Apenas Aprovados", "Apenas Cancelados"],
+                horizontal=True,
+                key="origem_status_filter"
+            )
+        
+            # Verificar se existe coluna Origem de Aquisição
+            if 'Origem de Aquisição' in filtered.columns:
+                # Valor por mês e origem, com percentual do mês (status conforme o filtro)
+                origem_status = {"Apenas Aprovados": 'aprovados', "Apenas Cancelados": 'cancelados'}.get(status_filter)
+                origem_monthly = filtered.origin_monthly(value_column, origem_status)
+            
+                if not origem_monthly.empty:
+                    def build_fig_origem():
+                        fig_origem = px.bar(
+                            origem_monthly,
+                            x='Data_str',
+                            y=value_column,
+                            color='Origem de Aquisição',
+                            title=f'{view_option} por Origem de Aquisição',
+                            labels={'Data_str': 'Mês', value_column: f'{view_option} (R$)'},
+                            text='Texto'
+                        )
+                        fig_origem.update_traces(textposition='inside', textfont_size=10)
+                        fig_origem.update_layout(height=500)
+                        return fig_origem
+
+                    fig_origem = cached_figure(get_figure_cache(), 'fig_origem', [origem_monthly, view_option, value_column], build_fig_origem)
+                    st.plotly_chart(fig_origem, use_container_width=True)
                 else:
-                    st.info("Nenhum dado encontrado para o período selecionado.")         
+                    st.info("Nenhum dado encontrado para o filtro selecionado.")
+            else:
+                st.warning("Coluna 'Origem de Aquisição' não encontrada no dataset.")
+
+            st.subheader("Pedidos")
+        
+            if filtered_rows:
+                col1, col2 = st.columns(2)
+            
+                with col1:
+                    # Pedidos por canal com status
+                    canal_status = filtered.orders_by_channel_status()
+                    color_map = dict(zip(canal_status['Label'], canal_status['Cor']))
                 
+                    def build_fig_canal_status():
+                        fig_canal = px.pie(
+                            canal_status, 
+                            values='Quantidade', 
+                            names='Label',
+                            title='Pedidos por Canal de Venda e Status',
+                            color='Label',
+                            color_discrete_map=color_map
+                        )
+                        return fig_canal
 
-with tab4:
-    st.subheader("Análise de Impostos")
-    
-    if not filtered_df.empty:
-        # CORREÇÃO: Filtrar pedidos com lógica específica por mês
-        if 'Status Pedido' in filtered_df.columns:
-            # Criar dataframe para análise com lógica condicional por mês
-            def apply_tax_filter(df):
-                """Aplica filtro de impostos baseado no mês específico"""
-                result_df = pd.DataFrame()
+                    fig_canal = cached_figure(get_figure_cache(), 'fig_canal_status', [canal_status], build_fig_canal_status)
+                    st.plotly_chart(fig_canal, use_container_width=True)
+            
+                with col2:
+                    # Pedidos por canal
+                    canal_count = filtered.orders_by_channel()
                 
-                for period, group in df.groupby(df['Data'].dt.to_period('M')):
-                    # Exceções: Abril, Maio e Junho de 2025 - considerar todos os pedidos
-                    if (period.year == 2025 and period.month in [4, 5, 6]):
-                        # Para estes meses, usar todos os pedidos
-                        filtered_group = group.copy()
-                        filter_info = "todos os pedidos"
-                    else:
-                        # Para outros meses, usar apenas pedidos pagos
-                        filtered_group = group[group['Status Pedido'] == 'Pago'].copy()
-                        filter_info = "apenas pedidos pagos"
-                    
-                    # Adicionar informação do filtro aplicado
-                    filtered_group['Filtro_Aplicado'] = filter_info
-                    result_df = pd.concat([result_df, filtered_group], ignore_index=True)
+                    if not canal_count.empty:
+                        def build_fig_canal():
+                            fig_canal = px.bar(
+                                x=canal_count.index, y=canal_count.values,
+                                title='Pedidos por Canal de Venda'
+                            )
+                            return fig_canal
+
+                        fig_canal = cached_figure(get_figure_cache(), 'fig_canal', [canal_count], build_fig_canal)
+                        st.plotly_chart(fig_canal, use_container_width=True)
+            
+                # Evolução diária de pedidos - Corrigido
+                daily = filtered.daily_orders()
+            
+                if not daily.empty:
+                    def build_fig_daily():
+                        fig_daily = make_subplots(
+                            rows=1, cols=2,
+                            subplot_titles=['Pedidos Diários (Qtd.)', 'Faturamento Diário (R$)']
+                        )
+                
+                        fig_daily.add_trace(
+                            go.Scatter(x=daily['Data'], y=daily['ID da venda'], 
+                                    mode='lines+markers', name='Pedidos'),
+                            row=1, col=1
+                        )
+                
+                        fig_daily.add_trace(
+                            go.Scatter(x=daily['Data'], y=daily['Faturamento'], 
+                                    mode='lines+markers', name='Faturamento', line=dict(color='orange')),
+                            row=1, col=2
+                        )
                 
-                return result_df
+                        fig_daily.update_layout(height=400, showlegend=False)
+                        return fig_daily
+
+                    fig_daily = cached_figure(get_figure_cache(), 'fig_daily', [daily], build_fig_daily)
+                    st.plotly_chart(fig_daily, use_container_width=True)
             
-            tax_filtered_df = apply_tax_filter(filtered_df)
+                st.markdown("---")
+
+                st.subheader("Diário por Conta e Canal")
             
-            if tax_filtered_df.empty:
-                st.warning("Nenhum dado encontrado após aplicar os filtros de impostos.")
-                st.info("Verificando status disponíveis:")
-                st.write(filtered_df['Status Pedido'].value_counts())
+                # Pedidos e faturamento por dia × (canal, conta), com totais por canal
+                pivot_qtd, pivot_fat = profiler.measure("pivots_diarios", filtered.daily_channel_pivots)
+            
+                if not pivot_qtd.empty:
+                    st.write("**Vendas Diárias (Qtd.)**")
+                    render_paged_table_fragment(pivot_qtd, {col: '{:,.0f}' for col in pivot_qtd.columns}, key="daily_qtd_table",
+                                       use_container_width=True)
+                
+                    st.write("**Faturamento Diário (R$)**")
+                    render_paged_table_fragment(pivot_fat, {col: 'R$ {:,.2f}' for col in pivot_fat.columns}, key="daily_fat_table",
+                                       use_container_width=True)
+                else:
+                    st.info("Nenhum dado encontrado para o relatório diário.")
             else:
-                # Mostrar informações sobre os filtros aplicados
-                filter_summary = tax_filtered_df.groupby([
-                    tax_filtered_df['Data'].dt.to_period('M').astype(str), 'Filtro_Aplicado'
-                ]).size().reset_index(name='Quantidade')
+                st.info("Nenhum dado encontrado para o período selecionado.")
+
+
+    elif report_section == "📈 Desempenho por SKU":
+        sku_index = profiler.measure("indice_busca_skus", get_sku_search_index, data_version)
+        profiler.measure("relatorio_skus", render_sku_report, filtered, sku_index)
+
+    elif report_section == "🚚 Canal de Envio":
+        st.subheader("Canal de Envio")
+    
+        if filtered_rows:
+            col1, col2 = st.columns(2)
+        
+            with col1:
+                # NOVO: Gráfico de pizza da distribuição de fretes por quantidade de pedidos
+                if 'Frete' in filtered.columns:
+                    frete_distribution = filtered.shipping_distribution()
                 
-                with st.expander("ℹ️"):
-                    st.dataframe(filter_summary, use_container_width=True, hide_index=True)
-                    st.caption("**Abril, Maio e Junho/2025:** Todos os pedidos | **Demais meses:** Apenas pedidos pagos")
+                    if not frete_distribution.empty:
+                        def build_fig_frete_dist():
+                            return px.pie(
+                                values=frete_distribution.values,
+                                names=frete_distribution.index,
+                                title='Distribuição de Fretes por Quantidade de Pedidos'
+                            )
+
+                        fig_frete_dist = cached_figure(get_figure_cache(), 'fig_frete_dist', [frete_distribution], build_fig_frete_dist)
+                        st.plotly_chart(fig_frete_dist, use_container_width=True)   
+                    else:
+                        st.info("Nenhum dado encontrado para o período selecionado.")         
                 
-                st.info(f"Analisando {len(tax_filtered_df)} pedidos de um total de {len(filtered_df)} pedidos (com filtros específicos por mês).")
+
+    elif report_section == "🏛️ Impostos":
+        st.subheader("Análise de Impostos")
+    
+        if filtered_rows:
+            # CORREÇÃO: Filtrar pedidos com lógica específica por mês
+            if 'Status Pedido' in filtered.columns:
+                # Status considerados por mês vêm da política em tax_policy.json
+                # (aplicada ao cubo diário: cada linha soma 'Pedidos' pedidos)
+                try:
+                    tax_policy = load_tax_policy()
+                except (OSError, ValueError) as e:
+                    st.error(f"Erro ao ler a política de impostos: {str(e)}")
+                    tax_policy = None
+                # Sem st.stop(): a execução chega ao fim e o perfil é registrado
+                if tax_policy is not None:
+                    tax = profiler.measure("impostos", filtered.tax_report, tax_policy)
+            
+                    if tax['totais']['pedidos'] == 0:
+                        st.warning("Nenhum dado encontrado após aplicar os filtros de impostos.")
+                        st.info("Verificando status disponíveis:")
+                        st.write(filtered.order_counts('Status Pedido'))
+                    else:
+                        # Mostrar informações sobre os filtros aplicados
+                        filter_summary = tax['resumo_filtros']
                 
-                # Impostos por período - COM FILTROS ESPECÍFICOS POR MÊS
-                tax_analysis = tax_filtered_df.groupby(tax_filtered_df['Data'].dt.to_period('M')).agg({
-                    'Imposto (-)': 'sum',
-                    'Faturamento': 'sum'
-                }).reset_index()
+                        with st.expander("ℹ️"):
+                            st.dataframe(filter_summary, use_container_width=True, hide_index=True)
+                            st.caption(tax_policy_legend(tax_policy))
                 
-                tax_analysis['Data_str'] = tax_analysis['Data'].astype(str)
+                        st.info(f"Analisando {tax['totais']['pedidos']} pedidos de um total de {filtered_rows} pedidos (com filtros específicos por mês).")
                 
-                # CORREÇÃO: Calcular percentual correto de impostos sobre faturamento
-                tax_analysis['% Imposto'] = np.where(
-                    tax_analysis['Faturamento'] > 0,
-                    (tax_analysis['Imposto (-)'] / tax_analysis['Faturamento'] * 100),
-                    0
-                )
+                        # Impostos por período - COM FILTROS ESPECÍFICOS POR MÊS
+                        tax_analysis = tax['mensal']
                 
-                if not tax_analysis.empty:
-                    col1, col2 = st.columns(2)
+                        if not tax_analysis.empty:
+                            col1, col2 = st.columns(2)
                     
-                    with col1:
-                        fig_tax_value = px.bar(
-                            tax_analysis, x='Data_str', y='Imposto (-)',
-                            title='Impostos por Mês (R$)',
-                            labels={'Data_str': 'Mês', 'Imposto (-)': 'Impostos (R$)'}
-                        )
-                        fig_tax_value.update_layout(
-                            yaxis_tickformat=',.2f',
-                            yaxis_title='Impostos (R$)'
-                        )
-                        st.plotly_chart(fig_tax_value, use_container_width=True)
+                            with col1:
+                                def build_fig_tax_value():
+                                    fig_tax_value = px.bar(
+                                        tax_analysis, x='Data_str', y='Imposto (-)',
+                                        title='Impostos por Mês (R$)',
+                                        labels={'Data_str': 'Mês', 'Imposto (-)': 'Impostos (R$)'}
+                                    )
+                                    fig_tax_value.update_layout(
+                                        yaxis_tickformat=',.2f',
+                                        yaxis_title='Impostos (R$)'
+                                    )
+                                    return fig_tax_value
+
+                                fig_tax_value = cached_figure(get_figure_cache(), 'fig_tax_value', [tax_analysis], build_fig_tax_value)
+                                st.plotly_chart(fig_tax_value, use_container_width=True)
                     
-                    with col2:
-                        fig_tax_perc = px.line(
-                            tax_analysis, x='Data_str', y='% Imposto',
-                            title='Impostos sobre Faturamento Bruto (%)',
-                            markers=True,
-                            labels={'Data_str': 'Mês', '% Imposto': 'Percentual de Impostos (%)'}
-                        )
-                        fig_tax_perc.update_layout(
-                            yaxis_tickformat='.2f',
-                            yaxis_title='Percentual de Impostos (%)'
-                        )
-                        st.plotly_chart(fig_tax_perc, use_container_width=True)
-                
-                # Impostos por canal e conta - COM FILTROS ESPECÍFICOS POR MÊS
-                tax_breakdown = tax_filtered_df.groupby(['Canal de Venda', 'Conta']).agg({
-                    'Imposto (-)': 'sum',
-                    'Faturamento': 'sum',
-                    'ID da venda': 'count'
-                }).reset_index()
-                
-                # Renomear coluna para clareza
-                tax_breakdown = tax_breakdown.rename(columns={'ID da venda': 'Qtd. Pedidos'})
+                            with col2:
+                                def build_fig_tax_perc():
+                                    fig_tax_perc = px.line(
+                                        tax_analysis, x='Data_str', y='% Imposto',
+                                        title='Impostos sobre Faturamento Bruto (%)',
+                                        markers=True,
+                                        labels={'Data_str': 'Mês', '% Imposto': 'Percentual de Impostos (%)'}
+                                    )
+                                    fig_tax_perc.update_layout(
+                                        yaxis_tickformat='.2f',
+                                        yaxis_title='Percentual de Impostos (%)'
+                                    )
+                                    return fig_tax_perc
+
+                                fig_tax_perc = cached_figure(get_figure_cache(), 'fig_tax_perc', [tax_analysis], build_fig_tax_perc)
+                                st.plotly_chart(fig_tax_perc, use_container_width=True)
                 
-                # Calcular percentual correto
-                tax_breakdown['% Imposto'] = np.where(
-                    tax_breakdown['Faturamento'] > 0,
-                    (tax_breakdown['Imposto (-)'] / tax_breakdown['Faturamento'] * 100),
-                    0
-                )
+                        # Impostos por canal e conta - COM FILTROS ESPECÍFICOS POR MÊS
+                        tax_breakdown = tax['canal_conta']
                 
-                if not tax_breakdown.empty:
-                    st.subheader("Impostos por Canal de Venda e Conta")
-                    st.caption("*Abril, Maio e Junho/2025: todos os pedidos | Demais meses: apenas pedidos pagos")
-                    st.dataframe(
-                        tax_breakdown.style.format({
-                            'Imposto (-)': 'R$ {:,.2f}',
-                            'Faturamento': 'R$ {:,.2f}',
-                            '% Imposto': '{:.2f}%',
-                            'Qtd. Pedidos': '{:,.0f}'
-                        }),
-                        use_container_width=True,
-                        hide_index=True
-                    )
+                        if not tax_breakdown.empty:
+                            st.subheader("Impostos por Canal de Venda e Conta")
+                            st.caption("*" + tax_policy_legend(tax_policy, bold=False))
+                            st.dataframe(
+                                tax_breakdown.style.format(TAX_BREAKDOWN_FORMAT),
+                                use_container_width=True,
+                                hide_index=True
+                            )
                     
-                    # Adicionar resumo estatístico
-                    st.subheader("Resumo")
+                            # Adicionar resumo estatístico
+                            st.subheader("Resumo")
                     
-                    total_impostos = tax_filtered_df['Imposto (-)'].sum()
-                    total_faturamento = tax_filtered_df['Faturamento'].sum()
-                    percentual_medio = (total_impostos / total_faturamento * 100) if total_faturamento > 0 else 0
-                    total_pedidos_filtrados = len(tax_filtered_df)
+                            totais = tax['totais']
                     
-                    col1, col2, col3, col4 = st.columns(4)
+                            col1, col2, col3, col4 = st.columns(4)
                     
-                    with col1:
-                        st.metric("Total Impostos", f"R$ {total_impostos:,.2f}")
+                            with col1:
+                                st.metric("Total Impostos", f"R$ {totais['impostos']:,.2f}")
                     
-                    with col2:
-                        st.metric("Faturamento Bruto", f"R$ {total_faturamento:,.2f}")
+                            with col2:
+                                st.metric("Faturamento Bruto", f"R$ {totais['faturamento']:,.2f}")
                     
-                    with col3:
-                        st.metric("% Médio de Impostos", f"{percentual_medio:.2f}%")
+                            with col3:
+                                st.metric("% Médio de Impostos", f"{totais['percentual']:.2f}%")
                     
-                    with col4:
-                        st.metric("Pedidos Analisados", f"{total_pedidos_filtrados:,}")
+                            with col4:
+                                st.metric("Pedidos Analisados", f"{totais['pedidos']:,}")
                 
+            else:
+                st.error("Coluna 'Status Pedido' não encontrada no dataset.")
+                st.info("Colunas disponíveis:")
+                st.write(filtered.columns)
         else:
-            st.error("Coluna 'Status Pedido' não encontrada no dataset.")
-            st.info("Colunas disponíveis:")
-            st.write(list(filtered_df.columns))
-    else:
-        st.info("Nenhum dado encontrado para o período selecionado.")
\ No newline at end of file
+            st.info("Nenhum dado encontrado para o período selecionado.")
+
+# Painel de perfil: registros desta execução (o log JSONL recebe os mesmos registros)
+profiler.finish()
+if profiler.enabled and profile_requested:
+    with st.sidebar.expander("⏱️ Perfil da execução", expanded=True):
+        perfil = profiler.table()
+        perfil['secao'] = np.where(perfil['nivel'] > 0, '↳ ' + perfil['secao'], perfil['secao'])
+        st.dataframe(
+            perfil.drop(columns='nivel'),
+            column_config={
+                'secao': 'Seção',
+                'tempo_ms': st.column_config.NumberColumn('Tempo', format='%.1f ms'),
+                'linhas_entrada': st.column_config.NumberColumn('Linhas (entrada)', format='%d'),
+                'linhas_saida': st.column_config.NumberColumn('Linhas (saída)', format='%d'),
+                'memoria_pico_mb': st.column_config.NumberColumn('Pico de memória', format='%.1f MB'),
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+        st.caption(f"Execução {profiler.run_id} · sessão {profiler.session_id} · log em {PROFILE_LOG_FILE}")
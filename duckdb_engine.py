@@ -0,0 +1,394 @@
+import logging
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from analytics import (CUBE_MEASURES, add_sku_mc_percent, channel_metrics, daily_orders, daily_pivots,
+                       monthly_sales_tables, order_counts, orders_by_channel, orders_by_channel_status, origin_monthly,
+                       overview_kpis, period_bounds, previous_period_bounds, pricing_columns, shipping_distribution,
+                       sku_label, sku_monthly_comparison, sku_monthly_performance, sku_monthly_totals, sku_totals,
+                       tax_tables)
+from ingestion import CACHE_DIR, CATEGORICAL_COLUMNS, STORE_FILE
+
+try:
+    import duckdb
+except ImportError:
+    # Motor opcional (pip install duckdb, ver requirements.txt): sem o pacote o
+    # dashboard calcula tudo com pandas
+    duckdb = None
+
+logger = logging.getLogger('dashboard.duckdb')
+
+# Motor das seções agregadas: "pandas" (padrão) ou "duckdb" (SQL sobre o consolidado em Parquet)
+QUERY_ENGINE = os.environ.get("DASHBOARD_ENGINE", "pandas")
+
+# Limite de memória do DuckDB (ex.: "2GB"); acima dele as consultas usam disco. Vazio: padrão do DuckDB
+MEMORY_LIMIT = os.environ.get("DASHBOARD_DUCKDB_MEMORY", "")
+
+# Colunas categóricas no frame do dashboard (encode_dimensions e add_sku_columns)
+_CATEGORY_COLUMNS = CATEGORICAL_COLUMNS + ['Descrição do Produto']
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _literal(text):
+    return "'" + text.replace("'", "''") + "'"
+
+
+class DuckDBEngine:
+    """Consultas SQL (DuckDB) sobre o consolidado de pedidos em Parquet, sem carregá-lo no pandas.
+
+    A visão "pedidos" reproduz o frame da carga: SKU e descrição vazios viram
+    'Sem SKU'/'Sem descrição' (add_sku_columns) e a ordem das linhas é a do arquivo,
+    ordenado por 'Data' (file_row_number), para que "primeiro valor" tenha o mesmo
+    significado. Só os resultados agregados voltam como DataFrames. Pode ser
+    compartilhado entre sessões: cada consulta usa um cursor próprio.
+    """
+
+    def __init__(self, store_path):
+        if duckdb is None:
+            raise ImportError("O motor DuckDB requer o pacote duckdb (pip install duckdb)")
+        self.store_path = store_path
+        self._connection = duckdb.connect()
+        if MEMORY_LIMIT:
+            self._connection.execute(f"SET memory_limit = {_literal(MEMORY_LIMIT)}")
+        self._connection.execute(f"""
+            CREATE VIEW pedidos AS
+            SELECT * REPLACE (
+                COALESCE("SKU", 'Sem SKU') AS "SKU",
+                COALESCE("Descrição do Produto", 'Sem descrição') AS "Descrição do Produto"
+            )
+            FROM read_parquet({_literal(store_path)}, file_row_number = true)
+        """)
+        self._types = dict(self._connection.execute("SELECT column_name, column_type FROM (DESCRIBE pedidos)").fetchall())
+        self.columns = [col for col in self._types if col != 'file_row_number']
+        self._sku_catalog = None
+
+    def query(self, sql, params=()):
+        """Executa sql e retorna o resultado como DataFrame, com as dimensões categóricas como na carga."""
+        with self._connection.cursor() as cursor:
+            result = cursor.execute(sql, list(params)).df()
+        for col in result.columns:
+            if col in _CATEGORY_COLUMNS:
+                result[col] = result[col].astype('category')
+        return result
+
+    def sum_expression(self, column):
+        # Soma sem nulos como no pandas (0 em grupos vazios); inteiros continuam inteiros
+        if self._types.get(column) in ('TINYINT', 'SMALLINT', 'INTEGER', 'BIGINT'):
+            return f"CAST(COALESCE(sum({_quote(column)}), 0) AS BIGINT)"
+        return f"COALESCE(fsum({_quote(column)}), 0)"
+
+    def sku_catalog(self):
+        """Uma linha por SKU (índice) com a descrição da primeira ocorrência e 'SKU_Opcao'.
+
+        Rótulos do seletor como os de add_sku_columns, sobre todo o consolidado;
+        consultado uma vez por motor.
+        """
+        if self._sku_catalog is None:
+            catalog = self.query("""
+                SELECT "SKU", first("Descrição do Produto" ORDER BY file_row_number) AS "Descrição do Produto"
+                FROM pedidos
+                GROUP BY "SKU"
+                ORDER BY "SKU"
+            """)
+            catalog.index = catalog.pop('SKU').astype(str)
+            catalog['SKU_Opcao'] = sku_label(catalog.index.to_series(), catalog['Descrição do Produto'])
+            self._sku_catalog = catalog
+        return self._sku_catalog
+
+    def filter(self, period_type, start_date, end_date, canal_selected, conta_selected, today=None):
+        """Recorte com os filtros da barra lateral (mesma semântica de apply_filters)."""
+        conditions, params = [], []
+        start, end = period_bounds(period_type, start_date, end_date, today)
+        if start is not None:
+            conditions.append('"Data" >= ?')
+            params.append(datetime.combine(start, datetime.min.time()))
+        if end is not None:
+            conditions.append('"Data" < ?')
+            params.append(datetime.combine(end, datetime.min.time()))
+        if canal_selected != "Todos":
+            conditions.append('"Canal de Venda" = ?')
+            params.append(canal_selected)
+        if conta_selected != "Todas":
+            conditions.append('"Conta" = ?')
+            params.append(conta_selected)
+        return DuckDBSlice(self, conditions, params)
+
+
+def engine_requested():
+    """True quando DASHBOARD_ENGINE=duckdb e o pacote duckdb está instalado."""
+    return QUERY_ENGINE == "duckdb" and duckdb is not None
+
+
+def engine_unavailable_reason(cache_dir=CACHE_DIR):
+    """Mensagem quando DASHBOARD_ENGINE=duckdb não pode ser atendido (None: disponível ou não pedido)."""
+    if QUERY_ENGINE != "duckdb":
+        return None
+    if duckdb is None:
+        return "DASHBOARD_ENGINE=duckdb, mas o pacote duckdb não está instalado (pip install duckdb). Usando pandas."
+    if not os.path.exists(os.path.join(cache_dir, STORE_FILE)):
+        return f"DASHBOARD_ENGINE=duckdb, mas não há consolidado em {cache_dir}. Usando pandas."
+    return None
+
+
+def open_engine(cache_dir=CACHE_DIR):
+    """Motor sobre o consolidado de cache_dir, ou None: motor pandas, sem o pacote duckdb ou sem consolidado."""
+    if QUERY_ENGINE != "duckdb":
+        return None
+    reason = engine_unavailable_reason(cache_dir)
+    if reason:
+        logger.warning(reason)
+        return None
+    return DuckDBEngine(os.path.join(cache_dir, STORE_FILE))
+
+
+class DuckDBSlice:
+    """Recorte filtrado do consolidado: cada agregação é uma consulta, com o mesmo resultado da função do analytics.
+
+    Mesma interface de analytics.FrameSlice. As agregações que não têm consulta
+    própria recebem de _cube só o agrupamento de que precisam e usam a função do
+    analytics sobre ele.
+    """
+
+    def __init__(self, engine, conditions, params):
+        self.engine = engine
+        self.columns = engine.columns
+        self._conditions = conditions
+        self._params = params
+
+    def narrow(self, origem=None, skus=None):
+        """Recorte restrito a uma origem de aquisição e/ou a uma lista de SKUs (vazia: todos)."""
+        conditions, params = list(self._conditions), list(self._params)
+        if origem is not None:
+            conditions.append('"Origem de Aquisição" = ?')
+            params.append(origem)
+        if skus:
+            conditions.append(f'"SKU" IN ({", ".join("?" * len(skus))})')
+            params.extend(skus)
+        return DuckDBSlice(self.engine, conditions, params)
+
+    def _query(self, select, params=()):
+        # select lê da CTE "recorte" (pedidos já filtrados) e pode encadear outras CTEs (", nome AS (...)")
+        where = " AND ".join(self._conditions) or "true"
+        return self.engine.query(f"WITH recorte AS (SELECT * FROM pedidos WHERE {where}) {select}",
+                                 self._params + list(params))
+
+    def _cube(self, dimensions, measures=(), grain=None):
+        """Cubo do recorte como o de analytics.build_daily_cube, só com as colunas pedidas.
+
+        grain: 'day' ou 'month' inclui 'Data' truncada no dia ou no mês (None: sem
+        'Data'). As linhas saem na ordem da primeira ocorrência de cada grupo no
+        consolidado: "primeiro valor" por grupo no cubo é o mesmo que nos pedidos.
+        """
+        keys = ([f"date_trunc('{grain}', \"Data\") AS \"Data\""] if grain else []) + [_quote(col) for col in dimensions]
+        sums = [f"{self.engine.sum_expression(col)} AS {_quote(col)}" for col in measures]
+        return self._query(f"""
+            SELECT {', '.join(keys + sums + ['count(*) AS "Pedidos"'])}
+            FROM recorte
+            GROUP BY ALL
+            ORDER BY min(file_row_number)
+        """)
+
+    def count(self):
+        """Quantidade de pedidos do recorte."""
+        return int(self._query("SELECT count(*) AS n FROM recorte")['n'].iloc[0])
+
+    def date_range(self):
+        """Primeira e última 'Data' do recorte (NaT se vazio)."""
+        bounds = self._query('SELECT min("Data") AS inicio, max("Data") AS fim FROM recorte')
+        return bounds['inicio'].iloc[0], bounds['fim'].iloc[0]
+
+    def distinct(self, column):
+        """Valores presentes de column, em ordem alfabética."""
+        values = self._query(f"SELECT DISTINCT {_quote(column)} AS valor FROM recorte WHERE {_quote(column)} IS NOT NULL")
+        return sorted(values['valor'].tolist())
+
+    def previous_period(self):
+        """Como analytics.get_previous_period_data (sem filtros de canal e conta); None se o recorte é vazio."""
+        start, end = self.date_range()
+        if pd.isna(start):
+            return None
+        previous_start, previous_end = previous_period_bounds(start, end)
+        return DuckDBSlice(self.engine, ['"Data" >= ?', '"Data" <= ?'],
+                           [previous_start.to_pydatetime(), previous_end.to_pydatetime()])
+
+    def _kpi_cube(self):
+        return self._cube(['Canal de Venda', 'Conta', 'Status Pedido'], ['Faturamento', 'Margem Contrib. (=)'])
+
+    def overview_kpis(self, previous=None):
+        """Como analytics.overview_kpis."""
+        return overview_kpis(self._kpi_cube(), previous._kpi_cube() if previous is not None else None)
+
+    def channel_metrics(self, previous=None):
+        """Como analytics.channel_metrics."""
+        return channel_metrics(self._kpi_cube(), previous._kpi_cube() if previous is not None else None)
+
+    def monthly_sales(self, value_column='Faturamento'):
+        """Como analytics.monthly_sales."""
+        if value_column not in CUBE_MEASURES:
+            raise ValueError(f"Coluna de valor desconhecida: {value_column}")
+        sales = self._query(f"""
+            SELECT date_trunc('month', "Data") AS "Data", "Status Pedido",
+                   {self.engine.sum_expression(value_column)} AS {_quote(value_column)}, count(*) AS "ID da venda"
+            FROM recorte
+            WHERE "Data" IS NOT NULL AND "Status Pedido" IS NOT NULL
+            GROUP BY 1, 2
+            ORDER BY 1, 2
+        """)
+        sales['Data'] = sales['Data'].dt.to_period('M')
+        return monthly_sales_tables(sales, value_column)
+
+    def origin_monthly(self, value_column='Faturamento', status=None):
+        """Como analytics.origin_monthly."""
+        cube = self._cube(['Status Pedido', 'Origem de Aquisição'], [value_column], 'month')
+        return origin_monthly(cube, value_column, status)
+
+    def orders_by_channel_status(self):
+        """Como analytics.orders_by_channel_status."""
+        return orders_by_channel_status(self._cube(['Canal de Venda', 'Status Pedido']))
+
+    def orders_by_channel(self):
+        """Como analytics.orders_by_channel."""
+        return orders_by_channel(self._cube(['Canal de Venda']))
+
+    def daily_orders(self):
+        """Como analytics.daily_orders."""
+        return daily_orders(self._cube([], ['Faturamento'], 'day'))
+
+    def daily_channel_pivots(self):
+        """Como analytics.daily_channel_pivots."""
+        daily = self._query(f"""
+            SELECT CAST("Data" AS DATE) AS "Data", "Canal de Venda", "Conta",
+                   count(*) AS "Qtd. Vendas", {self.engine.sum_expression('Faturamento')} AS "Faturamento"
+            FROM recorte
+            WHERE "Data" IS NOT NULL AND "Canal de Venda" IS NOT NULL AND "Conta" IS NOT NULL
+            GROUP BY 1, 2, 3
+            ORDER BY 1, 2, 3
+        """)
+        daily['Data'] = daily['Data'].dt.date
+        return daily_pivots(daily)
+
+    def order_counts(self, column):
+        """Como analytics.order_counts."""
+        return order_counts(self._cube([column]), column)
+
+    def shipping_distribution(self):
+        """Como analytics.shipping_distribution."""
+        return shipping_distribution(self._cube(['Frete']))
+
+    def sku_options(self):
+        """Como analytics.sku_options (rótulos do catálogo de todo o consolidado, como na carga)."""
+        options = self._query(f"""
+            SELECT "SKU", {self.engine.sum_expression('Qtd.')} AS "Qtd."
+            FROM recorte
+            GROUP BY "SKU"
+            ORDER BY "SKU"
+        """).set_index('SKU')
+        options.insert(0, 'SKU_Opcao', options.index.astype(str).map(self.engine.sku_catalog()['SKU_Opcao']))
+        return options
+
+    def sku_totals(self):
+        """Como analytics.sku_totals."""
+        return sku_totals(self._cube([], ['Faturamento', 'Margem Contrib. (=)', 'Qtd.']))
+
+    def sku_summary(self):
+        """Como analytics.sku_summary."""
+        total = self.engine.sum_expression
+        summary = self._query(f"""
+            SELECT "SKU",
+                   first("Descrição do Produto" ORDER BY file_row_number) AS "Descrição do Produto",
+                   arg_min("Origem de Aquisição", file_row_number) FILTER (WHERE "Origem de Aquisição" IS NOT NULL)
+                       AS "Origem de Aquisição",
+                   {total('Faturamento')} AS "Faturamento",
+                   {total('Qtd.')} AS "Qtd.",
+                   avg("Valor Unit.") AS "Valor Unit.",
+                   {total('Custo (-)')} AS "Custo (-) Total",
+                   avg("Custo (-)") AS "Custo (-) Unitário",
+                   {total('Imposto (-)')} AS "Imposto (-) Total",
+                   avg("Imposto (-)") AS "Imposto (-) Unitário",
+                   avg("Frete Vendedor (-)") AS "Frete Vendedor (-)",
+                   {total('Tarifa de Venda (-)')} AS "Tarifa de Venda (-) Total",
+                   avg("Tarifa de Venda (-)") AS "Tarifa de Venda (-) Unitária",
+                   {total('Margem Contrib. (=)')} AS "Margem Contrib. (=) Total",
+                   avg("Margem Contrib. (=)") AS "Margem Contrib. (=) Unitária"
+            FROM recorte
+            GROUP BY "SKU"
+            ORDER BY "SKU"
+        """)
+        return add_sku_mc_percent(summary)
+
+    def sku_monthly_totals(self):
+        """Como analytics.sku_monthly_totals."""
+        return sku_monthly_totals(self._cube(['SKU', 'Descrição do Produto'], ['Qtd.', 'Faturamento'], 'month'))
+
+    def sku_monthly_comparison(self, by_channel=False, label_length=100):
+        """Como analytics.sku_monthly_comparison."""
+        dimensions = ['SKU'] + (['Canal de Venda'] if by_channel else []) + ['Descrição do Produto']
+        cube = self._cube(dimensions, ['Qtd.', 'Faturamento'], 'month')
+        return sku_monthly_comparison(cube, by_channel, label_length)
+
+    def sku_monthly_performance(self, group_column='SKU'):
+        """Como analytics.sku_monthly_performance."""
+        return sku_monthly_performance(self._cube([group_column, 'Descrição do Produto'], ['Faturamento'], 'month'),
+                                       group_column)
+
+    def pricing_monthly(self):
+        """Como analytics.pricing_monthly."""
+        total = self.engine.sum_expression
+        pricing = self._query(f"""
+            SELECT date_trunc('month', "Data") AS "Data", "SKU", "Descrição do Produto",
+                   avg("Valor Unit.") AS "Valor Unit.",
+                   {total('Margem Contrib. (=)')} AS "Margem Contrib. (=)",
+                   {total('Qtd.')} AS "Qtd.",
+                   {total('Faturamento')} AS "Faturamento"
+            FROM recorte
+            WHERE "Data" IS NOT NULL
+            GROUP BY 1, 2, 3
+            ORDER BY 1, 2, 3
+        """)
+        pricing['Data'] = pricing['Data'].dt.to_period('M')
+        return pricing_columns(pricing)
+
+    def tax_report(self, policy):
+        """Como analytics.tax_report, sem 'pedidos' (as linhas consideradas ficam no DuckDB).
+
+        A regra de cada pedido e o filtro de status (apply_tax_policy) são aplicados no
+        SQL, que retorna só o cubo mensal dos pedidos considerados por regra, canal e
+        conta; as tabelas saem dele como no pandas.
+        """
+        # Regra do mês de cada pedido: primeiro período da política que o contém, senão a padrão (0)
+        month = '(year("Data") * 12 + month("Data") - 1)'
+        cases, params = [], []
+        for i, rule in enumerate(policy[1:], start=1):
+            cases.append(f"WHEN {month} BETWEEN ? AND ? THEN {i}")
+            params.extend([rule['inicio'], rule['fim']])
+        rule_expression = f"CASE {' '.join(cases)} ELSE 0 END" if cases else "0"
+
+        description = f"CASE regra {' '.join(f'WHEN {i} THEN ?' for i in range(len(policy)))} END"
+        params.extend(rule['descricao'] for rule in policy)
+
+        allowed = []
+        for i, rule in enumerate(policy):
+            if rule.get('status') is None:
+                allowed.append(f"regra = {i}")
+            elif rule['status']:
+                allowed.append(f'(regra = {i} AND "Status Pedido" IN ({", ".join("?" * len(rule["status"]))}))')
+                params.extend(rule['status'])
+
+        total = self.engine.sum_expression
+        taxed = self._query(f"""
+            , regras AS (SELECT *, {rule_expression} AS regra FROM recorte WHERE "Data" IS NOT NULL)
+            SELECT date_trunc('month', "Data") AS "Data", {description} AS "Filtro_Aplicado",
+                   "Canal de Venda", "Conta",
+                   {total('Imposto (-)')} AS "Imposto (-)", {total('Faturamento')} AS "Faturamento",
+                   count(*) AS "Pedidos"
+            FROM regras
+            WHERE {' OR '.join(allowed) or 'false'}
+            GROUP BY ALL
+            ORDER BY ALL
+        """, params)
+        return tax_tables(taxed)
@@ -0,0 +1,20 @@
+import json
+import sys
+
+from ingestion import DataLoadError, load_export
+
+if __name__ == "__main__":
+    # Processo de leitura usado por ingestion.load_exports (parallel):
+    #   python export_worker.py <cache_dir> <planilha> [<planilha> ...]
+    # Lê cada planilha e grava o cache Parquet por arquivo, de onde o processo principal
+    # carrega o resultado; imprime uma linha JSON por arquivo ('erro' só quando a
+    # planilha não pôde ser lida). Roda como script próprio, e não como filho (fork ou
+    # spawn) do processo que chamou, para não herdar nem reexecutar o Streamlit
+    cache_dir = sys.argv[1]
+    for path in sys.argv[2:]:
+        try:
+            load_export(path, cache_dir)
+            error = None
+        except DataLoadError as e:
+            error = str(e)
+        print(json.dumps({'path': path, 'erro': error}, ensure_ascii=False), flush=True)
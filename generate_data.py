@@ -0,0 +1,297 @@
+import argparse
+import os
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+from ingestion import MONEY_COLUMNS, PERCENT_COLUMN
+
+# Colunas da exportação financeira do MercadoTurbo, na ordem da planilha
+EXPORT_COLUMNS = ['ID da venda', 'Data', 'Canal de Venda', 'Conta', 'Status Pedido', 'SKU', 'Código',
+                  'Descrição do Produto', 'Origem de Aquisição', 'Frete', 'Qtd.'] + MONEY_COLUMNS + [PERCENT_COLUMN]
+
+# Linhas de dados que cabem em uma planilha (limite do Excel menos título, linha vazia e cabeçalho)
+EXCEL_MAX_ROWS = 1_048_576 - 3
+
+# Distribuições das dimensões (valor -> peso)
+CHANNELS = {'Mercado Livre': 0.7, 'Shopee': 0.3}
+ACCOUNTS = {'EvolutionX': 0.6, 'XRack': 0.4}
+STATUSES = {'Pago': 0.78, 'Enviado': 0.08, 'Cancelado': 0.11, 'Devolvido': 0.03}
+ORIGINS = {'Orgânico': 0.6, 'Ads': 0.4}
+SHIPPING = {'Full': 0.45, 'Flex': 0.2, 'Coleta': 0.35}
+
+# Percentuais sobre o faturamento: imposto e tarifa de venda por canal
+TAX_RATE = 0.10
+SALE_FEE = {'Mercado Livre': 0.12, 'Shopee': 0.14}
+
+# Vocabulário das descrições de produto
+_PRODUCTS = ['Suporte Articulado para TV', 'Rack para Sala', 'Painel para TV', 'Prateleira Flutuante',
+             'Mesa de Centro', 'Estante Multiuso', 'Aparador', 'Nicho Decorativo', 'Cabeceira Casal',
+             'Escrivaninha', 'Penteadeira', 'Sapateira', 'Cômoda', 'Balcão de Cozinha']
+_ATTRIBUTES = ['Compacto', 'Reforçado', 'Com Gavetas', 'Com Portas', 'Giratório', 'Retrátil',
+               'Grande', 'Pequeno', 'Premium', 'Básico']
+_COLORS = ['Preto', 'Branco', 'Freijó', 'Nogueira', 'Cinza', 'Off White', 'Carvalho', 'Cumaru']
+
+
+def _choice(rng, options, size):
+    values = np.array(list(options), dtype=object)
+    weights = np.array(list(options.values()), dtype=float)
+    return values[rng.choice(len(values), size=size, p=weights / weights.sum())]
+
+
+def build_catalog(skus, rng):
+    """Catálogo de SKUs: código, anúncio, descrição, preço base, custo e popularidade (Zipf)."""
+    codes = np.arange(1000, 1000 + skus)
+    descriptions = (np.array(_PRODUCTS, dtype=object)[rng.integers(0, len(_PRODUCTS), skus)] + ' '
+                    + np.array(_ATTRIBUTES, dtype=object)[rng.integers(0, len(_ATTRIBUTES), skus)] + ' '
+                    + np.array(_COLORS, dtype=object)[rng.integers(0, len(_COLORS), skus)])
+    popularity = 1.0 / np.arange(1, skus + 1) ** 1.1
+    return pd.DataFrame({
+        'SKU': codes,
+        'Código': ['MLB' + str(code) for code in rng.integers(10 ** 9, 10 ** 10, skus)],
+        'Descrição do Produto': descriptions,
+        'preco': np.round(rng.lognormal(np.log(120), 0.8, skus), 2),
+        'custo': rng.uniform(0.35, 0.6, skus),
+        'peso': rng.permutation(popularity / popularity.sum()),
+    })
+
+
+def daily_counts(rows, start, days, rng):
+    """Pedidos por dia: mais vendas em dias úteis e leve crescimento ao longo do período."""
+    dates = pd.date_range(start, periods=days, freq='D')
+    weights = np.where(dates.dayofweek < 5, 1.3, 1.0) * np.linspace(1.0, 1.5, days)
+    return dates, rng.multinomial(rows, weights / weights.sum())
+
+
+def format_brl(values):
+    """Valores no formato da planilha exportada ('R$ 1.234,56', '-R$ 5,00')."""
+    return [('-R$ ' if value < 0 else 'R$ ') + f"{abs(value):,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+            for value in values.tolist()]
+
+
+def generate_orders(catalog, dates, counts, rng, first_id=1, formatted=True):
+    """Pedidos dos dias em dates (counts pedidos em cada), com as colunas de EXPORT_COLUMNS.
+
+    Com formatted=True os valores saem como na planilha exportada: datas e valores
+    monetários/percentuais em texto no formato brasileiro. Com formatted=False saem
+    já numéricos (MC de 0 a 1), como depois da limpeza.
+    """
+    rows = int(counts.sum())
+    days = np.repeat(dates.to_numpy(), counts)
+    moments = pd.DatetimeIndex(days + rng.integers(0, 24 * 60, rows).astype('timedelta64[m]'))
+
+    sku_index = rng.choice(len(catalog), size=rows, p=catalog['peso'].to_numpy())
+    channel = _choice(rng, CHANNELS, rows)
+    shipping = _choice(rng, SHIPPING, rows)
+
+    quantity = rng.choice([1, 2, 3, 4], size=rows, p=[0.8, 0.13, 0.05, 0.02])
+    unit_price = np.round(catalog['preco'].to_numpy()[sku_index] * rng.uniform(0.95, 1.05, rows), 2)
+    revenue = np.round(quantity * unit_price, 2)
+    cost = np.round(revenue * catalog['custo'].to_numpy()[sku_index], 2)
+    tax = np.round(revenue * TAX_RATE, 2)
+    fee = np.round(revenue * pd.Series(channel).map(SALE_FEE).to_numpy(dtype=float), 2)
+    buyer_freight = np.where(rng.random(rows) < 0.05, np.round(rng.uniform(5, 30, rows), 2), 0.0)
+    seller_freight = np.round(np.where(shipping == 'Coleta', rng.uniform(0, 15, rows), rng.uniform(5, 25, rows)), 2)
+    margin = np.round(revenue - cost - tax - fee - buyer_freight - seller_freight, 2)
+    margin_pct = np.where(revenue > 0, margin / revenue, 0.0)
+
+    money = [unit_price, revenue, cost, tax, fee, buyer_freight, seller_freight, margin]
+    orders = pd.DataFrame({
+        'ID da venda': np.arange(first_id, first_id + rows),
+        'Data': moments.strftime('%d/%m/%Y %H:%M') if formatted else moments,
+        'Canal de Venda': channel,
+        'Conta': _choice(rng, ACCOUNTS, rows),
+        'Status Pedido': _choice(rng, STATUSES, rows),
+        'SKU': catalog['SKU'].to_numpy()[sku_index],
+        'Código': catalog['Código'].to_numpy()[sku_index],
+        'Descrição do Produto': catalog['Descrição do Produto'].to_numpy()[sku_index],
+        'Origem de Aquisição': _choice(rng, ORIGINS, rows),
+        'Frete': shipping,
+        'Qtd.': quantity,
+    })
+    for col, values in zip(MONEY_COLUMNS, money):
+        orders[col] = format_brl(values) if formatted else values
+    if formatted:
+        orders[PERCENT_COLUMN] = [f"{value * 100:.1f}".replace('.', ',') + '%' for value in margin_pct.tolist()]
+    else:
+        orders[PERCENT_COLUMN] = margin_pct
+    return orders
+
+
+def plan_files(dates, counts, rows_per_file=EXCEL_MAX_ROWS):
+    """Divide os dias em arquivos: um por mês, quebrado em faixas de dias se passar de rows_per_file.
+
+    Os arquivos não se sobrepõem (a carga consolidada substitui períodos repetidos
+    pela exportação mais recente). Retorna [(primeiro dia, último dia + 1)].
+    """
+    files = []
+    first, total = 0, 0
+    for i in range(len(dates)):
+        if counts[i] > rows_per_file:
+            raise ValueError(f"{counts[i]:,} pedidos em {dates[i].date()}: aumente o número de dias ou de linhas por arquivo")
+        new_month = i > first and dates[i].month != dates[i - 1].month
+        if i > first and (new_month or total + counts[i] > rows_per_file):
+            files.append((first, i))
+            first, total = i, 0
+        total += counts[i]
+    files.append((first, len(dates)))
+    return files
+
+
+# Partes fixas do pacote .xlsx (uma planilha, sem estilos além do padrão)
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Relatório" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '<Relationship Id="rId2" Target="styles.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"/>'
+        '</Relationships>'
+    ),
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+        '<borders count="1"><border/></borders>'
+        '<cellStyleXfs count="1"><xf/></cellStyleXfs>'
+        '<cellXfs count="1"><xf xfId="0"/></cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    ),
+}
+
+# Pedidos convertidos em XML por vez na gravação
+_WRITE_CHUNK_ROWS = 50_000
+
+
+def _column_letter(i):
+    letters = ''
+    i += 1
+    while i:
+        i, rest = divmod(i - 1, 26)
+        letters = chr(65 + rest) + letters
+    return letters
+
+
+def _xml_cells(values, letter, row_numbers):
+    """XML das células de uma coluna, vetorizado (texto como inlineStr, números como valor)."""
+    refs = '<c r="' + letter + row_numbers
+    if pd.api.types.is_numeric_dtype(values):
+        return refs + '"><v>' + values.astype(str).to_numpy(dtype=object) + '</v></c>'
+    # Cada valor distinto é escapado uma única vez
+    codes, uniques = pd.factorize(values)
+    text = np.array([escape(str(value)) for value in uniques], dtype=object)[codes]
+    return refs + '" t="inlineStr"><is><t>' + text + '</t></is></c>'
+
+
+def _xml_row(number, values):
+    cells = ''.join(
+        f'<c r="{_column_letter(i)}{number}" t="inlineStr"><is><t>{escape(str(value))}</t></is></c>'
+        for i, value in enumerate(values)
+    )
+    return f'<row r="{number}">{cells}</row>'
+
+
+def write_export(orders, path, title="Relatório financeiro"):
+    """Grava os pedidos como a planilha do MercadoTurbo: título, linha vazia e cabeçalho na 3ª linha.
+
+    Escreve o XML da planilha diretamente, em blocos de linhas e coluna a coluna:
+    ordens de grandeza mais rápido que célula a célula pelo openpyxl, o que torna
+    viáveis arquivos de milhões de linhas.
+    """
+    letters = [_column_letter(i) for i in range(len(orders.columns))]
+    tmp_path = path + '.tmp'
+    with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1) as package:
+        for name, content in _XLSX_PARTS.items():
+            package.writestr(name, content)
+        with package.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                # Sem a dimensão, leitores como o pandas percorrem a planilha toda para descobri-la
+                f'<dimension ref="A1:{letters[-1]}{len(orders) + 3}"/><sheetData>'
+                + _xml_row(1, [title]) + _xml_row(3, orders.columns)
+            ).encode('utf-8'))
+            for lo in range(0, len(orders), _WRITE_CHUNK_ROWS):
+                chunk = orders.iloc[lo:lo + _WRITE_CHUNK_ROWS]
+                row_numbers = np.arange(lo + 4, lo + 4 + len(chunk)).astype(str).astype(object)
+                rows = '<row r="' + row_numbers + '">'
+                for col, letter in zip(chunk.columns, letters):
+                    rows = rows + _xml_cells(chunk[col], letter, row_numbers)
+                sheet.write(''.join(rows + '</row>').encode('utf-8'))
+            sheet.write(b'</sheetData></worksheet>')
+    os.replace(tmp_path, path)
+
+
+def generate_exports(out_dir, rows, skus=500, start='2024-01-01', days=365, seed=0, rows_per_file=EXCEL_MAX_ROWS):
+    """Gera exportações sintéticas em out_dir (MercadoTurbo_Financeiro_DD_MM_AAAA_a_DD_MM_AAAA.xlsx).
+
+    Cada arquivo é gerado e gravado separadamente, então a memória usada depende
+    do tamanho do arquivo e não do total de linhas. Retorna a lista de arquivos.
+    """
+    rng = np.random.default_rng(seed)
+    catalog = build_catalog(skus, rng)
+    dates, counts = daily_counts(rows, start, days, rng)
+    os.makedirs(out_dir, exist_ok=True)
+
+    paths = []
+    first_id = 300000
+    for lo, hi in plan_files(dates, counts, rows_per_file):
+        orders = generate_orders(catalog, dates[lo:hi], counts[lo:hi], rng, first_id=first_id)
+        first_id += len(orders)
+        name = f"MercadoTurbo_Financeiro_{dates[lo]:%d_%m_%Y}_a_{dates[hi - 1]:%d_%m_%Y}.xlsx"
+        path = os.path.join(out_dir, name)
+        write_export(orders, path)
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    # Gera exportações sintéticas para testes de escala:
+    #   python generate_data.py --linhas 1000000 --skus 2000 --dias 540 --saida dados_sinteticos
+    parser = argparse.ArgumentParser(description="Gera exportações sintéticas no formato do MercadoTurbo.")
+    parser.add_argument("--linhas", type=int, default=10_000, help="total de pedidos (padrão: 10.000)")
+    parser.add_argument("--skus", type=int, default=500, help="quantidade de SKUs distintos (padrão: 500)")
+    parser.add_argument("--inicio", default="2024-01-01", help="primeiro dia (AAAA-MM-DD, padrão: 2024-01-01)")
+    parser.add_argument("--dias", type=int, default=365, help="dias cobertos (padrão: 365)")
+    parser.add_argument("--semente", type=int, default=0, help="semente do gerador aleatório (padrão: 0)")
+    parser.add_argument("--linhas-por-arquivo", type=int, default=EXCEL_MAX_ROWS,
+                        help="máximo de pedidos por planilha (padrão: limite do Excel)")
+    parser.add_argument("--saida", default="dados_sinteticos", help="diretório de saída (padrão: dados_sinteticos)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    paths = generate_exports(args.saida, args.linhas, args.skus, args.inicio, args.dias, args.semente,
+                             args.linhas_por_arquivo)
+    print(f"{args.linhas:,} pedidos em {len(paths)} arquivo(s) em {args.saida} ({time.perf_counter() - start:.1f}s)")
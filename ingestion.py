@@ -0,0 +1,688 @@
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Diretório onde ficam as planilhas exportadas do MercadoTurbo
+DATA_DIR = os.environ.get("DASHBOARD_DATA_DIR", ".")
+
+# Padrões de nome dos arquivos exportados
+EXPORT_PATTERNS = ("MercadoTurbo_Financeiro_*.xlsx", "dados*.xlsx")
+
+# Diretório do cache colunar (Parquet) dos arquivos já processados
+CACHE_DIR = os.environ.get("DASHBOARD_CACHE_DIR", ".dashboard_cache")
+
+# Versão do formato do cache: incrementar sempre que a limpeza dos dados mudar,
+# para que caches gerados por versões anteriores sejam descartados
+CACHE_VERSION = 6
+
+# Consolidado de todas as exportações e manifesto dos arquivos incorporados
+STORE_FILE = "pedidos.parquet"
+MANIFEST_FILE = "manifest.json"
+
+# Leitura das planilhas novas em processos Python separados (export_worker.py). "0"
+# lê uma de cada vez no próprio processo
+PARALLEL_LOAD = os.environ.get("DASHBOARD_PARALLEL_LOAD", "1") == "1"
+
+# Script dos processos de leitura
+_WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'export_worker.py')
+
+# Linhas iniciais inspecionadas na busca pelo cabeçalho
+HEADER_SEARCH_ROWS = 5
+
+# Colunas convertidas para float64 na limpeza (valores em R$ e MC de 0 a 1)
+MONEY_COLUMNS = ['Valor Unit.', 'Faturamento', 'Custo (-)', 'Imposto (-)',
+                 'Tarifa de Venda (-)', 'Frete Comprador (-)', 'Frete Vendedor (-)',
+                 'Margem Contrib. (=)']
+PERCENT_COLUMN = 'MC em %'
+
+# Dimensões de baixa cardinalidade guardadas como Categorical: filtros e agrupamentos
+# comparam códigos inteiros em vez de strings
+CATEGORICAL_COLUMNS = ['Canal de Venda', 'Conta', 'Status Pedido', 'SKU',
+                       'Origem de Aquisição', 'Frete']
+
+# Caracteres aceitos em valores monetários/percentuais (o resto torna o valor inválido),
+# e os que só podem aparecer antes dos dígitos ou como espaço nas pontas
+_BRL_CHARS = np.zeros(256, dtype=bool)
+_BRL_PREFIX = np.zeros(256, dtype=bool)
+_BRL_SPACE = np.zeros(256, dtype=bool)
+for _char in '0123456789.,-+()R$% \xa0\x00':
+    _BRL_CHARS[ord(_char)] = True
+for _char in 'R$-+(':
+    _BRL_PREFIX[ord(_char)] = True
+for _char in ' \xa0\x00':
+    _BRL_SPACE[ord(_char)] = True
+
+
+class DataLoadError(Exception):
+    """Erro de validação do arquivo de dados (mensagem pronta para exibição)"""
+
+
+def find_header_row(preview, max_rows=HEADER_SEARCH_ROWS):
+    """Índice da primeira linha que contenha a coluna 'Data' (ou None)"""
+    for header_row, values in enumerate(preview.head(max_rows).itertuples(index=False)):
+        if any(str(value).strip().lower() == 'data' for value in values):
+            return header_row
+    return None
+
+
+def read_export(file_path):
+    """Lê a planilha exportada identificando a linha de cabeçalho.
+
+    Lê apenas as primeiras linhas para localizar o cabeçalho e depois faz uma
+    única leitura completa, reaproveitando o mesmo arquivo aberto.
+    """
+    with pd.ExcelFile(file_path) as xls:
+        preview = xls.parse(header=None, nrows=HEADER_SEARCH_ROWS)
+        header_row = find_header_row(preview)
+        # Fallback: lê normalmente (cabeçalho na primeira linha)
+        return xls.parse(header=header_row if header_row is not None else 0)
+
+
+def _read_export_multipass(file_path):
+    """Detecção antiga (uma leitura completa por linha testada), usada só na comparação de tempo"""
+    for header_row in range(HEADER_SEARCH_ROWS):
+        tmp = pd.read_excel(file_path, header=header_row)
+        if any(str(col).strip().lower() == 'data' for col in tmp.columns):
+            return tmp
+    return pd.read_excel(file_path)
+
+
+def _parse_brl_strings(values, percent=False):
+    """Converte um array de strings no formato brasileiro. Retorna (valores, inválidos)"""
+    # Matriz de códigos dos caracteres, transposta: cada passo do laço processa
+    # uma posição de caractere de todas as strings de uma vez (método de Horner)
+    chars = values.astype('U')
+    width = max(chars.dtype.itemsize // 4, 1)
+    codes = np.ascontiguousarray(chars.view(np.uint32).reshape(len(chars), width).T)
+
+    number = np.zeros(len(chars), dtype=np.int64)
+    decimals = np.zeros(len(chars), dtype=np.int64)
+    digits = np.zeros(len(chars), dtype=np.int64)
+    dots = np.zeros(len(chars), dtype=np.int64)
+    after_dot = np.zeros(len(chars), dtype=np.int64)  # dígitos depois do último ponto
+    after_comma = np.zeros(len(chars), dtype=bool)
+    ended = np.zeros(len(chars), dtype=bool)  # já passou do número (sufixo ou espaço)
+    negative = np.zeros(len(chars), dtype=bool)
+    opened = np.zeros(len(chars), dtype=bool)
+    closed = np.zeros(len(chars), dtype=bool)
+    invalid = np.zeros(len(chars), dtype=bool)
+    for code in codes:
+        started = digits > 0
+        is_digit = (code >= 48) & (code <= 57)
+        number[is_digit] = number[is_digit] * 10 + (code[is_digit] - 48)
+        decimals += is_digit & after_comma
+        is_dot = code == 46
+        dots += is_dot
+        after_dot = np.where(is_dot, 0, after_dot + is_digit)
+        invalid |= is_dot & after_comma  # ponto depois da vírgula decimal
+        is_comma = code == 44
+        invalid |= is_comma & after_comma  # mais de uma vírgula decimal
+        after_comma |= is_comma
+        # Dígitos, pontos e vírgulas formam um só bloco: nada de número depois do sufixo
+        invalid |= (is_digit | is_dot | is_comma) & ended
+        # Prefixo ('R$', sinal '-'/'+' ou '(' do negativo contábil) só antes do primeiro
+        # dígito; sufixo ('%' ou ')') só depois dele
+        invalid |= _BRL_PREFIX[np.minimum(code, 255)] & started
+        is_suffix = (code == 37) | (code == 41)
+        invalid |= is_suffix & ~started
+        ended |= (is_suffix | _BRL_SPACE[np.minimum(code, 255)]) & started
+        negative |= (code == 45) | (code == 40)
+        opened |= code == 40
+        closed |= code == 41
+        invalid |= ~_BRL_CHARS[np.minimum(code, 255)]
+        digits += is_digit
+    invalid |= opened != closed  # parênteses desbalanceados ('(12,50')
+
+    # Sem vírgula, um único ponto é a casa decimal nos percentuais ('12.5%') e quando
+    # seguido de 1 ou 2 dígitos ('1.5'); nos demais casos separa milhares ('1.234')
+    dot_decimal = ~after_comma & (dots == 1) & (after_dot > 0) & (percent | (after_dot <= 2))
+    decimals = np.where(dot_decimal, after_dot, decimals)
+
+    # Mais de 15 dígitos não cabe exatamente em float64
+    invalid |= digits > 15
+    result = number / 10.0 ** decimals
+    result[negative] *= -1
+    result[invalid | (digits == 0)] = np.nan
+    # Strings sem dígitos e só com caracteres de formatação ('', 'R$ -') são vazias, não falhas
+    return result, invalid
+
+
+def parse_brl(values, percent=False):
+    """Converte valores no formato brasileiro ('R$ 1.234,56', '-R$ 5,00', '(12,50)', '12,5%') para float64.
+
+    Cada valor distinto é analisado uma única vez e a conversão é vetorizada sobre
+    os códigos dos caracteres. Células já numéricas são mantidas; vazias viram NaN.
+    Moeda, sinal e '(' só valem antes dos dígitos, '%' e ')' só depois, e os
+    parênteses precisam fechar ('1-2', '1R2' e '(12,50' são falhas). Com percent=True o
+    resultado é dividido por 100. Retorna (valores, falhas), onde
+    falhas é a quantidade de células que não puderam ser convertidas (também NaN).
+    """
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    uniques = np.asarray(uniques, dtype=object)
+    parsed = np.full(len(uniques), np.nan)
+    failed_unique = np.zeros(len(uniques), dtype=bool)
+
+    is_string = np.fromiter((isinstance(value, str) for value in uniques), dtype=bool, count=len(uniques))
+    if is_string.any():
+        parsed[is_string], failed_unique[is_string] = _parse_brl_strings(uniques[is_string], percent)
+        # Notações fora do formato brasileiro ('1e3') ainda são aceitas pelo pandas
+        retry = np.flatnonzero(is_string & failed_unique)
+        if len(retry):
+            numbers = pd.to_numeric(pd.Series(uniques[retry]).str.strip(), errors='coerce').to_numpy(dtype='float64')
+            parsed[retry] = numbers
+            failed_unique[retry] = np.isnan(numbers)
+    if not is_string.all():
+        numbers = pd.to_numeric(pd.Series(uniques[~is_string]), errors='coerce').to_numpy(dtype='float64')
+        parsed[~is_string] = numbers
+        failed_unique[~is_string] = np.isnan(numbers)
+
+    if percent:
+        parsed /= 100
+
+    result = np.where(codes >= 0, parsed[codes], np.nan)
+    failed = int(np.count_nonzero(failed_unique[codes[codes >= 0]]))
+    return result, failed
+
+
+def clean_export(df):
+    """Limpa e formata os dados brutos. Retorna (df, avisos)"""
+    avisos = []
+
+    # Remover colunas sem nome (geralmente índices vazios do Excel)
+    df = df.loc[:, ~df.columns.astype(str).str.contains('^Unnamed')]
+
+    # Limpeza e formatação dos dados
+    # Converter colunas monetárias (formato brasileiro) e percentuais para float64
+    for col in MONEY_COLUMNS + [PERCENT_COLUMN]:
+        if col in df.columns:
+            percent = col == PERCENT_COLUMN
+            if df[col].dtype == 'O':
+                values, failed = parse_brl(df[col], percent=percent)
+                if failed:
+                    avisos.append(f"Aviso: {failed} valor(es) da coluna '{col}' não puderam ser convertidos e foram considerados 0.")
+                df[col] = pd.Series(values, index=df.index).fillna(0)
+            else:
+                # Já é numérico (no caso do percentual, de 0 a 1), apenas garante coerção e trata NaNs
+                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype('float64')
+
+    # Normalizar nomes das colunas para facilitar busca
+    df.columns = [col.strip() for col in df.columns]
+    # Procurar coluna de data (case insensitive, sem espaços)
+    data_candidates = [col for col in df.columns if col.strip().lower() == 'data']
+    if not data_candidates:
+        raise DataLoadError(f"Erro: Coluna 'Data' não encontrada no arquivo. Colunas disponíveis: {list(df.columns)}")
+    # Renomear para 'Data' se necessário
+    if data_candidates[0] != 'Data':
+        df = df.rename(columns={data_candidates[0]: 'Data'})
+    # Converter para datetime
+    df['Data'] = pd.to_datetime(df['Data'], dayfirst=True, errors='coerce')
+    if df['Data'].isna().all():
+        raise DataLoadError("Erro: Nenhuma data válida encontrada na coluna 'Data'.")
+    if df['Data'].isna().any():
+        avisos.append("Aviso: Algumas datas não puderam ser convertidas e serão removidas.")
+    df = df.dropna(subset=['Data'])
+    # Colunas auxiliares
+    df['Ano'] = df['Data'].dt.year
+    df['Mes'] = df['Data'].dt.month
+    df['Dia'] = df['Data'].dt.day
+    df['Semana'] = df['Data'].dt.isocalendar().week
+
+    # Garantir que Qtd. seja numérica
+    if 'Qtd.' in df.columns:
+        df['Qtd.'] = pd.to_numeric(df['Qtd.'], errors='coerce').fillna(0)
+
+    return df, avisos
+
+
+def file_hash(file_path, chunk_size=1024 * 1024):
+    """SHA-256 do conteúdo do arquivo"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_paths(file_path, cache_dir):
+    key = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:16]
+    base = os.path.join(cache_dir, key)
+    return base + '.parquet', base + '.json'
+
+
+def _read_cache(file_path, cache_dir):
+    """Retorna (df, avisos) do cache se a origem não mudou, senão (None, hash calculado)"""
+    parquet_path, meta_path = _cache_paths(file_path, cache_dir)
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None, None
+
+    stat = os.stat(file_path)
+    if (meta.get('version') != CACHE_VERSION
+            or meta.get('path') != os.path.abspath(file_path)
+            or meta.get('size') != stat.st_size
+            or not os.path.exists(parquet_path)):
+        return None, None
+
+    content_hash = None
+    if meta.get('mtime_ns') != stat.st_mtime_ns:
+        # Arquivo tocado (cópia, download novamente...): só reprocessa se o conteúdo mudou
+        content_hash = file_hash(file_path)
+        if content_hash != meta.get('sha256'):
+            return None, content_hash
+        meta['mtime_ns'] = stat.st_mtime_ns
+        _write_json(meta_path, meta)
+
+    try:
+        df = pd.read_parquet(parquet_path)
+    except Exception:
+        return None, content_hash
+    return (df, meta.get('avisos', [])), content_hash
+
+
+def _write_json(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _write_cache(file_path, cache_dir, df, avisos, content_hash):
+    parquet_path, meta_path = _cache_paths(file_path, cache_dir)
+    stat = os.stat(file_path)
+    meta = {
+        'version': CACHE_VERSION,
+        'path': os.path.abspath(file_path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': content_hash or file_hash(file_path),
+        'avisos': avisos,
+    }
+    tmp_path = parquet_path + '.tmp'
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, parquet_path)
+        _write_json(meta_path, meta)
+    except Exception:
+        # Cache é apenas otimização: colunas com tipos mistos ou diretório
+        # sem permissão de escrita não devem impedir o carregamento
+        for path in (tmp_path, parquet_path, meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def load_export(file_path, cache_dir=CACHE_DIR):
+    """Carrega o arquivo exportado já limpo, usando o cache Parquet quando válido.
+
+    O cache é indexado por caminho, tamanho, data de modificação e hash do
+    conteúdo; a planilha só é lida novamente quando o conteúdo realmente mudar.
+    Retorna (df, avisos); levanta DataLoadError se a planilha não puder ser lida.
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(file_path)
+
+    cached, content_hash = _read_cache(file_path, cache_dir)
+    if cached is not None:
+        return cached
+
+    try:
+        raw = read_export(file_path)
+    except Exception as e:
+        # Planilha corrompida ou truncada (BadZipFile, ValueError do openpyxl...): quem
+        # carrega várias exportações ignora só este arquivo, com aviso
+        raise DataLoadError(f"Erro ao ler a planilha {os.path.basename(file_path)}: {type(e).__name__}: {e}") from e
+    df, avisos = clean_export(raw)
+    _write_cache(file_path, cache_dir, df, avisos, content_hash)
+    return df, avisos
+
+
+def discover_exports(data_dir=DATA_DIR):
+    """Lista as planilhas exportadas do diretório, da mais antiga para a mais recente"""
+    paths = set()
+    for pattern in EXPORT_PATTERNS:
+        paths.update(glob.glob(os.path.join(data_dir, pattern)))
+    # Arquivos temporários do Excel (~$arquivo.xlsx) não são exportações
+    paths = [p for p in paths if not os.path.basename(p).startswith('~$')]
+    return sorted(paths, key=lambda p: (os.path.getmtime(p), p))
+
+
+def _replaced_rows(df, newer):
+    """Máscara das linhas de df substituídas por uma exportação mais recente.
+
+    A exportação mais recente substitui o período que cobre (dias entre a menor e a
+    maior data, nas contas presentes nela) e qualquer pedido com o mesmo 'ID da venda'.
+    """
+    start = newer['Data'].min().normalize()
+    end = newer['Data'].max().normalize() + pd.Timedelta(days=1)
+    replaced = (df['Data'] >= start) & (df['Data'] < end)
+    if 'Conta' in df.columns and 'Conta' in newer.columns:
+        replaced &= df['Conta'].isin(newer['Conta'].dropna().unique())
+    if 'ID da venda' in df.columns and 'ID da venda' in newer.columns:
+        replaced |= df['ID da venda'].isin(newer['ID da venda'].dropna())
+    return replaced.to_numpy()
+
+
+def combine_exports(frames):
+    """Consolida exportações, da mais antiga para a mais recente.
+
+    Em períodos sobrepostos (ou pedidos repetidos) vale a exportação mais recente.
+    """
+    kept = []
+    for i, df in enumerate(frames):
+        keep = np.ones(len(df), dtype=bool)
+        for newer in frames[i + 1:]:
+            keep &= ~_replaced_rows(df, newer)
+        kept.append(df if keep.all() else df[keep])
+    return pd.concat(kept, ignore_index=True) if len(kept) > 1 else kept[0].reset_index(drop=True)
+
+
+def encode_dimensions(df):
+    """Converte as dimensões para Categorical com categorias em ordem alfabética (estáveis entre cargas)"""
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            # Tudo como texto (SKUs podem vir numéricos em um arquivo e texto em outro)
+            values = df[col].where(df[col].isna(), df[col].astype(str))
+            df[col] = values.astype('category')
+    return df
+
+
+def _sort_by_date(df):
+    # Ordenado por 'Data': os filtros de período fatiam o frame por busca binária
+    if df['Data'].is_monotonic_increasing:
+        return df
+    return df.sort_values('Data', kind='stable', ignore_index=True)
+
+
+def fill_missing_ids(df):
+    """Cria IDs para pedidos sem 'ID da venda' (não são gravados no consolidado)"""
+    if 'ID da venda' not in df.columns:
+        # Criar coluna de ID único se não existir
+        df['ID da venda'] = range(1, len(df) + 1)
+    else:
+        # Linhas de arquivos sem a coluna de ID recebem IDs negativos, que não colidem com os reais
+        missing = df['ID da venda'].isna()
+        if missing.any():
+            df.loc[missing, 'ID da venda'] = -np.arange(1, missing.sum() + 1)
+    return df
+
+
+def _skipped(file_path, error):
+    return None, [f"{os.path.basename(file_path)} ignorado: {error}"]
+
+
+def _with_file_name(file_path, df, avisos):
+    return df, [f"{os.path.basename(file_path)}: {aviso}" for aviso in avisos]
+
+
+def _load_export_safe(file_path, cache_dir):
+    try:
+        df, avisos = load_export(file_path, cache_dir)
+    except DataLoadError as e:
+        return _skipped(file_path, e)
+    return _with_file_name(file_path, df, avisos)
+
+
+def _read_in_workers(paths, cache_dir, workers):
+    """Lê as planilhas em processos export_worker.py, que gravam o cache de cada uma.
+
+    Os arquivos são divididos pelo tamanho (o maior vai para o processo com menos
+    bytes). Retorna {path: erro ou None} dos arquivos que os processos concluíram.
+    """
+    groups = [[] for _ in range(workers)]
+    sizes = [0] * workers
+    for path in sorted(paths, key=os.path.getsize, reverse=True):
+        i = sizes.index(min(sizes))
+        groups[i].append(path)
+        sizes[i] += os.path.getsize(path)
+
+    done = {}
+    try:
+        processes = [
+            subprocess.Popen([sys.executable, _WORKER_SCRIPT, cache_dir] + group,
+                             stdout=subprocess.PIPE, text=True, encoding='utf-8')
+            for group in groups if group
+        ]
+    except OSError:
+        return done
+    for process in processes:
+        output, _ = process.communicate()
+        for line in output.splitlines():
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            done[result['path']] = result['erro']
+    return done
+
+
+def _load_many(paths, cache_dir, max_workers=None, parallel=False):
+    """Carrega cada arquivo (cache, ou leitura em paralelo com parallel). Retorna {path: (df, avisos)}"""
+    results = {}
+    pending = []
+    for path in paths:
+        cached, _ = _read_cache(path, cache_dir)
+        if cached is not None:
+            results[path] = _with_file_name(path, *cached)
+        else:
+            pending.append(path)
+
+    workers = min(len(pending), max_workers or os.cpu_count() or 1)
+    if parallel and workers > 1:
+        # Cada planilha é lida em um processo separado: o tempo total fica próximo
+        # ao do maior arquivo em vez da soma de todos. O resultado volta pelo cache
+        for path, error in _read_in_workers(pending, cache_dir, workers).items():
+            if error is not None:
+                results[path] = _skipped(path, error)
+                continue
+            cached, _ = _read_cache(path, cache_dir)
+            if cached is not None:
+                results[path] = _with_file_name(path, *cached)
+
+    # Sem processos ou sem cache gravado (diretório sem permissão, tipos mistos): lê aqui
+    for path in pending:
+        if path not in results:
+            results[path] = _load_export_safe(path, cache_dir)
+
+    return results
+
+
+def _store_paths(cache_dir):
+    return os.path.join(cache_dir, STORE_FILE), os.path.join(cache_dir, MANIFEST_FILE)
+
+
+def _read_manifest(cache_dir):
+    _, manifest_path = _store_paths(cache_dir)
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return []
+    if manifest.get('version') != CACHE_VERSION:
+        return []
+    return manifest.get('files', [])
+
+
+def _is_unchanged(entry, path):
+    """Compara o arquivo em disco com a entrada do manifesto (hash só se tamanho/data mudarem)"""
+    stat = os.stat(path)
+    if entry['size'] != stat.st_size:
+        return False
+    if entry['mtime_ns'] != stat.st_mtime_ns:
+        if file_hash(path) != entry['sha256']:
+            return False
+        entry['mtime_ns'] = stat.st_mtime_ns
+    return True
+
+
+def _manifest_entry(path, df, avisos):
+    stat = os.stat(path)
+    entry = {
+        'path': os.path.abspath(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': file_hash(path),
+        'linhas': 0 if df is None else len(df),
+        'data_inicio': None,
+        'data_fim': None,
+        'avisos': avisos,
+    }
+    if df is not None and not df.empty:
+        entry['data_inicio'] = df['Data'].min().isoformat()
+        entry['data_fim'] = df['Data'].max().isoformat()
+    return entry
+
+
+def _write_store(cache_dir, store, manifest):
+    store_path, manifest_path = _store_paths(cache_dir)
+    tmp_path = store_path + '.tmp'
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        store.to_parquet(tmp_path)
+        os.replace(tmp_path, store_path)
+        _write_json(manifest_path, {'version': CACHE_VERSION, 'files': manifest})
+    except Exception:
+        # Sem consolidado gravado a próxima carga reconstrói a partir dos caches por arquivo.
+        # O Parquet também sai: sem manifesto correspondente ele pode estar desatualizado
+        # (falha antes do replace) e não deve ser lido por outros leitores (duckdb_engine)
+        for path in (tmp_path, store_path, manifest_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def load_exports(paths, cache_dir=CACHE_DIR, max_workers=None, parallel=PARALLEL_LOAD):
+    """Carrega o consolidado de várias exportações, lendo apenas arquivos novos ou alterados.
+
+    O consolidado (Parquet) fica em cache_dir junto com um manifesto dos arquivos
+    incorporados (hash, linhas, período), na ordem em que foram incorporados: o
+    arquivo incorporado depois prevalece no período que cobre. Arquivos novos são
+    apenas mesclados ao consolidado; arquivos alterados ou removidos fazem o
+    consolidado ser reconstruído dos caches por arquivo, relendo só a planilha
+    alterada. Arquivos inválidos são ignorados com aviso. Com parallel, as planilhas
+    a ler são lidas em processos Python separados (export_worker.py, ver PARALLEL_LOAD).
+
+    Retorna (df, avisos), com df ordenado por 'Data'.
+    """
+    if not paths:
+        raise FileNotFoundError(DATA_DIR)
+
+    abs_paths = {os.path.abspath(path): path for path in paths}
+    manifest = _read_manifest(cache_dir)
+    store_path, _ = _store_paths(cache_dir)
+
+    # Arquivos conhecidos e inalterados mantêm sua posição; novos/alterados vão para o fim
+    unchanged = []
+    touched = False
+    for entry in manifest:
+        if entry['path'] not in abs_paths:
+            continue
+        mtime_ns = entry['mtime_ns']
+        if _is_unchanged(entry, abs_paths[entry['path']]):
+            unchanged.append(entry)
+            touched |= entry['mtime_ns'] != mtime_ns
+    known = {entry['path'] for entry in unchanged}
+    new_paths = [path for path in paths if os.path.abspath(path) not in known]
+    only_additions = len(unchanged) == len(manifest) and os.path.exists(store_path)
+
+    store = None
+    if only_additions:
+        try:
+            store = pd.read_parquet(store_path)
+        except Exception:
+            store = None
+
+    if store is not None:
+        # Caminho incremental: só os arquivos novos são lidos e mesclados
+        results = _load_many(new_paths, cache_dir, max_workers, parallel)
+        frames = [store]
+    else:
+        # Reconstrução: arquivos inalterados vêm do cache por arquivo
+        valid_unchanged = [entry for entry in unchanged if entry['linhas'] > 0]
+        results = _load_many([abs_paths[entry['path']] for entry in valid_unchanged] + new_paths,
+                             cache_dir, max_workers, parallel)
+        frames = []
+        for entry in valid_unchanged:
+            df, _ = results[abs_paths[entry['path']]]
+            if df is not None and not df.empty:
+                frames.append(df)
+
+    new_entries = []
+    for path in new_paths:
+        df, file_avisos = results[path]
+        new_entries.append(_manifest_entry(path, df, file_avisos))
+        if df is not None and not df.empty:
+            frames.append(df)
+
+    manifest = unchanged + new_entries
+    avisos = [aviso for entry in manifest for aviso in entry['avisos']]
+
+    if not frames:
+        raise DataLoadError("Erro: Nenhum arquivo de dados válido encontrado. " + " | ".join(avisos))
+
+    if len(frames) > 1 or store is None:
+        store = _sort_by_date(encode_dimensions(combine_exports(frames)))
+        _write_store(cache_dir, store, manifest)
+    elif new_paths or touched:
+        # Nada a mesclar (arquivos novos inválidos ou apenas tocados): atualiza só o manifesto
+        try:
+            _write_json(_store_paths(cache_dir)[1], {'version': CACHE_VERSION, 'files': manifest})
+        except OSError:
+            pass
+
+    return fill_missing_ids(_sort_by_date(store)), avisos
+
+
+def refresh_store(paths, cache_dir=CACHE_DIR, max_workers=None, parallel=PARALLEL_LOAD):
+    """Atualiza o consolidado de cache_dir com as exportações, sem mantê-lo em memória.
+
+    Para quem lê o Parquet direto (duckdb_engine). Se nenhum arquivo foi incluído,
+    alterado ou removido desde a última carga, o consolidado nem é lido; caso
+    contrário é atualizado por load_exports e o frame descartado. Retorna os avisos
+    dos arquivos incorporados.
+    """
+    if not paths:
+        raise FileNotFoundError(DATA_DIR)
+
+    abs_paths = {os.path.abspath(path): path for path in paths}
+    manifest = _read_manifest(cache_dir)
+    store_path, manifest_path = _store_paths(cache_dir)
+    current = (os.path.exists(store_path) and {entry['path'] for entry in manifest} == set(abs_paths))
+    if current:
+        mtimes = [entry['mtime_ns'] for entry in manifest]
+        current = all(_is_unchanged(entry, abs_paths[entry['path']]) for entry in manifest)
+    if not current:
+        _, avisos = load_exports(paths, cache_dir, max_workers, parallel)
+        return avisos
+
+    if mtimes != [entry['mtime_ns'] for entry in manifest]:
+        # Arquivos apenas tocados (mesmo hash): o manifesto guarda a nova data
+        try:
+            _write_json(manifest_path, {'version': CACHE_VERSION, 'files': manifest})
+        except OSError:
+            pass
+    return [aviso for entry in manifest for aviso in entry['avisos']]
+
+
+if __name__ == "__main__":
+    # Compara o tempo de leitura da detecção antiga com a atual:
+    #   python ingestion.py MercadoTurbo_Financeiro_*.xlsx
+    for path in sys.argv[1:]:
+        start = time.perf_counter()
+        before = _read_export_multipass(path)
+        tempo_antes = time.perf_counter() - start
+
+        start = time.perf_counter()
+        after = read_export(path)
+        tempo_depois = time.perf_counter() - start
+
+        mesmo_resultado = before.columns.equals(after.columns) and len(before) == len(after)
+        print(f"{path}: {len(after):,} linhas | antes {tempo_antes:.2f}s | depois {tempo_depois:.2f}s "
+              f"| {tempo_antes / tempo_depois:.1f}x | mesmo resultado: {'sim' if mesmo_resultado else 'NÃO'}")
@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Limites padrão do cache de KPIs (configuráveis por variável de ambiente)
+MAX_ENTRIES = int(os.environ.get("DASHBOARD_KPI_CACHE_ENTRIES", "128"))
+TTL_SECONDS = float(os.environ.get("DASHBOARD_KPI_CACHE_TTL", "3600"))
+
+
+class LRUCache:
+    """Cache em memória com limite de entradas (LRU) e tempo de vida por entrada.
+
+    Compartilhado entre as sessões do Streamlit, que rodam em threads; por isso
+    todo acesso passa por um lock. Guarda contadores para a visão de administração.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_or_compute(self, key, compute):
+        """Valor em cache para key; em falta (ou expirado) calcula com compute()."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if now - stored_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+
+        # Calcula fora do lock para não bloquear as outras sessões
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entradas': len(self._entries),
+                'max_entradas': self.max_entries,
+                'ttl_segundos': self.ttl,
+                'acertos': self.hits,
+                'faltas': self.misses,
+                'taxa_acerto': (self.hits / lookups * 100) if lookups > 0 else 0,
+                'remocoes_lru': self.evictions,
+                'expiradas': self.expirations,
+            }
@@ -0,0 +1,192 @@
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+import weakref
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+import pandas as pd
+
+# Perfil de todas as execuções (todas as sessões); sem ele, só com ?profile=1 na URL
+PROFILING = os.environ.get("DASHBOARD_PROFILING", "0") == "1"
+
+# Log JSONL dos perfis, com rotação por tamanho
+PROFILE_LOG_FILE = os.environ.get("DASHBOARD_PROFILE_LOG", os.path.join(".dashboard_profile", "perfil.jsonl"))
+PROFILE_LOG_BYTES = int(os.environ.get("DASHBOARD_PROFILE_LOG_BYTES", str(10 * 1024 * 1024)))
+PROFILE_LOG_BACKUPS = int(os.environ.get("DASHBOARD_PROFILE_LOG_BACKUPS", "5"))
+
+_logger_lock = threading.Lock()
+
+# Execuções medindo memória em andamento: o tracemalloc fica ativo só enquanto houver
+# alguma. _tracing_starts conta as execuções iniciadas, para detectar sobreposição
+_tracing_lock = threading.Lock()
+_tracing_runs = 0
+_tracing_starts = 0
+
+
+def _profile_logger(path=PROFILE_LOG_FILE):
+    """Logger que grava uma linha JSON por registro, em arquivos rotativos (criado uma vez)."""
+    logger = logging.getLogger('dashboard.profile')
+    with _logger_lock:
+        if not logger.handlers:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            handler = RotatingFileHandler(path, maxBytes=PROFILE_LOG_BYTES, backupCount=PROFILE_LOG_BACKUPS,
+                                          encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+    return logger
+
+
+def _rows(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if isinstance(value, tuple) and value:
+        return _rows(value[0])
+    return None
+
+
+class _Section:
+    def __init__(self, name, rows_in):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.base = 0
+        self.peak = 0
+        self.starts = 0
+
+
+def _start_tracing():
+    global _tracing_runs, _tracing_starts
+    with _tracing_lock:
+        _tracing_runs += 1
+        _tracing_starts += 1
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+
+def _stop_tracing():
+    global _tracing_runs
+    with _tracing_lock:
+        _tracing_runs -= 1
+        if _tracing_runs == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+class Profiler:
+    """Cronometra seções de uma execução do dashboard: tempo, linhas e pico de memória.
+
+    Cada seção gera um registro com tempo de parede e linhas de entrada e saída.
+    Com memory, também o pico de memória alocada acima do início da seção
+    (tracemalloc, ativo só enquanto há execuções medindo memória). O tracemalloc é
+    global ao processo e deixa todas as sessões mais lentas: por isso só é ligado
+    quando pedido, e seções que se sobrepõem a outra execução medindo memória ficam
+    sem pico (o valor incluiria alocações alheias). Desativado, não mede nada
+    (custo desprezível).
+    """
+
+    def __init__(self, enabled, session_id=None, log_path=PROFILE_LOG_FILE, memory=False):
+        self.enabled = enabled
+        self.memory = enabled and memory
+        self.session_id = session_id
+        self.run_id = uuid.uuid4().hex[:12]
+        self.records = []
+        self._log_path = log_path
+        self._stack = []
+        self._tracing = None
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def section(self, name, rows_in=None):
+        """Mede o bloco; section.rows_out pode ser definido dentro dele."""
+        section = _Section(name, rows_in)
+        if not self.enabled:
+            yield section
+            return
+
+        if self.memory:
+            self._start_section_memory(section)
+        self._stack.append(section)
+        start = time.perf_counter()
+        try:
+            yield section
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            peak = self._end_section_memory(section) if self.memory else None
+            self.records.append({
+                'secao': name,
+                'tempo_ms': elapsed * 1000,
+                'linhas_entrada': section.rows_in,
+                'linhas_saida': section.rows_out,
+                'memoria_pico_mb': peak,
+                'nivel': len(self._stack),
+            })
+
+    def _start_section_memory(self, section):
+        if self._tracing is None:
+            # Execuções interrompidas (novo rerun, st.stop) não chegam ao finish(): o
+            # tracemalloc é liberado também quando o Profiler é descartado
+            _start_tracing()
+            self._tracing = weakref.finalize(self, _stop_tracing)
+        if self._stack:
+            # O pico é zerado a cada seção: a seção externa guarda o que já tinha visto
+            parent = self._stack[-1]
+            parent.peak = max(parent.peak, tracemalloc.get_traced_memory()[1] - parent.base)
+        section.starts = _tracing_starts
+        section.base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+    def _end_section_memory(self, section):
+        # Pico em MB, ou None se outra execução mediu memória durante a seção
+        section.peak = max(section.peak, tracemalloc.get_traced_memory()[1] - section.base)
+        if self._stack:
+            parent = self._stack[-1]
+            parent.peak = max(parent.peak, section.base - parent.base + section.peak)
+        if _tracing_runs > 1 or _tracing_starts != section.starts:
+            return None
+        return section.peak / 1024 ** 2
+
+    def measure(self, name, func, *args, **kwargs):
+        """func(*args, **kwargs) medida como seção; linhas do primeiro argumento e do resultado."""
+        rows_in = _rows(args[0]) if args else None
+        with self.section(name, rows_in) as section:
+            result = func(*args, **kwargs)
+            section.rows_out = _rows(result)
+        return result
+
+    def finish(self):
+        """Fecha a execução: registra o tempo total e grava os registros no log JSONL."""
+        if not self.enabled:
+            return
+        self.records.append({
+            'secao': 'total',
+            'tempo_ms': (time.perf_counter() - self._started) * 1000,
+            'linhas_entrada': None,
+            'linhas_saida': None,
+            'memoria_pico_mb': None,
+            'nivel': 0,
+        })
+        if self._tracing is not None:
+            self._tracing()
+
+        timestamp = datetime.now().isoformat(timespec='milliseconds')
+        try:
+            logger = _profile_logger(self._log_path)
+            for record in self.records:
+                logger.info(json.dumps(dict(record, data=timestamp, sessao=self.session_id, execucao=self.run_id),
+                                       ensure_ascii=False))
+        except OSError:
+            # O log é só diagnóstico: sem permissão de escrita o painel continua funcionando
+            pass
+
+    def table(self):
+        """Registros da execução como DataFrame, na ordem em que as seções terminaram."""
+        return pd.DataFrame(self.records, columns=['secao', 'tempo_ms', 'linhas_entrada', 'linhas_saida',
+                                                   'memoria_pico_mb', 'nivel'])
@@ -0,0 +1,223 @@
+import argparse
+import io
+import json
+import os
+import time
+import zipfile
+from datetime import date, datetime
+
+import pandas as pd
+
+from analytics import (PERIOD_OPTIONS, add_sku_columns, apply_filters, build_daily_cube, channel_metrics,
+                       daily_channel_pivots, get_previous_period_data, load_tax_policy, monthly_sales, overview_kpis,
+                       pricing_monthly, pricing_pivot, sku_summary, tax_report)
+from ingestion import DATA_DIR, discover_exports, load_exports
+
+# Pacote pré-calculado aberto pelo dashboard em modo somente leitura (vazio: modo normal)
+REPORT_BUNDLE = os.environ.get("DASHBOARD_REPORT_BUNDLE", "")
+
+# Versão do formato do pacote: incrementar sempre que tabelas ou colunas mudarem,
+# para que o dashboard recuse pacotes gerados por versões anteriores
+BUNDLE_VERSION = 1
+
+# Folha (.xlsx) ou arquivo (.zip) com os metadados e o formato de cada tabela
+MANIFEST_NAME = "manifesto"
+
+
+def build_report(df, cube, period_type="Todos os dados", start_date=None, end_date=None,
+                 canal_selected="Todos", conta_selected="Todas", policy=None, today=None):
+    """Agregados do dashboard para um recorte, calculados de uma vez a partir dos mesmos dados.
+
+    df e cube como o dashboard os carrega (add_sku_columns e build_daily_cube).
+    Retorna (tabelas, recorte): {nome: DataFrame}, com KPIs e totais como tabelas
+    de uma linha, e a descrição do recorte (filtros, datas e pedidos).
+    """
+    filtered_df = apply_filters(df, period_type, start_date, end_date, canal_selected, conta_selected, today)
+    filtered_cube = apply_filters(cube, period_type, start_date, end_date, canal_selected, conta_selected, today)
+    previous_df = get_previous_period_data(df, filtered_df, period_type)
+
+    pivot_qtd, pivot_fat = daily_channel_pivots(filtered_cube)
+    tax = tax_report(filtered_cube, policy if policy is not None else load_tax_policy())
+    tables = {
+        'visao_geral': pd.DataFrame([overview_kpis(filtered_cube, previous_df)]),
+        'canais': pd.DataFrame(list(channel_metrics(filtered_cube, previous_df).values())),
+        'vendas_mensais': monthly_sales(filtered_cube)['tabela'],
+        'vendas_mensais_margem': monthly_sales(filtered_cube, 'Margem Contrib. (=)')['tabela'],
+        'diario_qtd': pivot_qtd,
+        'diario_faturamento': pivot_fat,
+        'skus': sku_summary(filtered_df),
+        'precos': pricing_pivot(pricing_monthly(filtered_df)),
+        'impostos_filtros': tax['resumo_filtros'],
+        # 'Data' (Period) fica de fora: 'Data_str' traz o mesmo mês
+        'impostos_mensal': tax['mensal'].drop(columns='Data'),
+        'impostos_canal_conta': tax['canal_conta'],
+        'impostos_totais': pd.DataFrame([tax['totais']]),
+    }
+
+    dates = filtered_df['Data']
+    scope = {
+        'periodo': period_type,
+        'inicio': dates.min().date().isoformat() if not dates.empty else None,
+        'fim': dates.max().date().isoformat() if not dates.empty else None,
+        'canal': canal_selected,
+        'conta': conta_selected,
+        'pedidos': len(filtered_df),
+    }
+    return tables, scope
+
+
+def _flatten(table):
+    """Tabela plana para gravação (índice como colunas, níveis de coluna unidos) e o formato para restaurá-la."""
+    layout = {'indice': [], 'colunas': None, 'niveis': 1, 'nomes': None, 'datas': [], 'textos': []}
+    # Nomes dos níveis de coluna ('Mes', 'Canal de Venda'...): o arquivo só guarda os rótulos
+    if any(name is not None for name in table.columns.names):
+        layout['nomes'] = [None if name is None else str(name) for name in table.columns.names]
+    if isinstance(table.columns, pd.MultiIndex):
+        layout['colunas'] = [[str(level) for level in col] for col in table.columns]
+        layout['niveis'] = table.columns.nlevels
+        labels = [' | '.join(level for level in col if level) for col in layout['colunas']]
+        table = table.set_axis(labels, axis=1)
+    if not (isinstance(table.index, pd.RangeIndex) and table.index.name is None):
+        layout['indice'] = [name if name is not None else f'indice_{i}' for i, name in enumerate(table.index.names)]
+        table = table.rename_axis(layout['indice']).reset_index()
+
+    # Colunas de datas (sem hora) voltam como date: o Excel só guarda data e hora
+    layout['datas'] = [
+        col for col in table.columns
+        if table[col].dtype == object and len(table[col]) and isinstance(table[col].iloc[0], date)
+        and not isinstance(table[col].iloc[0], datetime)
+    ]
+    # Textos que parecem números (SKUs, contas) não podem voltar do Excel como números
+    layout['textos'] = [
+        col for col in table.columns
+        if col not in layout['datas'] and (table[col].dtype == object or isinstance(table[col].dtype, pd.CategoricalDtype))
+    ]
+    return table, layout
+
+
+def _restore(table, layout):
+    # Texto vazio volta do Excel como NaN; no Parquet (e nos dados) é None
+    for col in layout['textos']:
+        table[col] = table[col].astype(object).where(table[col].notna(), None)
+    for col in layout['datas']:
+        table[col] = pd.to_datetime(table[col]).dt.date
+    if layout['indice']:
+        table = table.set_index(layout['indice'])
+    if layout['colunas'] is not None:
+        # Transposta das tuplas: um array por nível (também para tabelas sem colunas)
+        levels = [list(level) for level in zip(*layout['colunas'])] or [[]] * layout['niveis']
+        table.columns = pd.MultiIndex.from_arrays(levels, names=layout.get('nomes'))
+    elif layout.get('nomes'):
+        table.columns.name = layout['nomes'][0]
+    return table
+
+
+def write_bundle(tables, path, metadata=None):
+    """Grava as tabelas em um único arquivo e retorna o caminho.
+
+    .xlsx: planilha com uma folha por tabela (leitura direta no Excel). .zip: um
+    Parquet por tabela (abertura mais rápida no dashboard). Nos dois casos a folha
+    ou arquivo "manifesto" guarda os metadados e o formato original das tabelas.
+    """
+    manifest = dict(metadata or {}, versao=BUNDLE_VERSION, tabelas={})
+    flat = {}
+    for name, table in tables.items():
+        flat[name], manifest['tabelas'][name] = _flatten(table)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    # Arquivo temporário com a mesma extensão (o ExcelWriter a exige) e troca atômica no fim
+    root, ext = os.path.splitext(path)
+    tmp_path = f'{root}.tmp{ext}'
+    if path.endswith('.xlsx'):
+        with pd.ExcelWriter(tmp_path, engine='openpyxl') as writer:
+            manifest_sheet = pd.DataFrame({
+                'campo': list(manifest),
+                'valor': [json.dumps(value, ensure_ascii=False) for value in manifest.values()],
+            })
+            manifest_sheet.to_excel(writer, sheet_name=MANIFEST_NAME, index=False)
+            for name, table in flat.items():
+                table.to_excel(writer, sheet_name=name, index=False)
+    elif path.endswith('.zip'):
+        # Parquet já é comprimido: o zip só agrupa os arquivos
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_STORED) as bundle:
+            bundle.writestr(f'{MANIFEST_NAME}.json', json.dumps(manifest, ensure_ascii=False, indent=2))
+            for name, table in flat.items():
+                buffer = io.BytesIO()
+                table.to_parquet(buffer, index=False)
+                bundle.writestr(f'{name}.parquet', buffer.getvalue())
+    else:
+        raise ValueError(f"Formato de pacote não suportado: {path} (use .xlsx ou .zip)")
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_bundle(path):
+    """Tabelas e manifesto de um pacote gravado por write_bundle, sem recalcular nada.
+
+    Levanta ValueError se o arquivo não for um pacote desta versão.
+    """
+    if path.endswith('.xlsx'):
+        with pd.ExcelFile(path) as xls:
+            if MANIFEST_NAME not in xls.sheet_names:
+                raise ValueError(f"{path} não é um pacote de relatório (folha '{MANIFEST_NAME}' ausente)")
+            manifest_sheet = xls.parse(MANIFEST_NAME, dtype=str, keep_default_na=False)
+            manifest = {field: json.loads(value) for field, value in zip(manifest_sheet['campo'], manifest_sheet['valor'])}
+            flat = {
+                name: xls.parse(name, dtype={col: str for col in layout['textos']})
+                for name, layout in manifest.get('tabelas', {}).items()
+            }
+    elif path.endswith('.zip'):
+        with zipfile.ZipFile(path) as bundle:
+            try:
+                manifest = json.loads(bundle.read(f'{MANIFEST_NAME}.json'))
+            except KeyError:
+                raise ValueError(f"{path} não é um pacote de relatório ({MANIFEST_NAME}.json ausente)")
+            flat = {
+                name: pd.read_parquet(io.BytesIO(bundle.read(f'{name}.parquet')))
+                for name in manifest.get('tabelas', {})
+            }
+    else:
+        raise ValueError(f"Formato de pacote não suportado: {path} (use .xlsx ou .zip)")
+
+    if manifest.get('versao') != BUNDLE_VERSION:
+        raise ValueError(f"{path} foi gerado por outra versão do relatório; gere o pacote novamente")
+    tables = {name: _restore(flat[name], layout) for name, layout in manifest['tabelas'].items()}
+    return tables, manifest
+
+
+if __name__ == "__main__":
+    # Calcula todos os agregados do dashboard de uma vez e grava um pacote para consulta:
+    #   python report_bundle.py --saida relatorios/mensal.xlsx
+    #   python report_bundle.py --periodo Personalizado --inicio 2024-01-01 --fim 2024-03-31 --saida tri.zip
+    # O dashboard abre o pacote em modo somente leitura com DASHBOARD_REPORT_BUNDLE=<arquivo>
+    parser = argparse.ArgumentParser(description="Gera o pacote de relatório pré-calculado do dashboard.")
+    parser.add_argument("--dados", default=DATA_DIR, help=f"diretório das exportações (padrão: {DATA_DIR})")
+    parser.add_argument("--periodo", default="Todos os dados", choices=PERIOD_OPTIONS,
+                        help="período, como no filtro do dashboard (padrão: Todos os dados)")
+    parser.add_argument("--inicio", type=date.fromisoformat, help="primeiro dia do período Personalizado (AAAA-MM-DD)")
+    parser.add_argument("--fim", type=date.fromisoformat, help="último dia do período Personalizado (AAAA-MM-DD)")
+    parser.add_argument("--canal", default="Todos", help="canal de venda (padrão: Todos)")
+    parser.add_argument("--conta", default="Todas", help="conta (padrão: Todas)")
+    parser.add_argument("--saida", default="relatorio.xlsx", help="arquivo do pacote, .xlsx ou .zip (padrão: relatorio.xlsx)")
+    args = parser.parse_args()
+    if args.periodo == "Personalizado" and not (args.inicio and args.fim):
+        parser.error("o período Personalizado exige --inicio e --fim")
+    if not args.saida.endswith(('.xlsx', '.zip')):
+        parser.error("--saida deve terminar em .xlsx ou .zip")
+
+    start = time.perf_counter()
+    paths = discover_exports(args.dados)
+    if not paths:
+        parser.error(f"nenhuma exportação encontrada em {args.dados}")
+    df, avisos = load_exports(paths)
+    for aviso in avisos:
+        print(f"Aviso: {aviso}")
+    df = add_sku_columns(df)
+    cube = build_daily_cube(df)
+
+    tables, scope = build_report(df, cube, args.periodo, args.inicio, args.fim, args.canal, args.conta)
+    metadata = dict(scope, gerado_em=datetime.now().isoformat(timespec='seconds'),
+                    arquivos=[os.path.basename(path) for path in paths])
+    write_bundle(tables, args.saida, metadata)
+    print(f"{scope['pedidos']:,} pedidos de {len(paths)} arquivo(s) em {args.saida} "
+          f"({time.perf_counter() - start:.1f}s)")
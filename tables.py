@@ -0,0 +1,174 @@
+import math
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Acima deste número de células a tabela não passa pelo Styler do pandas (que gera
+# HTML/CSS célula a célula): vai direto ao st.dataframe com formatos por coluna
+STYLED_TABLE_MAX_CELLS = int(os.environ.get("DASHBOARD_STYLED_TABLE_CELLS", "20000"))
+
+# Paginação das tabelas grandes: só a página visível é enviada ao navegador
+DEFAULT_PAGE_SIZE = int(os.environ.get("DASHBOARD_TABLE_PAGE_SIZE", "100"))
+PAGE_SIZE_OPTIONS = sorted({25, 50, 100, 250, 500, DEFAULT_PAGE_SIZE})
+
+# Faixas de MC (%) da legenda: ≤ 20, > 20 e < 30, ≥ 30 e < 40, ≥ 40
+MC_BAND_LABELS = ['🔴', '🟡', '🟢', '🔵']
+MC_BAND_CSS = [
+    'background-color:#FF0000',
+    'background-color:#C7AF00',
+    'background-color:#00C700',
+    'background-color:#00D9FF',
+]
+
+# Variação em relação ao mês anterior: alta / queda
+VARIATION_BAND_LABELS = ['🟢', '🔴']
+VARIATION_BAND_CSS = [
+    'background-color: #90EE90; color: #006400; font-weight: bold',
+    'background-color: #FFB6C1; color: #8B0000; font-weight: bold',
+]
+
+
+def _mc_codes(values):
+    values = np.asarray(values, dtype=float)
+    codes = np.select([values <= 20, values < 30, values < 40], [0, 1, 2], 3)
+    codes[np.isnan(values)] = -1
+    return codes
+
+
+def _mc_nonzero_codes(values):
+    codes = _mc_codes(values)
+    codes[np.asarray(values, dtype=float) == 0] = -1
+    return codes
+
+
+def _variation_codes(values):
+    values = np.asarray(values, dtype=float)
+    return np.select([values > 0, values < 0], [0, 1], -1)
+
+
+# Nome da faixa -> (códigos por valor, rótulos, CSS de cada faixa); código -1 = sem cor
+BANDS = {
+    'mc': (_mc_codes, MC_BAND_LABELS, MC_BAND_CSS),
+    'mc_pricing': (_mc_nonzero_codes, MC_BAND_LABELS, [css + '; color: white' for css in MC_BAND_CSS]),
+    'variation': (_variation_codes, VARIATION_BAND_LABELS, VARIATION_BAND_CSS),
+}
+
+
+def band_categories(values, band):
+    """Faixa de cor de cada valor como Categorical (rótulos da legenda; NaN = sem cor)."""
+    codes_for, labels, _ = BANDS[band]
+    return pd.Categorical.from_codes(codes_for(values), categories=labels)
+
+
+def _band_css(frame, bands):
+    css = pd.DataFrame('', index=frame.index, columns=frame.columns)
+    for col, band in bands.items():
+        codes_for, _, styles = BANDS[band]
+        # Código -1 cai no último item: sem estilo
+        css[col] = np.array(styles + [''], dtype=object)[codes_for(frame[col])]
+    return css
+
+
+def _column_name(col):
+    if isinstance(col, tuple):
+        return ' · '.join(str(part) for part in col if str(part) != '')
+    return col
+
+
+def _printf_format(fmt):
+    """'R$ {:,.2f}' -> 'R$ %.2f' (formato do NumberColumn; sem separador de milhar)."""
+    spec = re.search(r'\{:([^}]*)\}', fmt).group(1).replace(',', '')
+    prefix, suffix = fmt.split('{', 1)[0], fmt.rsplit('}', 1)[1]
+    return prefix.replace('%', '%%') + '%' + spec + suffix.replace('%', '%%')
+
+
+def _plain_table(data, formats, bands):
+    """Tabela sem Styler: colunas com faixa viram texto com o rótulo da faixa na frente."""
+    plain = data.copy()
+    column_config = {}
+    for col in data.columns:
+        if col in bands:
+            codes_for, labels, _ = BANDS[bands[col]]
+            prefixes = np.array([label + ' ' for label in labels] + [''], dtype=object)
+            text = data[col].map(formats.get(col, '{}').format).to_numpy(dtype=object)
+            plain[col] = prefixes[codes_for(data[col])] + text
+        elif col in formats:
+            column_config[_column_name(col)] = st.column_config.NumberColumn(format=_printf_format(formats[col]))
+    plain.columns = [_column_name(col) for col in data.columns]
+    return plain, column_config
+
+
+def render_table(data, formats, bands=None, **kwargs):
+    """Exibe data no st.dataframe com formatos por coluna e faixas de cor.
+
+    formats mapeia coluna -> formato Python ('R$ {:,.2f}'); bands mapeia coluna ->
+    nome da faixa em BANDS. Até STYLED_TABLE_MAX_CELLS células usa o Styler, com as
+    cores calculadas de uma vez para a tabela inteira; acima disso envia os valores
+    crus com formatação no navegador, e as faixas aparecem como o emoji da legenda.
+    """
+    bands = bands or {}
+    if data.size <= STYLED_TABLE_MAX_CELLS:
+        styled = data.style.format(formats)
+        if bands:
+            styled = styled.apply(_band_css, axis=None, bands=bands)
+        st.dataframe(styled, **kwargs)
+    else:
+        plain, column_config = _plain_table(data, formats, bands)
+        st.dataframe(plain, column_config=column_config, **kwargs)
+
+
+def render_paged_table(data, formats, bands=None, key='table', **kwargs):
+    """Exibe data paginada: ordena no pandas, recorta a página e só ela vai ao navegador.
+
+    Totais e demais colunas derivadas devem vir calculados em data (recorte completo).
+    Tabelas que cabem na menor página são exibidas direto, sem controles.
+    """
+    if len(data) <= PAGE_SIZE_OPTIONS[0]:
+        render_table(data, formats, bands, **kwargs)
+        return
+
+    col_sort, col_order, col_size, col_page = st.columns([3, 1, 1, 1])
+    with col_sort:
+        sort_column = st.selectbox(
+            "Ordenar por",
+            options=[None] + list(data.columns),
+            format_func=lambda col: "Ordem padrão" if col is None else _column_name(col),
+            key=f"{key}_sort"
+        )
+    with col_order:
+        descending = st.checkbox("Decrescente", key=f"{key}_desc")
+    with col_size:
+        page_size = st.selectbox(
+            "Linhas por página",
+            options=PAGE_SIZE_OPTIONS,
+            index=PAGE_SIZE_OPTIONS.index(DEFAULT_PAGE_SIZE),
+            key=f"{key}_page_size"
+        )
+
+    total_pages = max(1, math.ceil(len(data) / page_size))
+    page_key = f"{key}_page"
+    # Filtro ou tamanho de página novos podem deixar a página atual fora do intervalo
+    if st.session_state.get(page_key, 1) > total_pages:
+        st.session_state[page_key] = total_pages
+    with col_page:
+        page = st.number_input("Página", min_value=1, max_value=total_pages, step=1, key=page_key)
+
+    if sort_column is not None:
+        data = data.sort_values(sort_column, ascending=not descending, kind='stable')
+    elif descending:
+        data = data.iloc[::-1]
+
+    start = (page - 1) * page_size
+    window = data.iloc[start:start + page_size]
+    render_table(window, formats, bands, **kwargs)
+    st.caption(f"Linhas {start + 1:,}–{start + len(window):,} de {len(data):,} · página {page} de {total_pages}".replace(',', '.'))
+
+
+# Paginação no servidor como fragmento: trocar página, tamanho ou ordenação reexecuta
+# só a tabela, sem recalcular a seção que a montou. Dentro de outro fragmento (explorador
+# de SKUs) use render_paged_table: os controles reexecutam o fragmento que já existe,
+# sem aninhar fragmentos
+render_paged_table_fragment = st.fragment(render_paged_table)
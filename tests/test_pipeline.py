@@ -0,0 +1,543 @@
+import json
+import os
+import shutil
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+import pytest
+
+import duckdb_engine
+import ingestion
+import tables
+from analytics import (PERIOD_OPTIONS, FrameSlice, add_sku_columns, apply_filters, apply_tax_policy, build_daily_cube,
+                       build_sku_search_index, channel_metrics, load_tax_policy, search_skus, sku_search_index)
+from charts import cached_figure, lttb_indices
+from generate_data import build_catalog, generate_exports, generate_orders, write_export
+from ingestion import discover_exports, load_exports, parse_brl
+from kpi_cache import LRUCache
+from report_bundle import build_report, read_bundle, write_bundle
+
+
+def _old_money(values):
+    # Conversão anterior das colunas monetárias (cadeia de str.replace + to_numeric)
+    text = (pd.Series(values, dtype=object).astype(str)
+            .str.replace('R$ ', '', regex=False)
+            .str.replace('.', '', regex=False)
+            .str.replace(',', '.', regex=False))
+    return pd.to_numeric(text, errors='coerce').fillna(0).to_numpy()
+
+
+def _old_percent(values):
+    # Conversão anterior da coluna 'MC em %'
+    text = (pd.Series(values, dtype=object).astype(str)
+            .str.replace('%', '', regex=False)
+            .str.replace(',', '.', regex=False))
+    return (pd.to_numeric(text, errors='coerce').fillna(0) / 100).to_numpy()
+
+
+@pytest.mark.parametrize('value', ['R$ 1.234,56', '-R$ 5,00', 'R$ -5,00', '1e3', ''])
+def test_parse_brl_money_matches_old_chain(value):
+    parsed, _ = parse_brl([value])
+    # clean_export preenche vazios e falhas com 0, como a cadeia antiga
+    assert np.nan_to_num(parsed) == pytest.approx(_old_money([value]))
+
+
+@pytest.mark.parametrize('value', ['12,5%', '12.5%', ''])
+def test_parse_brl_percent_matches_old_chain(value):
+    parsed, _ = parse_brl([value], percent=True)
+    assert np.nan_to_num(parsed) == pytest.approx(_old_percent([value]))
+
+
+def test_parse_brl_accounting_negative():
+    # A cadeia antiga não entendia o negativo contábil (virava 0)
+    parsed, failed = parse_brl(['(12,50)'])
+    assert parsed[0] == -12.5 and failed == 0
+
+
+def test_parse_brl_sign_inside_number_is_invalid():
+    parsed, failed = parse_brl(['1-2', '3+', '1(2'])
+    assert np.isnan(parsed).all() and failed == 3
+
+
+@pytest.mark.parametrize('value', ['1R2', '1$2', '1%2', '5 R$', '1 2', '(12,50', '12,50)', ')5(', '%12'])
+def test_parse_brl_formatting_only_at_the_edges(value):
+    # Moeda, sinal e '(' só no início, '%' e ')' só no fim; o resto cai no pandas e falha
+    parsed, failed = parse_brl([value], percent='%' in value)
+    assert np.isnan(parsed).all() and failed == 1
+
+
+def test_parse_brl_formatting_at_the_edges():
+    parsed, failed = parse_brl(['(R$ 12,50)', ' R$ 7,00 ', '12,5 %'], percent=False)
+    assert failed == 0 and list(parsed) == [-12.5, 7.0, 12.5]
+
+
+def test_parse_brl_blank_and_numbers():
+    parsed, failed = parse_brl(['', 'R$ -', None, 7.5, 'R$ 1.234', '1.5'])
+    assert failed == 0
+    assert np.isnan(parsed[:3]).all()
+    assert list(parsed[3:]) == [7.5, 1234.0, 1.5]
+
+
+# Exportações sintéticas: um arquivo por mês, de março a junho de 2025 (abril a junho
+# está no período "todos os pedidos" da política de impostos padrão)
+
+@pytest.fixture(scope='module')
+def exports_dir(tmp_path_factory):
+    data_dir = str(tmp_path_factory.mktemp('exportacoes'))
+    generate_exports(data_dir, rows=2000, skus=40, start='2025-03-01', days=122, seed=1)
+    return data_dir
+
+
+def _copy_exports(exports_dir, target, count=None):
+    os.makedirs(target, exist_ok=True)
+    for path in discover_exports(exports_dir)[:count]:
+        shutil.copy2(path, target)
+    return str(target)
+
+
+def test_parallel_load_in_worker_processes_matches_sequential(exports_dir, tmp_path):
+    data_dir = _copy_exports(exports_dir, tmp_path / 'dados')
+    with open(os.path.join(data_dir, 'MercadoTurbo_Financeiro_corrompido.xlsx'), 'w') as f:
+        f.write('não é uma planilha')
+    paths = discover_exports(data_dir)
+
+    parallel, parallel_avisos = load_exports(paths, cache_dir=str(tmp_path / 'cache_p'), max_workers=3, parallel=True)
+    sequential, avisos = load_exports(paths, cache_dir=str(tmp_path / 'cache_s'), parallel=False)
+    pd.testing.assert_frame_equal(parallel, sequential)
+    assert parallel_avisos == avisos
+    assert any('corrompido.xlsx ignorado' in aviso for aviso in avisos)
+
+
+def test_export_cache_invalidated_by_size_mtime_and_hash(exports_dir, tmp_path, monkeypatch):
+    first, second = discover_exports(exports_dir)[:2]
+    path = str(tmp_path / os.path.basename(first))
+    shutil.copy2(first, path)
+    cache_dir = str(tmp_path / 'cache')
+    reads = []
+    read_export = ingestion.read_export
+    monkeypatch.setattr(ingestion, 'read_export', lambda file_path: reads.append(file_path) or read_export(file_path))
+
+    df, _ = ingestion.load_export(path, cache_dir)
+    ingestion.load_export(path, cache_dir)
+    assert len(reads) == 1
+
+    # Só a data de modificação mudou: o hash confere e o cache continua valendo
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10**9))
+    ingestion.load_export(path, cache_dir)
+    assert len(reads) == 1
+
+    # Conteúdo e tamanho diferentes: relê a planilha
+    shutil.copyfile(second, path)
+    changed, _ = ingestion.load_export(path, cache_dir)
+    assert len(reads) == 2
+    assert not changed['ID da venda'].isin(df['ID da venda']).any()
+
+    # Mesmo tamanho e data registrados, conteúdo diferente: decide o hash
+    shutil.copyfile(first, path)
+    _, meta_path = ingestion._cache_paths(path, cache_dir)
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    meta['size'] = os.stat(path).st_size
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    reloaded, _ = ingestion.load_export(path, cache_dir)
+    assert len(reads) == 3
+    pd.testing.assert_frame_equal(reloaded, df)
+
+
+def test_store_incremental_load_matches_cold_load(exports_dir, tmp_path):
+    data_dir = _copy_exports(exports_dir, tmp_path / 'dados', count=2)
+    cache_dir = str(tmp_path / 'cache')
+    load_exports(discover_exports(data_dir), cache_dir=cache_dir)
+    _copy_exports(exports_dir, data_dir)
+
+    incremental, _ = load_exports(discover_exports(data_dir), cache_dir=cache_dir)
+    cold, _ = load_exports(discover_exports(data_dir), cache_dir=str(tmp_path / 'cache_vazio'))
+    pd.testing.assert_frame_equal(incremental, cold)
+    assert incremental['Data'].is_monotonic_increasing
+
+
+def test_refresh_store_reads_only_when_exports_change(exports_dir, tmp_path, monkeypatch):
+    data_dir = _copy_exports(exports_dir, tmp_path / 'dados', count=2)
+    cache_dir = str(tmp_path / 'cache')
+    loads = []
+    real_load_exports = ingestion.load_exports
+    monkeypatch.setattr(ingestion, 'load_exports', lambda *args: loads.append(args) or real_load_exports(*args))
+
+    ingestion.refresh_store(discover_exports(data_dir), cache_dir=cache_dir)
+    assert len(loads) == 1
+
+    # Nada mudou, ou só a data de modificação: o consolidado nem é lido
+    path = discover_exports(data_dir)[0]
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10**9))
+    ingestion.refresh_store(discover_exports(data_dir), cache_dir=cache_dir)
+    ingestion.refresh_store(discover_exports(data_dir), cache_dir=cache_dir)
+    assert len(loads) == 1
+
+    # Arquivo novo: o consolidado é atualizado como na carga completa
+    _copy_exports(exports_dir, data_dir)
+    ingestion.refresh_store(discover_exports(data_dir), cache_dir=cache_dir)
+    assert len(loads) == 2
+    store = pd.read_parquet(os.path.join(cache_dir, ingestion.STORE_FILE))
+    cold, _ = load_exports(discover_exports(data_dir), cache_dir=str(tmp_path / 'cache_vazio'))
+    assert len(store) == len(cold)
+
+
+def test_newer_export_replaces_period(exports_dir, tmp_path):
+    data_dir = _copy_exports(exports_dir, tmp_path / 'dados')
+    cache_dir = str(tmp_path / 'cache')
+    before, _ = load_exports(discover_exports(data_dir), cache_dir=cache_dir)
+
+    # Nova exportação de abril (IDs a partir de 900000), mais recente que as demais
+    rng = np.random.default_rng(2)
+    dates = pd.date_range('2025-04-01', '2025-04-30', freq='D')
+    orders = generate_orders(build_catalog(40, rng), dates, np.full(len(dates), 3), rng, first_id=900000)
+    newer = os.path.join(data_dir, 'MercadoTurbo_Financeiro_abril_revisado.xlsx')
+    write_export(orders, newer)
+    latest = max(os.path.getmtime(path) for path in discover_exports(data_dir))
+    os.utime(newer, (latest + 10, latest + 10))
+
+    after, _ = load_exports(discover_exports(data_dir), cache_dir=cache_dir)
+    april = after['Data'].dt.month == 4
+    assert set(after.loc[april, 'ID da venda']) == set(orders['ID da venda'])
+    pd.testing.assert_frame_equal(after[~april].reset_index(drop=True),
+                                  before[before['Data'].dt.month != 4].reset_index(drop=True))
+
+
+def test_store_removed_when_manifest_write_fails(exports_dir, tmp_path, monkeypatch):
+    data_dir = _copy_exports(exports_dir, tmp_path / 'dados', count=2)
+    cache_dir = str(tmp_path / 'cache')
+
+    def fail(path, payload):
+        if path.endswith(ingestion.MANIFEST_FILE):
+            raise OSError('disco cheio')
+
+    monkeypatch.setattr(ingestion, '_write_json', fail)
+    df, _ = load_exports(discover_exports(data_dir), cache_dir=cache_dir)
+    assert not df.empty
+    assert not os.path.exists(os.path.join(cache_dir, ingestion.STORE_FILE))
+    assert not os.path.exists(os.path.join(cache_dir, ingestion.MANIFEST_FILE))
+
+
+@pytest.mark.parametrize('extension', ['xlsx', 'zip'])
+def test_report_bundle_round_trip(exports_dir, tmp_path, extension):
+    df, _ = load_exports(discover_exports(exports_dir), cache_dir=str(tmp_path / 'cache'))
+    df = add_sku_columns(df)
+    tables, scope = build_report(df, build_daily_cube(df))
+    path = write_bundle(tables, str(tmp_path / f'pacote.{extension}'), scope)
+
+    restored, manifest = read_bundle(path)
+    assert manifest['pedidos'] == scope['pedidos']
+    assert set(restored) == set(tables)
+    for name, table in tables.items():
+        # Nomes dos níveis de coluna ('Mes', 'Canal de Venda'...) também voltam
+        assert list(restored[name].columns.names) == list(table.columns.names), name
+        pd.testing.assert_frame_equal(restored[name], table, check_dtype=False, check_categorical=False,
+                                      check_index_type=False, check_column_type=False, obj=name)
+
+
+def _assert_same(expected, actual):
+    # Chaves e contagens iguais; somas iguais até o arredondamento (ordem das parcelas difere)
+    if isinstance(expected, dict):
+        assert set(expected) == set(actual)
+        for key in expected:
+            _assert_same(expected[key], actual[key])
+    elif isinstance(expected, tuple):
+        assert len(expected) == len(actual)
+        for left, right in zip(expected, actual):
+            _assert_same(left, right)
+    elif isinstance(expected, pd.DataFrame):
+        pd.testing.assert_frame_equal(expected, actual, check_dtype=False, check_categorical=False,
+                                      check_index_type=False, check_column_type=False, rtol=1e-9, atol=1e-6)
+    elif isinstance(expected, pd.Series):
+        pd.testing.assert_series_equal(expected, actual, check_dtype=False, check_categorical=False,
+                                       check_index_type=False, rtol=1e-9, atol=1e-6)
+    else:
+        assert expected == pytest.approx(actual, rel=1e-9, abs=1e-6)
+
+
+def _assert_slices_match(expected, actual, policy):
+    assert actual.count() == expected.count()
+    assert actual.date_range() == expected.date_range()
+    assert actual.distinct('Origem de Aquisição') == expected.distinct('Origem de Aquisição')
+    expected_previous, actual_previous = expected.previous_period(), actual.previous_period()
+    _assert_same(expected.overview_kpis(expected_previous), actual.overview_kpis(actual_previous))
+    _assert_same(expected.channel_metrics(expected_previous), actual.channel_metrics(actual_previous))
+    for value_column in ['Faturamento', 'Margem Contrib. (=)']:
+        _assert_same(expected.monthly_sales(value_column), actual.monthly_sales(value_column))
+        for status in [None, 'aprovados', 'cancelados']:
+            _assert_same(expected.origin_monthly(value_column, status), actual.origin_monthly(value_column, status))
+    for name in ['orders_by_channel_status', 'orders_by_channel', 'daily_orders', 'daily_channel_pivots',
+                 'shipping_distribution', 'sku_options', 'sku_totals', 'sku_summary', 'sku_monthly_totals',
+                 'pricing_monthly']:
+        _assert_same(getattr(expected, name)(), getattr(actual, name)())
+    _assert_same(expected.order_counts('Status Pedido'), actual.order_counts('Status Pedido'))
+    _assert_same(expected.sku_monthly_comparison(), actual.sku_monthly_comparison())
+    _assert_same(expected.sku_monthly_comparison(True, 15), actual.sku_monthly_comparison(True, 15))
+    for group_column in ['SKU', 'Código']:
+        _assert_same(expected.sku_monthly_performance(group_column), actual.sku_monthly_performance(group_column))
+    tax = expected.tax_report(policy)
+    del tax['pedidos']
+    _assert_same(tax, actual.tax_report(policy))
+
+
+def test_duckdb_engine_matches_analytics(exports_dir, tmp_path, monkeypatch):
+    pytest.importorskip('duckdb')
+    cache_dir = str(tmp_path / 'cache')
+    df, _ = load_exports(discover_exports(exports_dir), cache_dir=cache_dir)
+    df = add_sku_columns(df)
+    cube = build_daily_cube(df)
+    monkeypatch.setattr(duckdb_engine, 'QUERY_ENGINE', 'duckdb')
+    engine = duckdb_engine.open_engine(cache_dir)
+    assert engine is not None
+
+    # Catálogo e índice de busca sem carregar os pedidos
+    catalog = engine.sku_catalog()
+    assert catalog['SKU_Opcao'].to_dict() == df.groupby('SKU', observed=True)['SKU_Opcao'].first().astype(str).to_dict()
+    expected_index, index = build_sku_search_index(df), sku_search_index(catalog)
+    pd.testing.assert_frame_equal(expected_index['catalog'], index['catalog'])
+    assert expected_index['desc_key']['text'] == index['desc_key']['text']
+
+    policy = load_tax_policy()
+    today = df['Data'].max().date()
+    canal, conta = df['Canal de Venda'].iloc[0], df['Conta'].iloc[0]
+    filters = [(period, date(2025, 4, 10), date(2025, 5, 20), "Todos", "Todas") for period in PERIOD_OPTIONS]
+    filters.append(("Todos os dados", None, None, canal, conta))
+    for args in filters:
+        expected = FrameSlice(apply_filters(df, *args, today), apply_filters(cube, *args, today), df)
+        query = engine.filter(*args, today=today)
+        _assert_slices_match(expected, query, policy)
+
+        origem = expected.orders['Origem de Aquisição'].iloc[0]
+        skus = list(expected.orders['SKU'].unique()[:3])
+        _assert_slices_match(expected.narrow(origem, skus), query.narrow(origem, skus), policy)
+
+
+def test_lru_cache_evicts_least_recent_and_expires():
+    cache = LRUCache(max_entries=2, ttl=3600)
+    cache.get_or_compute('a', lambda: 1)
+    cache.get_or_compute('b', lambda: 2)
+    cache.get_or_compute('a', lambda: 0)  # 'a' passa a ser o mais recente
+    cache.get_or_compute('c', lambda: 3)
+    assert cache.get_or_compute('a', lambda: 0) == 1
+    assert cache.get_or_compute('b', lambda: 20) == 20
+    assert cache.stats()['remocoes_lru'] == 2
+
+    expired = LRUCache(ttl=-1)
+    expired.get_or_compute('a', lambda: 1)
+    assert expired.get_or_compute('a', lambda: 2) == 2
+    assert expired.stats()['expiradas'] == 1
+
+
+def _channel_orders(rows, categories=None):
+    orders = pd.DataFrame(rows, columns=['Canal de Venda', 'Conta', 'Status Pedido', 'Faturamento',
+                                         'Margem Contrib. (=)'])
+    for col, values in (categories or {}).items():
+        orders[col] = pd.Categorical(orders[col], categories=values)
+    return orders
+
+
+def test_channel_metrics_unexpected_channel_and_account():
+    # Canal e conta fora da lista antiga (Mercado Livre/Shopee × XRack/EvolutionX), com
+    # categorias sem pedidos no recorte e um pedido sem conta
+    current = _channel_orders(
+        [('Amazon', 'NovaConta', 'Pago', 80.0, 8.0), ('Amazon', 'NovaConta', 'Cancelado', 20.0, 2.0),
+         ('Mercado Livre', 'XRack', 'Pago', 100.0, 20.0), ('Shopee', None, 'Pago', 10.0, 1.0)],
+        {'Canal de Venda': ['Amazon', 'Magalu', 'Mercado Livre', 'Shopee'],
+         'Conta': ['EvolutionX', 'NovaConta', 'XRack']})
+    metrics = channel_metrics(current)
+
+    assert set(metrics) == {'Amazon', 'Amazon_NovaConta', 'Mercado Livre', 'Mercado Livre_XRack', 'Shopee'}
+    amazon = metrics['Amazon_NovaConta']
+    assert (amazon['canal'], amazon['conta']) == ('Amazon', 'NovaConta')
+    assert amazon['aprovado'] == 80.0 and amazon['qtd_aprovada'] == 1
+    assert amazon['perc_cancelado_fat'] == pytest.approx(20.0) and amazon['mc_perc'] == pytest.approx(10.0)
+    # O pedido sem conta entra no total do canal, sem card de conta
+    assert metrics['Shopee']['aprovado'] == 10.0 and metrics['Shopee']['conta'] is None
+
+
+def test_channel_metrics_account_missing_in_a_period():
+    current = _channel_orders([('Mercado Livre', 'XRack', 'Pago', 100.0, 20.0),
+                               ('Mercado Livre', 'XRack', 'Cancelado', 50.0, 5.0)])
+    previous = _channel_orders([('Mercado Livre', 'XRack', 'Pago', 50.0, 10.0),
+                                ('Mercado Livre', 'EvolutionX', 'Pago', 40.0, 4.0)])
+    metrics = channel_metrics(current, previous)
+
+    assert metrics['Mercado Livre_XRack']['growth_fat'] == pytest.approx(100.0)
+    assert metrics['Mercado Livre']['growth_fat'] == pytest.approx((100 - 90) / 90 * 100)
+    # Conta só no período anterior: card zerado, queda de 100%
+    evolution = metrics['Mercado Livre_EvolutionX']
+    assert evolution['aprovado'] == 0 and evolution['qtd_total'] == 0
+    assert evolution['growth_fat'] == -100.0 and evolution['growth_qtd'] == -100.0
+
+    # Conta só no período atual: sem base de comparação, crescimento 0
+    metrics = channel_metrics(previous, current)
+    assert metrics['Mercado Livre_EvolutionX']['growth_fat'] == 0
+    assert metrics['Mercado Livre_EvolutionX']['aprovado'] == 40.0
+
+
+def test_add_sku_columns_leaves_input_untouched():
+    orders = pd.DataFrame({'SKU': ['A1', None], 'Descrição do Produto': [None, 'Cabo'], 'Qtd.': [1, 2]})
+    before = orders.copy()
+    prepared = add_sku_columns(orders)
+    pd.testing.assert_frame_equal(orders, before)
+    assert list(prepared['SKU_Opcao']) == ['A1 - Sem descrição', 'Sem SKU - Cabo']
+    assert prepared['SKU'].dtype == 'category'
+
+
+def test_search_skus_folds_accents_and_ranks_exact_prefix_substring():
+    orders = pd.DataFrame({
+        'SKU': ['XCAM-10', 'CAM', 'CAM-01', 'SUPCAM', 'OUTRO'],
+        'Descrição do Produto': ['Câmera extra', 'Câmera', 'Camera reserva', 'Suporte para câmera', 'Óculos'],
+    })
+    index = build_sku_search_index(add_sku_columns(orders))
+
+    # Exata, prefixo e trecho; empates na ordem do SKU
+    assert list(search_skus(index, 'cam')['SKU']) == ['CAM', 'CAM-01', 'SUPCAM', 'XCAM-10']
+    # Maiúsculas e acentos ignorados nos dois lados
+    assert list(search_skus(index, desc_term='CAMERA')['SKU']) == ['CAM', 'CAM-01', 'XCAM-10', 'SUPCAM']
+    assert list(search_skus(index, desc_term='oculos')['SKU']) == ['OUTRO']
+    # Os dois termos juntos: relevâncias somadas
+    assert list(search_skus(index, 'cam', 'câmera')['SKU']) == ['CAM', 'CAM-01', 'XCAM-10', 'SUPCAM']
+    assert search_skus(index, 'zzz').empty
+    assert list(search_skus(index)['SKU']) == ['CAM', 'CAM-01', 'OUTRO', 'SUPCAM', 'XCAM-10']
+
+
+def _old_color_mc(val):
+    # Cores anteriores das tabelas (uma chamada do Styler por célula)
+    if pd.isna(val):
+        return ''
+    if val <= 20:
+        return 'background-color:#FF0000'
+    elif val < 30:
+        return 'background-color:#C7AF00'
+    elif val < 40:
+        return 'background-color:#00C700'
+    return 'background-color:#00D9FF'
+
+
+def _old_color_variation(val):
+    if pd.isna(val) or val == 0:
+        return ''
+    elif val > 0:
+        return 'background-color: #90EE90; color: #006400; font-weight: bold'
+    return 'background-color: #FFB6C1; color: #8B0000; font-weight: bold'
+
+
+def _old_color_mc_pricing(val):
+    if pd.isna(val) or val == 0:
+        return ''
+    return _old_color_mc(val) + '; color: white'
+
+
+def test_table_bands_match_old_cell_colors():
+    values = [np.nan, -5.0, 0.0, 19.99, 20.0, 20.01, 29.99, 30.0, 39.99, 40.0, 40.01, 120.0]
+    frame = pd.DataFrame({'mc': values, 'mc_pricing': values, 'variation': values})
+    css = tables._band_css(frame, {'mc': 'mc', 'mc_pricing': 'mc_pricing', 'variation': 'variation'})
+    assert list(css['mc']) == [_old_color_mc(value) for value in values]
+    assert list(css['mc_pricing']) == [_old_color_mc_pricing(value) for value in values]
+    assert list(css['variation']) == [_old_color_variation(value) for value in values]
+    # Rótulos da legenda nas tabelas grandes: mesma faixa que a cor
+    labels = tables.band_categories(values, 'mc')
+    assert list(pd.Series(labels).astype(object).fillna('')) == ['', '🔴', '🔴', '🔴', '🔴', '🟡', '🟡', '🟢', '🟢', '🔵', '🔵', '🔵']
+
+
+def test_render_table_switches_to_plain_dataframe_above_cell_limit(monkeypatch):
+    shown = []
+    monkeypatch.setattr(tables.st, 'dataframe', lambda data, **kwargs: shown.append((data, kwargs)))
+    monkeypatch.setattr(tables, 'STYLED_TABLE_MAX_CELLS', 20)
+    formats = {'Valor': 'R$ {:,.2f}', 'MC (%)': '{:.2f}%'}
+
+    small = pd.DataFrame({'Valor': np.arange(10.0), 'MC (%)': np.linspace(0, 50, 10)})
+    tables.render_table(small, formats, {'MC (%)': 'mc'})
+    assert isinstance(shown[-1][0], pd.io.formats.style.Styler)
+
+    large = pd.DataFrame({'Valor': np.arange(11.0), 'MC (%)': np.linspace(0, 50, 11)})
+    tables.render_table(large, formats, {'MC (%)': 'mc'})
+    plain, kwargs = shown[-1]
+    assert isinstance(plain, pd.DataFrame)
+    assert list(plain['MC (%)'].iloc[[0, -1]]) == ['🔴 0.00%', '🔵 50.00%']
+    assert kwargs['column_config']['Valor']['type_config']['format'] == 'R$ %.2f'
+
+
+def _paged_table_app():
+    import pandas as pd
+
+    from tables import render_paged_table
+
+    render_paged_table(pd.DataFrame({'Valor': range(300)}), {'Valor': '{:.0f}'}, key='tabela')
+
+
+def test_paged_table_clamps_page_number():
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_function(_paged_table_app)
+    app.session_state['tabela_page'] = 7
+    app.run()
+    assert not app.exception
+    # 300 linhas em páginas de 100: a página 7 vira a última (3)
+    assert app.number_input(key='tabela_page').value == 3
+    assert list(app.dataframe[0].value['Valor'].iloc[[0, -1]]) == [200, 299]
+
+    app.selectbox(key='tabela_page_size').set_value(250).run()
+    assert app.number_input(key='tabela_page').value == 2
+    assert list(app.dataframe[0].value['Valor'].iloc[[0, -1]]) == [250, 299]
+
+
+def test_apply_tax_policy_status_by_month():
+    policy = load_tax_policy()
+    cube = pd.DataFrame({
+        'Data': pd.to_datetime(['2025-03-10', '2025-03-11', '2025-05-10', '2025-05-11', None]),
+        'Status Pedido': ['Pago', 'Cancelado', 'Pago', 'Cancelado', 'Pago'],
+        'Pedidos': [1, 1, 1, 1, 1],
+    })
+    taxed = apply_tax_policy(cube, policy)
+    # Março: só pagos (regra padrão); maio: todos os pedidos; sem data: fora
+    assert list(taxed['Data'].dt.strftime('%Y-%m-%d')) == ['2025-03-10', '2025-05-10', '2025-05-11']
+    assert list(taxed['Filtro_Aplicado']) == [policy[0]['descricao'], policy[1]['descricao'], policy[1]['descricao']]
+
+
+def test_lttb_keeps_endpoints_and_extremes():
+    rng = np.random.default_rng(0)
+    y = rng.normal(size=1000)
+    y[437], y[612] = 50.0, -50.0
+    indices = lttb_indices(np.arange(1000), y, 100)
+    assert len(indices) == 100
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+    assert {437, 612} <= set(indices.tolist())
+
+
+@pytest.mark.parametrize('n_out', [3, 4, 5, 20])
+def test_lttb_never_exceeds_point_budget(n_out):
+    # Passeios aleatórios curtos: o máximo e o mínimo raramente são os pontos do LTTB
+    for seed in range(100):
+        y = np.random.default_rng(seed).normal(size=60).cumsum()
+        indices = lttb_indices(np.arange(60), y, n_out)
+        assert len(indices) == n_out
+        assert np.all(np.diff(indices) > 0) and indices[0] == 0 and indices[-1] == 59
+        assert int(y.argmax()) in indices
+        if n_out > 3:
+            assert int(y.argmin()) in indices
+
+
+def test_cached_figure_builds_once_and_keeps_the_spec():
+    data = pd.DataFrame({'Mês': ['01/2025', '02/2025'], 'Qtd.': [3, 5]})
+    builds = []
+
+    def build():
+        builds.append(1)
+        return px.bar(data, x='Mês', y='Qtd.')
+
+    cache = LRUCache()
+    fig = cached_figure(cache, 'barras', [data], build)
+    assert cached_figure(cache, 'barras', [data.copy()], build) is fig
+    assert len(builds) == 1
+    # O dicionário do gráfico é montado uma vez e serializa igual à figura original
+    assert fig.to_dict() is fig.to_dict()
+    assert json.loads(pio.to_json(fig, validate=False)) == json.loads(pio.to_json(build(), validate=False))
+    cached_figure(cache, 'barras', [data.assign(**{'Qtd.': [3, 6]})], build)
+    assert len(builds) == 3